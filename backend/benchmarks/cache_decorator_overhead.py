@@ -0,0 +1,121 @@
+"""Microbenchmark of the per-request overhead of the `cache` decorator.
+
+It reports the CPU time spent on:
+
+- key building: the cache key, tags and invalidation keys of `read_posts`/`patch_post`-like endpoints, built by
+  parsing the templates on every request (as before) and from the templates precompiled at decoration time;
+- L1 hit: a full decorated call answered by the in-process cache, against a bare call of the endpoint.
+
+No Redis server is needed: the L1 hit never reaches Redis. Run from the `backend` folder:
+
+    python -m benchmarks.cache_decorator_overhead --number 20000
+"""
+
+import argparse
+import asyncio
+import time
+import timeit
+from typing import Any
+
+from fastapi import Request
+from redis.asyncio import Redis
+
+from src.app.core.utils import cache
+from src.app.core.utils.cache import (
+    LocalCache,
+    _format_extra_data,
+    _format_prefix,
+    _infer_resource_id,
+    _KeyBuilder,
+)
+
+KWARGS = {"username": "userson", "page": 3, "items_per_page": 10, "id": 42, "db": object()}
+TEMPLATES = {
+    "key_prefix": "{username}_posts:page_{page}:items_per_page:{items_per_page}",
+    "resource_id_name": "username",
+    "tags": ["{username}_posts"],
+    "to_invalidate_extra": {"{username}_posts": "{username}", "{username}_post_cache": "{id}"},
+    "pattern_to_invalidate_extra": ["{username}_posts:*"],
+    "tags_to_invalidate": ["{username}_posts"],
+}
+
+
+def _parse_on_request() -> list[Any]:
+    resource_id = KWARGS[TEMPLATES["resource_id_name"]]
+    cache_key = f"{_format_prefix(TEMPLATES['key_prefix'], KWARGS)}:{resource_id}"
+    tags = [_format_prefix(tag, KWARGS) for tag in TEMPLATES["tags"]]
+    extra = _format_extra_data(TEMPLATES["to_invalidate_extra"], KWARGS)
+    extra_keys = [f"{prefix}:{id}" for prefix, id in extra.items()]
+    patterns = [_format_prefix(pattern, KWARGS) + "*" for pattern in TEMPLATES["pattern_to_invalidate_extra"]]
+    invalidated_tags = [_format_prefix(tag, KWARGS) for tag in TEMPLATES["tags_to_invalidate"]]
+    return [cache_key, tags, extra_keys, patterns, invalidated_tags]
+
+
+def _precompiled(keys: _KeyBuilder) -> list[Any]:
+    return [
+        keys.cache_key(KWARGS),
+        keys.tags(KWARGS),
+        keys.extra_keys(KWARGS),
+        keys.patterns(KWARGS),
+        keys.tags_to_invalidate(KWARGS),
+    ]
+
+
+def _time(func: Any, number: int) -> float:
+    return min(timeit.repeat(func, number=number, repeat=5)) / number * 1_000_000
+
+
+async def _time_async(func: Any, number: int) -> float:
+    best = float("inf")
+    for _ in range(5):
+        started = time.perf_counter()
+        for _ in range(number):
+            await func()
+        best = min(best, time.perf_counter() - started)
+    return best / number * 1_000_000
+
+
+async def _l1_hit(number: int) -> tuple[float, float]:
+    async def read_post(request: Request, username: str, id: int, db: Any) -> dict[str, Any]:
+        return {"id": id, "title": "title", "text": "text", "created_by_user_id": 1}
+
+    decorated = cache.cache(key_prefix="{username}_post_cache", resource_id_name="id")(read_post)
+    request = Request({"type": "http", "method": "GET", "path": "/", "headers": [], "query_string": b""})
+    kwargs = {"username": KWARGS["username"], "id": KWARGS["id"], "db": KWARGS["db"]}
+
+    cache.client = Redis()
+    cache.local_cache = LocalCache(max_size=1024, ttl=3600)
+    cache.local_cache.set(f"{kwargs['username']}_post_cache:{kwargs['id']}", b'{"id":42}', ttl=3600)
+    try:
+        bare = await _time_async(lambda: read_post(request, **kwargs), number)
+        hit = await _time_async(lambda: decorated(request, **kwargs), number)
+    finally:
+        await cache.client.aclose()
+        cache.client = None
+        cache.local_cache = None
+    return bare, hit
+
+
+def main(number: int) -> None:
+    keys = _KeyBuilder(**TEMPLATES)
+    assert _parse_on_request() == _precompiled(keys)
+
+    print(f"{'key building':<36} {'µs':>8}")
+    print(f"{'parsed on every request':<36} {_time(_parse_on_request, number):>8.2f}")
+    print(f"{'precompiled':<36} {_time(lambda: _precompiled(keys), number):>8.2f}")
+    print(f"{'resource id inferred by type':<36} {_time(lambda: _infer_resource_id(KWARGS, int), number):>8.2f}")
+    print(f"{'resource id from precompiled getter':<36} {_time(lambda: keys.resource_id(KWARGS), number):>8.2f}")
+
+    bare, hit = asyncio.run(_l1_hit(number))
+    print(f"\n{'call':<36} {'µs':>8}")
+    print(f"{'bare endpoint':<36} {bare:>8.2f}")
+    print(f"{'decorated, L1 hit':<36} {hit:>8.2f}")
+    print(f"{'decorator overhead':<36} {hit - bare:>8.2f}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--number", type=int, default=20000)
+    args = parser.parse_args()
+
+    main(args.number)
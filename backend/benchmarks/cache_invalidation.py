@@ -0,0 +1,82 @@
+"""Compare write-path invalidation cost of SCAN pattern deletion against tag-based invalidation.
+
+For each keyspace size, the Redis database is filled with unrelated keys plus one user's paginated post listings,
+and the time to invalidate that user's listings is measured with both `_delete_keys_by_pattern` and
+`_pop_tagged_keys` followed by `_unlink_and_publish`, as the `cache` decorator does for `tags_to_invalidate`.
+
+Run from the `backend` folder against a disposable Redis database (it is flushed):
+
+    python -m benchmarks.cache_invalidation --url redis://localhost:6379/15 --sizes 10000 100000 1000000
+"""
+
+import argparse
+import asyncio
+import statistics
+import time
+
+import redis.asyncio as redis
+
+from src.app.core.utils import cache
+
+USERNAME = "bench_user"
+TAG = f"{USERNAME}_posts"
+
+
+async def _fill(client: redis.Redis, size: int, batch_size: int = 10_000) -> None:
+    for start in range(0, size, batch_size):
+        async with client.pipeline(transaction=False) as pipe:
+            for i in range(start, min(start + batch_size, size)):
+                pipe.set(f"filler_{i}_post_cache:{i}", "{}")
+            await pipe.execute()
+
+
+async def _populate_listings(client: redis.Redis, pages: int) -> None:
+    for page in range(1, pages + 1):
+        cache_key = f"{TAG}:page_{page}:items_per_page:10:{USERNAME}"
+        await client.set(cache_key, "{}", ex=3600)
+        await cache._register_in_tags(cache_key, [TAG], 3600)
+
+
+async def _measure(client: redis.Redis, pages: int, rounds: int, invalidate: str) -> list[float]:
+    timings = []
+    for _ in range(rounds):
+        await _populate_listings(client, pages)
+        started = time.perf_counter()
+        if invalidate == "scan":
+            await cache._delete_keys_by_pattern(f"{TAG}:*")
+        else:
+            await cache._unlink_and_publish(await cache._pop_tagged_keys([TAG]), [])
+        timings.append((time.perf_counter() - started) * 1000)
+
+    return timings
+
+
+def _report(size: int, name: str, timings: list[float]) -> None:
+    p95 = statistics.quantiles(timings, n=20)[-1] if len(timings) > 1 else timings[0]
+    print(f"{size:>10} keys  {name:<5}  p50 {statistics.median(timings):9.3f} ms  p95 {p95:9.3f} ms")
+
+
+async def main(url: str, sizes: list[int], pages: int, rounds: int) -> None:
+    cache.client = redis.Redis.from_url(url)
+    try:
+        for size in sizes:
+            await cache.client.flushdb()
+            await _fill(cache.client, size)
+            for name in ("scan", "tags"):
+                _report(size, name, await _measure(cache.client, pages, rounds, name))
+
+        await cache.client.flushdb()
+
+    finally:
+        await cache.client.aclose()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--url", default="redis://localhost:6379/15", help="Redis database to use (it is flushed)")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10_000, 100_000, 1_000_000])
+    parser.add_argument("--pages", type=int, default=20, help="cached listing pages invalidated per write")
+    parser.add_argument("--rounds", type=int, default=20)
+    args = parser.parse_args()
+
+    asyncio.run(main(args.url, args.sizes, args.pages, args.rounds))
@@ -0,0 +1,79 @@
+"""Microbenchmark of the cache codecs over representative `PaginatedListResponse[PostRead]` payloads.
+
+For every installed codec and compression, it reports the stored size and the per-request CPU time of:
+
+- miss: encoding an endpoint result into the bytes stored in Redis;
+- hit (decoded): decoding the stored bytes and re-encoding them as the JSON response body, as FastAPI does;
+- hit (raw): what is left when the cached payload is sent as-is with `raw_response=True`.
+
+Run from the `backend` folder:
+
+    python -m benchmarks.cache_serialization --items 10 100 --text-size 2000
+"""
+
+import argparse
+import json
+import timeit
+from datetime import UTC, datetime
+from typing import Any
+
+from faker import Faker
+from fastapi.encoders import jsonable_encoder
+
+from src.app.core.utils.cache_codecs import CODECS, COMPRESSORS, get_serializer
+
+fake = Faker()
+
+
+def _posts_page(items: int, text_size: int) -> dict[str, Any]:
+    data = [
+        {
+            "id": i,
+            "title": fake.sentence(),
+            "text": fake.text(max_nb_chars=text_size),
+            "media_url": fake.image_url(),
+            "created_by_user_id": 1,
+            "created_at": datetime.now(UTC),
+        }
+        for i in range(items)
+    ]
+    return {"data": data, "total_count": items * 10, "has_more": True, "page": 1, "items_per_page": items}
+
+
+def _time(func: Any, number: int) -> float:
+    return min(timeit.repeat(func, number=number, repeat=5)) / number * 1_000_000
+
+
+def main(items_per_page: list[int], text_size: int, number: int) -> None:
+    codecs = [name for name, (_, module) in CODECS.items() if module is not None]
+    compressions = ["none"] + [name for name, (_, module) in COMPRESSORS.items() if module is not None]
+
+    for items in items_per_page:
+        result = _posts_page(items, text_size)
+        print(f"\n{items} posts per page, ~{text_size} chars of text each")
+        print(f"{'codec':<8} {'compression':<12} {'bytes':>9} {'miss µs':>9} {'hit µs':>9} {'raw hit µs':>11}")
+
+        legacy = json.dumps(jsonable_encoder(result)).encode()
+        legacy_miss = _time(lambda: json.dumps(jsonable_encoder(result)), number)
+        legacy_hit = _time(lambda: json.dumps(jsonable_encoder(json.loads(legacy.decode()))), number)
+        print(f"{'legacy':<8} {'none':<12} {len(legacy):>9} {legacy_miss:>9.1f} {legacy_hit:>9.1f} {'-':>11}")
+
+        for codec in codecs:
+            for compression in compressions:
+                serializer = get_serializer(codec, compression, compression_min_size=1024)
+                stored = serializer.dumps(jsonable_encoder(result))
+
+                miss = _time(lambda: serializer.dumps(jsonable_encoder(result)), number)
+                hit = _time(lambda: json.dumps(jsonable_encoder(serializer.loads(stored))), number)
+                raw = f"{_time(lambda: serializer.decompress(stored), number):>11.1f}" if serializer.media_type else "-"
+                print(f"{codec:<8} {compression:<12} {len(stored):>9} {miss:>9.1f} {hit:>9.1f} {raw:>11}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--items", type=int, nargs="+", default=[10, 100])
+    parser.add_argument("--text-size", type=int, default=2000)
+    parser.add_argument("--number", type=int, default=200)
+    args = parser.parse_args()
+
+    main(args.items, args.text_size, args.number)
@@ -0,0 +1,190 @@
+"""Time to first byte and total time of the YouTube download endpoints, for cached and for new downloads.
+
+Cached: a file of each size of `--sizes` is put in a throwaway download cache, then requested `--rounds` times from:
+
+- `copy`: the previous implementation, which copied the file to a temporary folder under its served name with
+  `shutil.copy2` before sending it, and deleted the copy afterwards;
+- `direct`: `POST /youtube-download/{client_id}`, which sends the cached file and only names it in its
+  `Content-Disposition` header.
+
+The files were just written so they are likely in the page cache, which makes the copy cheaper than it is for files
+read from disk.
+
+New downloads: yt-dlp is replaced by a download writing `--download-size` MB over `--download-seconds`, and the file
+is requested with an empty cache from:
+
+- `wait`: `POST /youtube-download/{client_id}`, which sends the file once downloaded;
+- `stream`: `GET /youtube-stream`, which sends it while it is written.
+
+The ASGI app is called directly, so the time to first byte is the time until the app sends the first chunk of the
+body, without any network. Run from the `backend` folder:
+
+    python -m benchmarks.download_ttfb --sizes 100,500 --rounds 3 --download-seconds 5
+"""
+
+import argparse
+import asyncio
+import json
+import logging
+import os
+import shutil
+import statistics
+import tempfile
+import time
+from contextlib import ExitStack
+from typing import Any
+from unittest.mock import patch
+
+from fastapi import FastAPI
+from fastapi.responses import FileResponse
+from starlette.background import BackgroundTask
+
+from src.app.api.v1.utils import youtube
+from src.app.core.utils import downloads
+from src.app.core.utils.download_cache import Artifact, DownloadCache, artifact_key
+from src.app.core.utils.downloads import download_options
+
+URL = "https://www.youtube.com/watch?v=benchmark00"
+CHUNK = b"\0" * (1024 * 1024)
+DOWNLOAD = ("POST", "/youtube-download/benchmark", b"")
+STREAM = ("GET", "/youtube-stream", f"url={URL}&resolution=360p&format=mp4".encode())
+
+
+def _copy_app(cache: DownloadCache) -> FastAPI:
+    app = FastAPI()
+
+    @app.post("/youtube-download/{client_id}")
+    async def download_video(video: youtube.YouTubeURL, client_id: str) -> FileResponse:
+        artifact = cache.get(artifact_key(video.url, download_options(video.resolution, video.format.value, "")))
+        assert artifact is not None
+        temp_dir = tempfile.mkdtemp()
+        safe_path = os.path.join(temp_dir, f"benchmark_{video.resolution}.mp4")
+        shutil.copy2(artifact.path, safe_path)
+        return FileResponse(
+            path=safe_path,
+            media_type=artifact.media_type,
+            background=BackgroundTask(shutil.rmtree, temp_dir, ignore_errors=True),
+        )
+
+    return app
+
+
+def _direct_app() -> FastAPI:
+    app = FastAPI()
+    app.include_router(youtube.router)
+    return app
+
+
+async def _fill(cache: DownloadCache, size_mb: int) -> None:
+    async def fetch(output_dir: str) -> Artifact:
+        path = os.path.join(output_dir, "Benchmark.mp4")
+        with open(path, "wb") as f:
+            for _ in range(size_mb):
+                f.write(CHUNK)
+        return Artifact(path, "Benchmark", "video/mp4")
+
+    await cache.get_or_download(artifact_key(URL, download_options("1080p", "mp4", "")), fetch)
+
+
+def _slow_download(size_mb: int, seconds: float) -> Any:
+    def extract_info(url: str, options: dict[str, Any]) -> dict[str, Any]:
+        with open(options["outtmpl"].replace("%(title)s.%(ext)s", "Benchmark.mp4"), "wb") as f:
+            for _ in range(size_mb):
+                time.sleep(seconds / size_mb)
+                f.write(CHUNK)
+                f.flush()
+        return {"title": "Benchmark"}
+
+    return extract_info
+
+
+async def _request(app: FastAPI, method: str, path: str, query_string: bytes, resolution: str) -> tuple[float, float]:
+    """Time to first byte and total time of a request, in seconds."""
+    body = b""
+    if method == "POST":
+        body = json.dumps({"url": URL, "resolution": resolution, "format": "mp4"}).encode()
+    scope: dict[str, Any] = {
+        "type": "http",
+        "asgi": {"version": "3.0"},
+        "http_version": "1.1",
+        "method": method,
+        "scheme": "http",
+        "path": path,
+        "raw_path": path.encode(),
+        "root_path": "",
+        "query_string": query_string,
+        "headers": [(b"content-type", b"application/json"), (b"content-length", str(len(body)).encode())],
+        "client": ("127.0.0.1", 12345),
+        "server": ("benchmark", 80),
+    }
+    received = False
+    first_byte: float | None = None
+
+    async def receive() -> dict[str, Any]:
+        nonlocal received
+        if not received:
+            received = True
+            return {"type": "http.request", "body": body, "more_body": False}
+        await asyncio.Event().wait()
+        return {"type": "http.disconnect"}
+
+    async def send(message: dict[str, Any]) -> None:
+        nonlocal first_byte
+        if message["type"] == "http.response.start":
+            assert message["status"] == 200, message
+        if message["type"] == "http.response.body" and message.get("body") and first_byte is None:
+            first_byte = time.perf_counter()
+
+    started = time.perf_counter()
+    await app(scope, receive, send)
+    assert first_byte is not None
+    return first_byte - started, time.perf_counter() - started
+
+
+def _print(size_mb: int, mode: str, timings: list[tuple[float, float]]) -> None:
+    ttfb = statistics.median(t[0] for t in timings) * 1000
+    total = statistics.median(t[1] for t in timings) * 1000
+    print(f"{size_mb:>8} {mode:<7} {ttfb:>9.1f} {total:>9.1f}")
+
+
+async def main(sizes: list[int], rounds: int, download_size: int, download_seconds: float) -> None:
+    logging.disable(logging.INFO)
+    directory = tempfile.mkdtemp()
+    artifacts = os.path.join(directory, "artifacts")
+    cache = DownloadCache(directory, max_size=2**62)
+    apps = {"copy": _copy_app(cache), "direct": _direct_app()}
+    extract_info = _slow_download(download_size, download_seconds)
+
+    print(f"{rounds} rounds, median times")
+    print(f"{'size MB':>8} {'mode':<7} {'TTFB ms':>9} {'total ms':>9}")
+    try:
+        with ExitStack() as stack:
+            stack.enter_context(patch.object(youtube, "download_cache", cache))
+            for size_mb in sizes:
+                shutil.rmtree(artifacts, ignore_errors=True)
+                await _fill(cache, size_mb)
+                for mode, app in apps.items():
+                    await _request(app, *DOWNLOAD, "1080p")
+                    _print(size_mb, mode, [await _request(app, *DOWNLOAD, "1080p") for _ in range(rounds)])
+
+            print(f"new downloads of {download_seconds} seconds")
+            stack.enter_context(patch.object(downloads, "_extract_info", extract_info))
+            for mode, request in (("wait", DOWNLOAD), ("stream", STREAM)):
+                timings = []
+                for _ in range(rounds):
+                    shutil.rmtree(artifacts, ignore_errors=True)
+                    timings.append(await _request(apps["direct"], *request, "360p"))
+                _print(download_size, mode, timings)
+    finally:
+        shutil.rmtree(directory, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=lambda s: [int(n) for n in s.split(",")], default=[100, 500])
+    parser.add_argument("--rounds", type=int, default=3)
+    parser.add_argument("--download-size", type=int, default=50)
+    parser.add_argument("--download-seconds", type=float, default=5)
+    args = parser.parse_args()
+
+    asyncio.run(main(args.sizes, args.rounds, args.download_size, args.download_seconds))
@@ -0,0 +1,82 @@
+"""Cost of signing and verifying access tokens with each JWT backend and algorithm.
+
+Keys are generated for the run and parsed once, as `JWTSigner` does at startup. Combinations whose library is not
+installed are skipped: the `pyjwt` backend needs PyJWT, and its ES256 and EdDSA support needs `cryptography`
+(`poetry install -E jwt`). Run from the `backend` folder:
+
+    python -m benchmarks.jwt_backends --iterations 2000
+"""
+
+import argparse
+import time
+import uuid
+from datetime import UTC, datetime, timedelta
+
+import ecdsa
+
+from src.app.core.exceptions.jwt_exceptions import InvalidJWTConfigError
+from src.app.core.utils.jwt_backends import BACKENDS, JWTSigner
+
+try:
+    from cryptography.hazmat.primitives import serialization
+    from cryptography.hazmat.primitives.asymmetric.ed25519 import Ed25519PrivateKey
+except ImportError:  # pragma: no cover
+    Ed25519PrivateKey = None
+
+
+def _keys() -> dict[str, str | None]:
+    eddsa_key = None
+    if Ed25519PrivateKey is not None:
+        eddsa_key = (
+            Ed25519PrivateKey.generate()
+            .private_bytes(serialization.Encoding.PEM, serialization.PrivateFormat.PKCS8, serialization.NoEncryption())
+            .decode()
+        )
+    return {
+        "HS256": uuid.uuid4().hex * 2,
+        "ES256": ecdsa.SigningKey.generate(curve=ecdsa.NIST256p).to_pem().decode(),
+        "EdDSA": eddsa_key,
+    }
+
+
+def _time(func: object, iterations: int) -> float:
+    started = time.perf_counter()
+    for _ in range(iterations):
+        func()  # type: ignore[operator]
+    return (time.perf_counter() - started) / iterations * 1_000_000
+
+
+def main(iterations: int) -> None:
+    claims = {
+        "sub": "benchmarkuser",
+        "tier_id": 1,
+        "exp": datetime.now(UTC).replace(tzinfo=None) + timedelta(minutes=30),
+        "jti": uuid.uuid4().hex,
+    }
+
+    print(f"{iterations} iterations")
+    print(f"{'backend':<8} {'algorithm':<10} {'encode µs':>10} {'decode µs':>10}")
+    for algorithm, key in _keys().items():
+        for name, (backend_class, module) in BACKENDS.items():
+            if module is None or key is None:
+                print(f"{name:<8} {algorithm:<10} {'not installed':>21}")
+                continue
+
+            try:
+                signer = JWTSigner(backend_class(), algorithm, {"bench": key}, "bench")
+            except InvalidJWTConfigError:
+                print(f"{name:<8} {algorithm:<10} {'not supported':>21}")
+                continue
+
+            token = signer.encode(claims)
+            encode = _time(lambda: signer.encode(claims), iterations)
+            decode = _time(lambda: signer.decode(token), iterations)
+            print(f"{name:<8} {algorithm:<10} {encode:>10.1f} {decode:>10.1f}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--iterations", type=int, default=2000)
+    args = parser.parse_args()
+
+    main(args.iterations)
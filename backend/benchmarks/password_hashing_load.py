@@ -0,0 +1,122 @@
+"""Login throughput and latency of other requests, with bcrypt run inline and in the `PasswordHasher` pool.
+
+A minimal app with a login-like endpoint verifying a bcrypt password and a trivial endpoint is served by a single
+uvicorn worker in a child process: `--logins` clients log in back to back while `--pings` clients call the trivial
+endpoint. Verifying the password on the event loop, as before, stalls every ping for as long as a hash takes; in the
+pool, pings keep being served while up to `--concurrency` passwords are verified in parallel.
+
+No database or Redis is needed. Run from the `backend` folder:
+
+    python -m benchmarks.password_hashing_load --duration 10 --logins 16 --pings 16 --concurrency 2
+"""
+
+import argparse
+import asyncio
+import multiprocessing
+import statistics
+import time
+
+import bcrypt
+import httpx
+import uvicorn
+from fastapi import FastAPI
+
+from src.app.core.utils.password_hashing import PasswordHasher
+
+PASSWORD = "Str1ngst!"
+PORT = 8765
+
+
+def _app(hasher: PasswordHasher | None, hashed_password: str) -> FastAPI:
+    app = FastAPI()
+
+    @app.post("/login")
+    async def login() -> dict[str, bool]:
+        if hasher is None:
+            correct_password = bcrypt.checkpw(PASSWORD.encode(), hashed_password.encode())
+        else:
+            correct_password = await hasher.verify(PASSWORD, hashed_password)
+        return {"correct": correct_password}
+
+    @app.get("/ping")
+    async def ping() -> dict[str, str]:
+        return {"message": "pong"}
+
+    return app
+
+
+def _percentile(latencies: list[float], percentile: int) -> float:
+    if len(latencies) < 2:
+        return latencies[0] if latencies else 0.0
+    return statistics.quantiles(latencies, n=100)[percentile - 1]
+
+
+def _serve(hasher_concurrency: int, hashed_password: str) -> None:
+    hasher = PasswordHasher(hasher_concurrency) if hasher_concurrency else None
+    uvicorn.run(_app(hasher, hashed_password), port=PORT, log_level="warning")
+
+
+async def _run(
+    hasher_concurrency: int, hashed_password: str, duration: float, logins: int, pings: int
+) -> tuple[float, list[float]]:
+    server = multiprocessing.get_context("spawn").Process(target=_serve, args=(hasher_concurrency, hashed_password))
+    server.start()
+    logged_in = 0
+    ping_latencies: list[float] = []
+    limits = httpx.Limits(max_connections=logins + pings)
+
+    async with httpx.AsyncClient(base_url=f"http://127.0.0.1:{PORT}", limits=limits, timeout=60) as client:
+        while True:
+            try:
+                await client.get("/ping")
+                break
+            except httpx.TransportError:
+                await asyncio.sleep(0.1)
+
+        deadline = time.perf_counter() + duration
+
+        async def login() -> None:
+            nonlocal logged_in
+            while time.perf_counter() < deadline:
+                response = await client.post("/login")
+                assert response.json()["correct"]
+                logged_in += 1
+
+        async def ping() -> None:
+            while time.perf_counter() < deadline:
+                started = time.perf_counter()
+                await client.get("/ping")
+                ping_latencies.append(time.perf_counter() - started)
+                await asyncio.sleep(0.005)
+
+        started = time.perf_counter()
+        await asyncio.gather(*(login() for _ in range(logins)), *(ping() for _ in range(pings)))
+        elapsed = time.perf_counter() - started
+
+    server.terminate()
+    server.join()
+    return logged_in / elapsed, ping_latencies
+
+
+async def main(duration: float, logins: int, pings: int, concurrency: int, rounds: int) -> None:
+    hashed_password = bcrypt.hashpw(PASSWORD.encode(), bcrypt.gensalt(rounds)).decode()
+
+    print(f"{duration:.0f}s, {logins} login tasks, {pings} ping tasks, bcrypt cost {rounds}")
+    print(f"{'bcrypt':<20} {'logins/s':>9} {'ping p50 ms':>12} {'ping p99 ms':>12} {'pings':>7}")
+    for name, hasher_concurrency in (("inline", 0), (f"pool of {concurrency}", concurrency)):
+        throughput, latencies = await _run(hasher_concurrency, hashed_password, duration, logins, pings)
+        p50 = _percentile(latencies, 50) * 1000
+        p99 = _percentile(latencies, 99) * 1000
+        print(f"{name:<20} {throughput:>9.1f} {p50:>12.1f} {p99:>12.1f} {len(latencies):>7}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--duration", type=float, default=10.0, help="seconds per run")
+    parser.add_argument("--logins", type=int, default=16, help="concurrent login tasks")
+    parser.add_argument("--pings", type=int, default=16, help="concurrent tasks calling the trivial endpoint")
+    parser.add_argument("--concurrency", type=int, default=2, help="threads of the password hashing pool")
+    parser.add_argument("--rounds", type=int, default=12, help="bcrypt cost factor of the stored password")
+    args = parser.parse_args()
+
+    asyncio.run(main(args.duration, args.logins, args.pings, args.concurrency, args.rounds))
@@ -0,0 +1,102 @@
+"""Throughput of the rate limiting algorithms, in decisions per second against a Redis server.
+
+Each algorithm is driven by `--concurrency` tasks sharing one connection pool, spread over `--clients` keys so
+both allowed and limited decisions are measured. The fixed-window INCR + EXPIRE limiter used before is included
+for comparison, and every algorithm is also run through `HybridRateLimiter` with `--tolerance`, along with the
+number of commands Redis processed.
+
+Run from the `backend` folder against a disposable Redis database (it is flushed):
+
+    python -m benchmarks.rate_limit_algorithms --url redis://localhost:6379/15 --requests 50000 --tolerance 0.1
+"""
+
+import argparse
+import asyncio
+import functools
+import time
+from collections.abc import Callable
+
+import redis.asyncio as redis
+
+from src.app.core.utils.rate_limit import SCRIPTS, HybridRateLimiter, RateLimiter
+
+LIMIT = 100
+PERIOD = 60
+
+
+async def _fixed_window(client: redis.Redis, key: str) -> bool:
+    window_start = int(time.time()) // PERIOD * PERIOD
+    window_key = f"{key}:{window_start}"
+    current_count = await client.incr(window_key)
+    if current_count == 1:
+        await client.expire(window_key, PERIOD)
+    return current_count > LIMIT
+
+
+async def _commands(client: redis.Redis) -> int:
+    stats = await client.info("stats")
+    commands: int = stats["total_commands_processed"]
+    return commands
+
+
+async def _run(
+    client: redis.Redis,
+    limiter: RateLimiter | HybridRateLimiter | None,
+    requests: int,
+    concurrency: int,
+    clients: int,
+) -> tuple[float, int, int]:
+    algorithm = limiter.algorithm if limiter is not None else "fixed_window"
+    limited = 0
+
+    async def worker(offset: int) -> None:
+        nonlocal limited
+        for i in range(offset, requests, concurrency):
+            key = f"bench:{algorithm}:{i % clients}"
+            if limiter is None:
+                is_limited = await _fixed_window(client, key)
+            else:
+                is_limited = (await limiter.hit(client, key, LIMIT, PERIOD)).limited
+            limited += is_limited
+
+    commands = await _commands(client)
+    started = time.perf_counter()
+    await asyncio.gather(*(worker(offset) for offset in range(concurrency)))
+    throughput = requests / (time.perf_counter() - started)
+    return throughput, limited, await _commands(client) - commands - 1
+
+
+async def main(url: str, requests: int, concurrency: int, clients: int, tolerance: float) -> None:
+    client = redis.Redis.from_url(url, max_connections=concurrency)
+    limiters: dict[str, Callable[[], RateLimiter | HybridRateLimiter | None]] = {"fixed_window": lambda: None}
+    for algorithm in SCRIPTS:
+        limiters[algorithm] = functools.partial(RateLimiter, algorithm)
+    for algorithm in SCRIPTS:
+        limiters[f"{algorithm}+local"] = functools.partial(
+            lambda algorithm: HybridRateLimiter(RateLimiter(algorithm), tolerance), algorithm
+        )
+
+    try:
+        print(f"{requests} requests, {concurrency} concurrent, {clients} clients, limit {LIMIT}/{PERIOD}s")
+        print(f"{'algorithm':<22} {'decisions/s':>12} {'limited':>9} {'redis cmds':>11}")
+        for name, make_limiter in limiters.items():
+            await client.flushdb()
+            await _run(client, make_limiter(), min(requests, 1000), concurrency, clients)
+            await client.flushdb()
+            throughput, limited, commands = await _run(client, make_limiter(), requests, concurrency, clients)
+            print(f"{name:<22} {throughput:>12.0f} {limited:>9} {commands:>11}")
+    finally:
+        await client.flushdb()
+        await client.aclose()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--url", default="redis://localhost:6379/15", help="Redis database to use (it is flushed)")
+    parser.add_argument("--requests", type=int, default=50_000)
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--clients", type=int, default=200, help="distinct rate limited keys")
+    parser.add_argument("--tolerance", type=float, default=0.1, help="fraction of the limit leased per worker")
+    args = parser.parse_args()
+
+    asyncio.run(main(args.url, args.requests, args.concurrency, args.clients, args.tolerance))
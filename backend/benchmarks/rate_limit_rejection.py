@@ -0,0 +1,108 @@
+"""Cost of rejecting an over the limit request, with the `rate_limiter` dependency and with `RateLimitMiddleware`.
+
+Both approaches guard the same route and are driven in-process through httpx, with the bearer token of a user
+without a tier, until the client is over the default limit; then `--requests` rejected requests are timed. The
+dependency opens a database session, checks the token blacklist and looks the user up before calling Redis, while
+the middleware only verifies the token signature. The database queries and Redis commands of the timed requests are
+reported along with the latency.
+
+Run from the `backend` folder, with the database of `src/.env` reachable, against a disposable Redis database (it
+is flushed):
+
+    python -m benchmarks.rate_limit_rejection --url redis://localhost:6379/15 --requests 2000
+"""
+
+import argparse
+import asyncio
+import time
+from typing import Any
+
+import httpx
+import redis.asyncio as redis
+from fastapi import Depends, FastAPI
+from sqlalchemy import event
+
+from src.app.api.dependencies import rate_limiter
+from src.app.core.config import settings
+from src.app.core.db.database import async_engine
+from src.app.core.security import create_access_token
+from src.app.core.utils import rate_limit
+from src.app.middleware.rate_limit_middleware import RateLimitMiddleware
+
+PATH = "/bench/rate_limited"
+LIMIT = settings.DEFAULT_RATE_LIMIT_LIMIT
+PERIOD = settings.DEFAULT_RATE_LIMIT_PERIOD
+
+
+def _app(middleware: bool) -> FastAPI:
+    app = FastAPI()
+
+    @app.get(PATH, dependencies=[] if middleware else [Depends(rate_limiter)])
+    async def rate_limited() -> dict[str, str]:
+        return {"message": "ok"}
+
+    if middleware:
+        app.add_middleware(RateLimitMiddleware)
+    return app
+
+
+async def _commands(client: redis.Redis) -> int:
+    stats = await client.info("stats")
+    commands: int = stats["total_commands_processed"]
+    return commands
+
+
+async def _run(app: FastAPI, token: str, requests: int, queries: list[int]) -> tuple[float, float, int]:
+    headers = {"Authorization": f"Bearer {token}"}
+    transport = httpx.ASGITransport(app=app)  # type: ignore[arg-type]
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        for _ in range(LIMIT):
+            await client.get(PATH, headers=headers)
+
+        queries[0] = 0
+        commands = await _commands(rate_limit.client)
+        started = time.perf_counter()
+        for _ in range(requests):
+            response = await client.get(PATH, headers=headers)
+            assert response.status_code == 429, response.status_code
+        elapsed = time.perf_counter() - started
+
+    commands = await _commands(rate_limit.client) - commands - 1
+    return elapsed / requests * 1_000_000, queries[0] / requests, commands // requests
+
+
+async def main(url: str, requests: int) -> None:
+    rate_limit.client = redis.Redis.from_url(url)
+    rate_limit.policies.limits = {(0, "bench_rate_limited"): (LIMIT, PERIOD)}
+    rate_limit.policies.paths = frozenset(["bench_rate_limited"])
+    rate_limit.policies.loaded = True
+
+    queries = [0]
+
+    def count_query(*args: Any) -> None:
+        queries[0] += 1
+
+    event.listen(async_engine.sync_engine, "before_cursor_execute", count_query)
+    token = await create_access_token({"sub": "benchmarkuser"})
+
+    try:
+        print(f"{requests} rejected requests, limit {LIMIT}/{PERIOD}s")
+        print(f"{'approach':<12} {'µs/request':>11} {'db queries':>11} {'redis cmds':>11}")
+        for name, middleware in (("dependency", False), ("middleware", True)):
+            await rate_limit.client.flushdb()
+            latency, db_queries, commands = await _run(_app(middleware), token, requests, queries)
+            print(f"{name:<12} {latency:>11.0f} {db_queries:>11.1f} {commands:>11}")
+    finally:
+        event.remove(async_engine.sync_engine, "before_cursor_execute", count_query)
+        await rate_limit.client.flushdb()
+        await rate_limit.client.aclose()
+        await async_engine.dispose()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--url", default="redis://localhost:6379/15", help="Redis database to use (it is flushed)")
+    parser.add_argument("--requests", type=int, default=2000)
+    args = parser.parse_args()
+
+    asyncio.run(main(args.url, args.requests))
@@ -1,16 +1,14 @@
 from typing import Annotated, Any
 
-from fastapi import Depends, HTTPException, Request
+from fastapi import Depends, HTTPException, Request, Response
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from ..core.config import settings
 from ..core.db.database import async_get_db
 from ..core.exceptions.http_exceptions import ForbiddenException, RateLimitException, UnauthorizedException
 from ..core.logger import logging
-from ..core.security import oauth2_scheme, verify_token
-from ..core.utils.rate_limit import is_rate_limited
-from ..crud.crud_rate_limit import crud_rate_limits
-from ..crud.crud_tier import crud_tiers
+from ..core.security import oauth2_scheme, token_cache, verify_token
+from ..core.utils.rate_limit import check_rate_limit, policies, rate_limit_headers
 from ..crud.crud_users import crud_users
 from ..models.user import User
 from ..schemas.rate_limit import sanitize_path
@@ -28,12 +26,17 @@ async def get_current_user(
     if token_data is None:
         raise UnauthorizedException("User not authenticated.")
 
+    user = token_cache.get_user(token)
+    if user is not None:
+        return user
+
     if "@" in token_data.username_or_email:
-        user: dict | None = await crud_users.get(db=db, email=token_data.username_or_email, is_deleted=False)
+        user = await crud_users.get(db=db, email=token_data.username_or_email, is_deleted=False)
     else:
         user = await crud_users.get(db=db, username=token_data.username_or_email, is_deleted=False)
 
     if user:
+        token_cache.set_user(token, user)
         return user
 
     raise UnauthorizedException("User not authenticated.")
@@ -49,10 +52,6 @@ async def get_optional_user(request: Request, db: AsyncSession = Depends(async_g
         if token_type.lower() != "bearer" or not token_value:
             return None
 
-        token_data = await verify_token(token_value, db)
-        if token_data is None:
-            return None
-
         return await get_current_user(token_value, db=db)
 
     except HTTPException as http_exc:
@@ -73,19 +72,28 @@ async def get_current_superuser(current_user: Annotated[dict, Depends(get_curren
 
 
 async def rate_limiter(
-    request: Request, db: Annotated[AsyncSession, Depends(async_get_db)], user: User | None = Depends(get_optional_user)
+    request: Request,
+    response: Response,
+    db: Annotated[AsyncSession, Depends(async_get_db)],
+    user: User | None = Depends(get_optional_user),
 ) -> None:
+    if getattr(request.state, "rate_limit", None) is not None:
+        return
+
     path = sanitize_path(request.url.path)
+    if not policies.loaded:
+        await policies.load(db)
+
     if user:
-        user_id = user["id"]
-        tier = await crud_tiers.get(db, id=user["tier_id"])
-        if tier:
-            rate_limit = await crud_rate_limits.get(db=db, tier_id=tier["id"], path=path)
+        user_id = user["username"]
+        tier_name = policies.tiers.get(user["tier_id"])
+        if tier_name:
+            rate_limit = policies.get(user["tier_id"], path)
             if rate_limit:
-                limit, period = rate_limit["limit"], rate_limit["period"]
+                limit, period = rate_limit
             else:
                 logger.warning(
-                    f"User {user_id} with tier '{tier['name']}' has no specific rate limit for path '{path}'. \
+                    f"User {user_id} with tier '{tier_name}' has no specific rate limit for path '{path}'. \
                         Applying default rate limit."
                 )
                 limit, period = DEFAULT_LIMIT, DEFAULT_PERIOD
@@ -96,6 +104,11 @@ async def rate_limiter(
         user_id = request.client.host
         limit, period = DEFAULT_LIMIT, DEFAULT_PERIOD
 
-    is_limited = await is_rate_limited(db=db, user_id=user_id, path=path, limit=limit, period=period)
-    if is_limited:
-        raise RateLimitException("Rate limit exceeded.")
+    result = await check_rate_limit(user_id=user_id, path=path, limit=limit, period=period)
+    headers = rate_limit_headers(result)
+    if result.limited:
+        exception = RateLimitException("Rate limit exceeded.")
+        exception.headers = headers
+        raise exception
+
+    response.headers.update(headers)
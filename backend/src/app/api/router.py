@@ -0,0 +1,6 @@
+from fastapi import APIRouter
+
+from .v1.router import router as v1_router
+
+router = APIRouter(prefix="/api")
+router.include_router(v1_router)
@@ -0,0 +1,13 @@
+from typing import Any
+
+from fastapi import APIRouter, Response
+
+from ...core.security import jwt_signer
+
+router = APIRouter(tags=["login"])
+
+
+@router.get("/.well-known/jwks.json")
+async def read_jwks(response: Response) -> dict[str, list[dict[str, Any]]]:
+    response.headers["Cache-Control"] = "public, max-age=300"
+    return jwt_signer.jwks
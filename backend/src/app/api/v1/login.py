@@ -16,6 +16,8 @@ from ...core.security import (
     create_refresh_token,
     verify_token,
 )
+from ...crud.crud_users import crud_users
+from ...schemas.user import UserRead
 
 router = APIRouter(tags=["login"])
 
@@ -31,7 +33,9 @@ async def login_for_access_token(
         raise UnauthorizedException("Wrong username, email or password.")
 
     access_token_expires = timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES)
-    access_token = await create_access_token(data={"sub": user["username"]}, expires_delta=access_token_expires)
+    access_token = await create_access_token(
+        data={"sub": user["username"], "tier_id": user["tier_id"]}, expires_delta=access_token_expires
+    )
 
     refresh_token = await create_refresh_token(data={"sub": user["username"]})
     max_age = settings.REFRESH_TOKEN_EXPIRE_DAYS * 24 * 60 * 60
@@ -53,5 +57,7 @@ async def refresh_access_token(request: Request, db: AsyncSession = Depends(asyn
     if not user_data:
         raise UnauthorizedException("Invalid refresh token.")
 
-    new_access_token = await create_access_token(data={"sub": user_data.username_or_email})
+    db_user = await crud_users.get(db=db, username=user_data.username_or_email, schema_to_select=UserRead)
+    tier_id = db_user["tier_id"] if db_user else None
+    new_access_token = await create_access_token(data={"sub": user_data.username_or_email, "tier_id": tier_id})
     return {"access_token": new_access_token, "token_type": "bearer"}
@@ -1,9 +1,9 @@
 from fastapi import APIRouter, Depends, Response
-from jose import JWTError
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from ...core.db.database import async_get_db
 from ...core.exceptions.http_exceptions import UnauthorizedException
+from ...core.exceptions.jwt_exceptions import InvalidTokenError
 from ...core.security import blacklist_token, oauth2_scheme
 
 router = APIRouter(tags=["login"])
@@ -19,5 +19,5 @@ async def logout(
 
         return {"message": "Logged out successfully"}
 
-    except JWTError:
+    except InvalidTokenError:
         raise UnauthorizedException("Invalid token.")
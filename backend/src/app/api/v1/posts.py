@@ -44,6 +44,11 @@ async def write_post(
     key_prefix="{username}_posts:page_{page}:items_per_page:{items_per_page}",
     resource_id_name="username",
     expiration=60,
+    stale_ttl=30,
+    early_refresh_beta=1.0,
+    tags=["{username}_posts"],
+    raw_response=True,
+    track_access=True,
 )
 async def read_posts(
     request: Request,
@@ -70,7 +75,14 @@ async def read_posts(
 
 
 @router.get("/{username}/post/{id}", response_model=PostRead)
-@cache(key_prefix="{username}_post_cache", resource_id_name="id")
+@cache(
+    key_prefix="{username}_post_cache",
+    resource_id_name="id",
+    stale_ttl=300,
+    early_refresh_beta=1.0,
+    raw_response=True,
+    track_access=True,
+)
 async def read_post(
     request: Request, username: str, id: int, db: Annotated[AsyncSession, Depends(async_get_db)]
 ) -> dict:
@@ -88,7 +100,7 @@ async def read_post(
 
 
 @router.patch("/{username}/post/{id}")
-@cache("{username}_post_cache", resource_id_name="id", pattern_to_invalidate_extra=["{username}_posts:*"])
+@cache("{username}_post_cache", resource_id_name="id", tags_to_invalidate=["{username}_posts"])
 async def patch_post(
     request: Request,
     username: str,
@@ -113,7 +125,7 @@ async def patch_post(
 
 
 @router.delete("/{username}/post/{id}")
-@cache("{username}_post_cache", resource_id_name="id", to_invalidate_extra={"{username}_posts": "{username}"})
+@cache("{username}_post_cache", resource_id_name="id", tags_to_invalidate=["{username}_posts"])
 async def erase_post(
     request: Request,
     username: str,
@@ -138,7 +150,7 @@ async def erase_post(
 
 
 @router.delete("/{username}/db_post/{id}", dependencies=[Depends(get_current_superuser)])
-@cache("{username}_post_cache", resource_id_name="id", to_invalidate_extra={"{username}_posts": "{username}"})
+@cache("{username}_post_cache", resource_id_name="id", tags_to_invalidate=["{username}_posts"])
 async def erase_db_post(
     request: Request, username: str, id: int, db: Annotated[AsyncSession, Depends(async_get_db)]
 ) -> dict[str, str]:
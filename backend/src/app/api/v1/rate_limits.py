@@ -7,9 +7,18 @@ from sqlalchemy.ext.asyncio import AsyncSession
 from ...api.dependencies import get_current_superuser
 from ...core.db.database import async_get_db
 from ...core.exceptions.http_exceptions import DuplicateValueException, NotFoundException, RateLimitException
+from ...core.utils.rate_limit import policies, publish_policy_change, read_usage
 from ...crud.crud_rate_limit import crud_rate_limits
 from ...crud.crud_tier import crud_tiers
-from ...schemas.rate_limit import RateLimitCreate, RateLimitCreateInternal, RateLimitRead, RateLimitUpdate
+from ...crud.crud_users import crud_users
+from ...schemas.rate_limit import (
+    RateLimitCreate,
+    RateLimitCreateInternal,
+    RateLimitRead,
+    RateLimitUpdate,
+    RateLimitUsage,
+)
+from ...schemas.user import UserRead
 
 router = APIRouter(tags=["rate_limits"])
 
@@ -31,6 +40,7 @@ async def write_rate_limit(
 
     rate_limit_internal = RateLimitCreateInternal(**rate_limit_internal_dict)
     created_rate_limit: RateLimitRead = await crud_rate_limits.create(db=db, object=rate_limit_internal)
+    await publish_policy_change()
     return created_rate_limit
 
 
@@ -100,6 +110,7 @@ async def patch_rate_limit(
         raise DuplicateValueException("There is already a rate limit with this name")
 
     await crud_rate_limits.update(db=db, object=values, id=db_rate_limit["id"])
+    await publish_policy_change()
     return {"message": "Rate Limit updated"}
 
 
@@ -116,4 +127,38 @@ async def erase_rate_limit(
         raise NotFoundException("Rate Limit not found")
 
     await crud_rate_limits.delete(db=db, id=db_rate_limit["id"])
+    await publish_policy_change()
     return {"message": "Rate Limit deleted"}
+
+
+@router.get(
+    "/user/{username}/rate_limits/usage",
+    response_model=list[RateLimitUsage],
+    dependencies=[Depends(get_current_superuser)],
+)
+async def read_user_rate_limit_usage(
+    request: Request, username: str, db: Annotated[AsyncSession, Depends(async_get_db)]
+) -> list[dict[str, Any]]:
+    db_user: dict | None = await crud_users.get(db=db, username=username, schema_to_select=UserRead)
+    if db_user is None:
+        raise NotFoundException("User not found")
+
+    if db_user["tier_id"] is None:
+        return []
+
+    if not policies.loaded:
+        await policies.load(db)
+
+    limits = policies.for_tier(db_user["tier_id"])
+    usage = await read_usage(db_user["username"], limits)
+    return [
+        {
+            "path": path,
+            "limit": result.limit,
+            "period": limits[path][1],
+            "remaining": result.remaining,
+            "reset_after": result.reset_after,
+            "retry_after": result.retry_after,
+        }
+        for path, result in usage.items()
+    ]
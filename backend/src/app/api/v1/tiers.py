@@ -7,6 +7,7 @@ from sqlalchemy.ext.asyncio import AsyncSession
 from ...api.dependencies import get_current_superuser
 from ...core.db.database import async_get_db
 from ...core.exceptions.http_exceptions import DuplicateValueException, NotFoundException
+from ...core.utils.rate_limit import publish_policy_change
 from ...crud.crud_tier import crud_tiers
 from ...schemas.tier import TierCreate, TierCreateInternal, TierRead, TierUpdate
 
@@ -24,6 +25,7 @@ async def write_tier(
 
     tier_internal = TierCreateInternal(**tier_internal_dict)
     created_tier: TierRead = await crud_tiers.create(db=db, object=tier_internal)
+    await publish_policy_change()
     return created_tier
 
 
@@ -57,6 +59,7 @@ async def patch_tier(
         raise NotFoundException("Tier not found")
 
     await crud_tiers.update(db=db, object=values, name=name)
+    await publish_policy_change()
     return {"message": "Tier updated"}
 
 
@@ -67,4 +70,5 @@ async def erase_tier(request: Request, name: str, db: Annotated[AsyncSession, De
         raise NotFoundException("Tier not found")
 
     await crud_tiers.delete(db=db, name=name)
+    await publish_policy_change()
     return {"message": "Tier deleted"}
@@ -7,7 +7,7 @@ from sqlalchemy.ext.asyncio import AsyncSession
 from ...api.dependencies import get_current_superuser, get_current_user
 from ...core.db.database import async_get_db
 from ...core.exceptions.http_exceptions import DuplicateValueException, ForbiddenException, NotFoundException
-from ...core.security import blacklist_token, get_password_hash, oauth2_scheme
+from ...core.security import blacklist_token, get_password_hash, invalidate_user, oauth2_scheme
 from ...crud.crud_rate_limit import crud_rate_limits
 from ...crud.crud_tier import crud_tiers
 from ...crud.crud_users import crud_users
@@ -31,7 +31,7 @@ async def write_user(
         raise DuplicateValueException("Username not available")
 
     user_internal_dict = user.model_dump()
-    user_internal_dict["hashed_password"] = get_password_hash(password=user_internal_dict["password"])
+    user_internal_dict["hashed_password"] = await get_password_hash(password=user_internal_dict["password"])
     del user_internal_dict["password"]
 
     user_internal = UserCreateInternal(**user_internal_dict)
@@ -97,6 +97,7 @@ async def patch_user(
             raise DuplicateValueException("Email is already registered")
 
     await crud_users.update(db=db, object=values, username=username)
+    await invalidate_user(username)
     return {"message": "User updated"}
 
 
@@ -116,6 +117,7 @@ async def erase_user(
         raise ForbiddenException()
 
     await crud_users.delete(db=db, username=username)
+    await invalidate_user(username)
     await blacklist_token(token=token, db=db)
     return {"message": "User deleted"}
 
@@ -132,6 +134,7 @@ async def erase_db_user(
         raise NotFoundException("User not found")
 
     await crud_users.db_delete(db=db, username=username)
+    await invalidate_user(username)
     await blacklist_token(token=token, db=db)
     return {"message": "User deleted from the database"}
 
@@ -196,4 +199,5 @@ async def patch_user_tier(
         raise NotFoundException("Tier not found")
 
     await crud_users.update(db=db, object=values, username=username)
+    await invalidate_user(username)
     return {"message": f"User {db_user['name']} Tier updated"}
@@ -1,19 +1,39 @@
-from fastapi import APIRouter, HTTPException
-from fastapi.responses import FileResponse
+from arq.jobs import Job as ArqJob, JobStatus
+from fastapi import APIRouter, HTTPException, Request, Response
+from fastapi.responses import StreamingResponse
 from pydantic import BaseModel
-from enum import Enum
+from enum import Enum, StrEnum
 import yt_dlp
 import os
-import tempfile
-import shutil
-from starlette.background import BackgroundTask
 from urllib.parse import quote
 import asyncio
-from functools import partial
+import re
 from ..websocket import YoutubeDownloadProgressHook
+from ....core.exceptions.http_exceptions import CustomException, NotFoundException
+from ....core.config import settings
+from ....core.logger import logging
+from ....core.utils import queue
+from ....core.utils.download_cache import Artifact, DownloadCache, artifact_key
+from ....core.utils.file_responses import RangeFileResponse
+from ....core.utils.downloads import (
+    MEDIA_TYPES,
+    Downloader,
+    download_options,
+    find_output,
+    follow_download,
+    open_download,
+    stream_options,
+)
+from ....schemas.job import Job
+
+logger = logging.getLogger(__name__)
 
 router = APIRouter(tags=["utils"])
 
+download_cache = DownloadCache(settings.YOUTUBE_DOWNLOAD_DIR, settings.YOUTUBE_DOWNLOAD_CACHE_SIZE_MB * 1024 * 1024)
+downloader = Downloader(settings.YOUTUBE_DOWNLOAD_CONCURRENCY, settings.YOUTUBE_DOWNLOAD_TIMEOUT)
+ARTIFACT_KEY = re.compile("[0-9a-f]{64}")
+
 class Resolution(str, Enum):
     R360 = "360p"
     R480 = "480p"
@@ -24,157 +44,209 @@ class Format(str, Enum):
     MP4 = "mp4"
     MP3 = "mp3"
 
+class StreamFormat(StrEnum):
+    MP4 = "mp4"
+    M4A = "m4a"
+
 class YouTubeURL(BaseModel):
     url: str
     resolution: str
     format: Format
 
+class YouTubeDownloadJob(YouTubeURL):
+    client_id: str | None = None
+
 class DownloadResponse(BaseModel):
     status: str
     file_path: str
     title: str
     
 
+def _content_disposition(title: str, file_extension: str) -> str:
+    return f"attachment; filename*=UTF-8''{quote(title)}{file_extension}"
+
+
+def _artifact_response(path: str, media_type: str, headers: dict[str, str]) -> Response:
+    """Serve a downloaded file with range requests, or hand it to nginx if `YOUTUBE_DOWNLOAD_ACCEL_REDIRECT` is set.
+
+    Files evicted or swept from the download cache since they were looked up are answered with a 404.
+    """
+    if not os.path.exists(path):
+        raise NotFoundException("Downloaded file is no longer available.")
+
+    if settings.YOUTUBE_DOWNLOAD_ACCEL_REDIRECT is None:
+        return RangeFileResponse(path=path, media_type=media_type, headers=headers)
+
+    relative_path = os.path.relpath(path, settings.YOUTUBE_DOWNLOAD_DIR)
+    location = f"{settings.YOUTUBE_DOWNLOAD_ACCEL_REDIRECT.rstrip('/')}/{quote(relative_path)}"
+    return Response(media_type=media_type, headers={**headers, "X-Accel-Redirect": location})
+
+
+@router.post("/youtube-download", response_model=Job, status_code=202)
+async def enqueue_download(video: YouTubeDownloadJob) -> dict[str, str]:
+    """Download a video in the worker, sending its progress to the WebSocket of `client_id` if given.
+
+    The file is fetched from `GET /youtube-download/{job_id}/file` once the job is complete, which the WebSocket
+    tells with a `finished` message.
+    """
+    job = await queue.pool.enqueue_job(  # type: ignore
+        "download_youtube_video", video.url, video.resolution, video.format.value, video.client_id
+    )
+    return {"id": job.job_id}
+
+
+@router.get("/youtube-download/{job_id}/file")
+async def read_downloaded_file(job_id: str) -> Response:
+    """Serve the file of a complete download job, for as long as it stays in the download cache.
+
+    Range requests are supported, so interrupted downloads can be resumed.
+    """
+    job = ArqJob(job_id, queue.pool)
+    status = await job.status()
+    if status == JobStatus.not_found:
+        raise NotFoundException("Download not found.")
+    if status != JobStatus.complete:
+        raise CustomException(status_code=409, detail=f"Download is {status.value}.")
+
+    result = await job.result_info()
+    if result is None or not result.success:
+        raise CustomException(status_code=500, detail=f"Download failed: {result.result if result else 'unknown'}")
+
+    file_extension = os.path.splitext(result.result["path"])[1]
+    return _artifact_response(
+        result.result["path"],
+        result.result["media_type"],
+        {"Content-Disposition": _content_disposition(result.result["title"], file_extension)},
+    )
+
+
+@router.get("/youtube-artifacts/{key}")
+async def read_artifact(key: str) -> Response:
+    """Serve a downloaded file by the key in the `Content-Location` header of the download, while it is cached.
+
+    Range requests are supported, so that interrupted downloads can be resumed without downloading the video again.
+    """
+    artifact = download_cache.get(key) if ARTIFACT_KEY.fullmatch(key) else None
+    if artifact is None:
+        raise NotFoundException("Downloaded file is no longer available.")
+
+    file_extension = os.path.splitext(artifact.path)[1]
+    headers = {"Content-Disposition": _content_disposition(artifact.title, file_extension)}
+    return _artifact_response(artifact.path, artifact.media_type, headers)
+
+
+@router.get("/youtube-stream")
+async def stream_video(
+    request: Request, url: str, resolution: Resolution = Resolution.R360, format: StreamFormat = StreamFormat.MP4
+) -> Response:
+    """Send a video as a progressive mp4, or its audio as m4a, while it is being downloaded.
+
+    Nothing is merged into or converted from these files, so their bytes are sent as yt-dlp writes them, without
+    a Content-Length. The response is cut short if the download fails. YouTube only offers progressive mp4 files up
+    to 360p for most videos, higher resolutions fall back to the best one. Cached files, and files being downloaded
+    by another process, are sent once complete.
+    """
+    key = artifact_key(url, stream_options(resolution.value, format.value, ""))
+    content_location = str(request.url_for("read_artifact", key=key))
+
+    async def fetch(output_dir: str) -> Artifact:
+        info = await downloader.download(url, stream_options(resolution.value, format.value, output_dir))
+        return Artifact(find_output(output_dir, format.value), info.get("title", "video"), MEDIA_TYPES[format.value])
+
+    download = asyncio.ensure_future(download_cache.get_or_download(key, fetch))
+    file = await open_download(lambda: download_cache.downloading(key), format.value, download)
+    if file is None:
+        try:
+            artifact = await download
+        except Exception as e:
+            raise CustomException(status_code=500, detail=f"Download failed: {e}")
+        file_extension = os.path.splitext(artifact.path)[1]
+        return _artifact_response(
+            artifact.path,
+            artifact.media_type,
+            {
+                "Content-Disposition": _content_disposition(artifact.title, file_extension),
+                "Content-Location": content_location,
+            },
+        )
+
+    return StreamingResponse(
+        follow_download(file, download),
+        media_type=MEDIA_TYPES[format.value],
+        headers={
+            "Content-Disposition": _content_disposition(*os.path.splitext(os.path.basename(file.name))),
+            "Content-Location": content_location,
+        },
+    )
+
+
 @router.post("/youtube-download/{client_id}")
-async def download_video(video: YouTubeURL, client_id: str):
-    temp_dir = None
+async def download_video(video: YouTubeURL, client_id: str, request: Request):
     try:
-        temp_dir = tempfile.mkdtemp()
-
-        # 해상도에 따른 format 문자열 설정    
-        format_strings = {
-            Resolution.R360: 'bestvideo[height<=360][ext=mp4][vcodec^=avc1]+bestaudio[ext=m4a]/best[height<=360][ext=mp4][vcodec^=avc1]',
-            Resolution.R480: 'bestvideo[height<=480][ext=mp4][vcodec^=avc1]+bestaudio[ext=m4a]/best[height<=480][ext=mp4][vcodec^=avc1]',
-            Resolution.R720: 'bestvideo[height<=720][ext=mp4][vcodec^=avc1]+bestaudio[ext=m4a]/best[height<=720][ext=mp4][vcodec^=avc1]',
-            Resolution.R1080: 'bestvideo[height<=1080][ext=mp4][vcodec^=avc1]+bestaudio[ext=m4a]/best[height<=1080][ext=mp4][vcodec^=avc1]'
-        }
-        # 기본 다운로드 옵션
-        base_opts = {
-            'outtmpl': os.path.join(temp_dir, '%(title)s.%(ext)s'),
-            'quiet': True,
-            'no_warnings': True,
-            'extract_flat': True,
-        }
-
         # progress_hook 인스턴스 생성
         progress_hook = YoutubeDownloadProgressHook(client_id, video.format == Format.MP3)
 
-        if video.format == Format.MP3:
-            # MP3 다운로드 옵션
-            download_opts = {
-                **base_opts,
-                'format': 'bestaudio[ext=m4a]/best',
-                'progress_hooks': [progress_hook.progress_hook],
-                'postprocessors': [{
-                    'key': 'FFmpegExtractAudio',
-                    'preferredcodec': 'mp3',
-                    'preferredquality': '192',
-                }],
-            }
-        else:
-            # MP4 다운로드 옵션
-            download_opts = {
-                **base_opts,
-                'format': format_strings.get(video.resolution, format_strings[Resolution.R360]),
-                'progress_hooks': [progress_hook.progress_hook],
-                'postprocessor_args': {
-                    'ffmpeg': [
-                        '-c:v', 'copy',
-                        '-c:a', 'copy',
-                        '-movflags', '+faststart'
-                    ]
-                },
-                'merge_output_format': 'mp4'
-            }
-
         # progress_hook = YoutubeDownloadProgressHook(client_id)
         # download_opts['progress_hooks'] = [progress_hook.progress_hook]
         
-        # 다운로드 함수를 별도로 정의
-        async def download():
-            loop = asyncio.get_event_loop()
-            with yt_dlp.YoutubeDL(download_opts) as ydl:
-                # run_in_executor를 사용하여 비동기적으로 실행
-                return await loop.run_in_executor(
-                    None, 
-                    partial(ydl.extract_info, str(video.url), download=True)
-                )
-
-        # 타임아웃 설정 (예: 5분)
-        try:
-            info = await asyncio.wait_for(download(), timeout=300)  # 300초 = 5분
-        except asyncio.TimeoutError:
-            if temp_dir and os.path.exists(temp_dir):
-                shutil.rmtree(temp_dir)
-            raise HTTPException(
-                status_code=408,
-                detail="Download timed out after 1 minute"
+        # 캐시에 없을 때만 호출되는 다운로드 함수
+        async def fetch(output_dir: str) -> Artifact:
+            download_opts = download_options(
+                video.resolution, video.format.value, output_dir, [progress_hook.progress_hook]
+            )
+
+            # 전용 스레드 풀에서 다운로드, 시간 초과 시 yt-dlp 스레드도 멈춘 뒤에 실패
+            try:
+                info = await downloader.download(str(video.url), download_opts)
+            except TimeoutError as e:
+                raise HTTPException(status_code=408, detail=str(e))
+
+            return Artifact(
+                find_output(output_dir, video.format.value),
+                info.get('title', 'video'),
+                MEDIA_TYPES[video.format.value],
             )
 
-        title = info.get('title', 'video')
+        # 같은 영상, 해상도, 포맷은 한 번만 다운로드
+        key = artifact_key(str(video.url), download_options(video.resolution, video.format.value, ""))
+        artifact = await download_cache.get_or_download(key, fetch)
+
+        title = artifact.title
         # UTF-8로 인코딩된 파일명으로 헤더 설정
         encoded_title = quote(title)
         
         # 파일 확장자 동적 처리
         file_extension = '.mp3' if video.format == Format.MP3 else '.mp4'
-        downloaded_files = [f for f in os.listdir(temp_dir) if f.endswith(file_extension)]
-        
-        if not downloaded_files:
-            raise HTTPException(
-                status_code=500,
-                detail=f"Download failed: No {file_extension} file found"
-            )
         
         # 실제 다운로드된 파일의 경로
-        actual_file = os.path.join(temp_dir, downloaded_files[0])
-        
-        if not os.path.exists(actual_file):
-            raise HTTPException(
-                status_code=500,
-                detail="Download failed: File not found after download"
-            )
+        actual_file = artifact.path
         
-        # 안전한 출력 파일명 생성
+        # 안전한 출력 파일명 생성 (UTF-8 파일명을 지원하지 않는 클라이언트용)
         
-        safe_title = "".join(c for c in title if c.isalnum() or c in ('-', '_')).strip()
+        safe_title = "".join(c for c in title if c.isascii() and (c.isalnum() or c in ('-', '_'))).strip()
         if not safe_title:
             safe_title = "video"
         
         # 파일명 생성 시 format 반영
         safe_filename = f"{safe_title}_{video.resolution if video.format == Format.MP4 else 'audio'}{file_extension}"
-        safe_path = os.path.join(temp_dir, safe_filename)
-        shutil.copy2(actual_file, safe_path)
-        
-        def cleanup_temp_dir():
-            try:
-                if temp_dir and os.path.exists(temp_dir):
-                    shutil.rmtree(temp_dir)
-                    print(f"Cleaned up temp directory: {temp_dir}")
-            except Exception as e:
-                print(f"Failed to clean up temp directory: {str(e)}")
-        
 
+        # 파일은 복사하지 않고 캐시에서 바로 전송, 파일명은 헤더로만 지정
         headers = {
-            'Content-Disposition': f'attachment; filename*=UTF-8\'\'{encoded_title}{file_extension}'
+            'Content-Disposition': (
+                f'attachment; filename="{safe_filename}"; filename*=UTF-8\'\'{encoded_title}{file_extension}'
+            ),
+            # 중단된 다운로드는 이 주소에서 Range 요청으로 이어받기
+            'Content-Location': str(request.url_for("read_artifact", key=key)),
         }
         
-        return FileResponse(
-            path=safe_path,
-            filename=safe_filename,
-            media_type='audio/mpeg' if video.format == Format.MP3 else 'video/mp4',
-            headers=headers,
-            background=BackgroundTask(cleanup_temp_dir)
-        )
+        # Range/조건부 요청 처리, 설정 시 nginx로 전송 위임, 그 사이 삭제된 파일은 404
+        return _artifact_response(actual_file, artifact.media_type, headers)
+
+    except HTTPException:
+        raise
 
     except Exception as e:
-        print(f"Error details: {str(e)}")
-        if temp_dir and os.path.exists(temp_dir):
-            print(f"Temp directory contents: {os.listdir(temp_dir)}")
-            try:
-                shutil.rmtree(temp_dir)
-                print(f"Cleaned up temp directory on error: {temp_dir}")
-            except Exception as cleanup_error:
-                print(f"Failed to clean up temp directory: {str(cleanup_error)}")
+        logger.exception(f"Download of {video.url} failed: {e}")
         raise HTTPException(
             status_code=500,
             detail=f"Download failed: {str(e)}"
@@ -98,9 +98,33 @@ class WebSocketManager:
                 logger.error(f"Failed to send progress: {str(e)}")
                 self.disconnect(client_id)
 
+    async def send_message(self, client_id: str, message: Dict):
+        """Send a message right away, without throttling"""
+        if client_id not in self.active_connections:
+            return
+
+        try:
+            await self.active_connections[client_id].send_json(message)
+        except Exception as e:
+            logger.error(f"Failed to send message: {str(e)}")
+            self.disconnect(client_id)
+
 # 전역 WebSocket 매니저 인스턴스
 ws_manager = WebSocketManager()
 
+
+async def relay_download_event(event: Dict):
+    """Send an event published by a download job of the worker to its client, if connected to this process"""
+    client_id = event["client_id"]
+    if event["event"] == "progress":
+        progress = DownloadProgress.from_yt_dlp_data(event["data"], event["is_mp3"])
+        if progress:
+            await ws_manager.send_progress(client_id, progress)
+        return
+
+    message = {k: v for k, v in event.items() if k not in ("event", "client_id", "is_mp3")}
+    await ws_manager.send_message(client_id, {**message, "status": event["event"]})
+
 class YoutubeDownloadProgressHook:
     def __init__(self, client_id: str, is_mp3: bool = False):
         self.client_id = client_id
@@ -0,0 +1,7 @@
+"""Registry of the endpoints decorated with `cache(track_access=True)`.
+
+Importing this module registers them for `cache.warm` without assembling the routers, so the worker does not import
+the other endpoints and their module state. Import the module of any new tracked endpoint here.
+"""
+
+from .v1 import posts  # noqa: F401
@@ -1,4 +1,5 @@
 import os
+import tempfile
 from enum import Enum
 
 from pydantic_settings import BaseSettings
@@ -21,8 +22,14 @@ class AppSettings(BaseSettings):
 class CryptSettings(BaseSettings):
     SECRET_KEY: str = config("SECRET_KEY")
     ALGORITHM: str = config("ALGORITHM", default="HS256")
+    JWT_BACKEND: str = config("JWT_BACKEND", default="jose")
+    JWT_KEYS_DIR: str | None = config("JWT_KEYS_DIR", default=None)
+    JWT_KEY_ID: str | None = config("JWT_KEY_ID", default=None)
     ACCESS_TOKEN_EXPIRE_MINUTES: int = config("ACCESS_TOKEN_EXPIRE_MINUTES", default=30)
     REFRESH_TOKEN_EXPIRE_DAYS: int = config("REFRESH_TOKEN_EXPIRE_DAYS", default=7)
+    TOKEN_CACHE_MAX_SIZE: int = config("TOKEN_CACHE_MAX_SIZE", default=10000)
+    TOKEN_CACHE_TTL: int = config("TOKEN_CACHE_TTL", default=60)
+    PASSWORD_HASH_CONCURRENCY: int = config("PASSWORD_HASH_CONCURRENCY", default=2)
 
 
 class DatabaseSettings(BaseSettings):
@@ -74,6 +81,17 @@ class RedisCacheSettings(BaseSettings):
     REDIS_CACHE_HOST: str = config("REDIS_CACHE_HOST", default="localhost")
     REDIS_CACHE_PORT: int = config("REDIS_CACHE_PORT", default=6379)
     REDIS_CACHE_URL: str = f"redis://{REDIS_CACHE_HOST}:{REDIS_CACHE_PORT}"
+    REDIS_CACHE_CLUSTER: bool = config("REDIS_CACHE_CLUSTER", default=False)
+    CACHE_LOCAL_ENABLED: bool = config("CACHE_LOCAL_ENABLED", default=False)
+    CACHE_LOCAL_MAX_SIZE: int = config("CACHE_LOCAL_MAX_SIZE", default=1024)
+    CACHE_LOCAL_TTL: int = config("CACHE_LOCAL_TTL", default=5)
+    CACHE_INVALIDATION_CHANNEL: str = config("CACHE_INVALIDATION_CHANNEL", default="cache:invalidation")
+    CACHE_CODEC: str = config("CACHE_CODEC", default="json")
+    CACHE_COMPRESSION: str = config("CACHE_COMPRESSION", default="none")
+    CACHE_COMPRESSION_MIN_SIZE: int = config("CACHE_COMPRESSION_MIN_SIZE", default=4096)
+    CACHE_WARMING_ENABLED: bool = config("CACHE_WARMING_ENABLED", default=False)
+    CACHE_WARMING_TOP_KEYS: int = config("CACHE_WARMING_TOP_KEYS", default=100)
+    CACHE_WARMING_CONCURRENCY: int = config("CACHE_WARMING_CONCURRENCY", default=4)
 
 
 class ClientSideCacheSettings(BaseSettings):
@@ -89,6 +107,28 @@ class RedisRateLimiterSettings(BaseSettings):
     REDIS_RATE_LIMIT_HOST: str = config("REDIS_RATE_LIMIT_HOST", default="localhost")
     REDIS_RATE_LIMIT_PORT: int = config("REDIS_RATE_LIMIT_PORT", default=6379)
     REDIS_RATE_LIMIT_URL: str = f"redis://{REDIS_RATE_LIMIT_HOST}:{REDIS_RATE_LIMIT_PORT}"
+    RATE_LIMIT_ALGORITHM: str = config("RATE_LIMIT_ALGORITHM", default="sliding_window")
+    RATE_LIMIT_LOCAL_TOLERANCE: float = config("RATE_LIMIT_LOCAL_TOLERANCE", default=0.0)
+    RATE_LIMIT_MIDDLEWARE: bool = config("RATE_LIMIT_MIDDLEWARE", default=False)
+
+
+class RedisTokenBlacklistSettings(BaseSettings):
+    REDIS_TOKEN_BLACKLIST_HOST: str = config("REDIS_TOKEN_BLACKLIST_HOST", default="localhost")
+    REDIS_TOKEN_BLACKLIST_PORT: int = config("REDIS_TOKEN_BLACKLIST_PORT", default=6379)
+    REDIS_TOKEN_BLACKLIST_URL: str = f"redis://{REDIS_TOKEN_BLACKLIST_HOST}:{REDIS_TOKEN_BLACKLIST_PORT}"
+    TOKEN_BLACKLIST_BLOOM_CAPACITY: int = config("TOKEN_BLACKLIST_BLOOM_CAPACITY", default=100000)
+    TOKEN_BLACKLIST_BLOOM_ERROR_RATE: float = config("TOKEN_BLACKLIST_BLOOM_ERROR_RATE", default=0.001)
+
+
+class YoutubeDownloadSettings(BaseSettings):
+    YOUTUBE_DOWNLOAD_DIR: str = config(
+        "YOUTUBE_DOWNLOAD_DIR", default=os.path.join(tempfile.gettempdir(), "youtube_downloads")
+    )
+    YOUTUBE_DOWNLOAD_CONCURRENCY: int = config("YOUTUBE_DOWNLOAD_CONCURRENCY", default=2)
+    YOUTUBE_DOWNLOAD_TIMEOUT: int = config("YOUTUBE_DOWNLOAD_TIMEOUT", default=300)
+    YOUTUBE_DOWNLOAD_CACHE_SIZE_MB: int = config("YOUTUBE_DOWNLOAD_CACHE_SIZE_MB", default=10240)
+    YOUTUBE_DOWNLOAD_CACHE_TTL: int = config("YOUTUBE_DOWNLOAD_CACHE_TTL", default=86400)
+    YOUTUBE_DOWNLOAD_ACCEL_REDIRECT: str | None = config("YOUTUBE_DOWNLOAD_ACCEL_REDIRECT", default=None)
 
 
 class DefaultRateLimitSettings(BaseSettings):
@@ -96,6 +136,11 @@ class DefaultRateLimitSettings(BaseSettings):
     DEFAULT_RATE_LIMIT_PERIOD: int = config("DEFAULT_RATE_LIMIT_PERIOD", default=3600)
 
 
+class MetricsSettings(BaseSettings):
+    METRICS_ENABLED: bool = config("METRICS_ENABLED", default=False)
+    METRICS_PATH: str = config("METRICS_PATH", default="/metrics")
+
+
 class EnvironmentOption(Enum):
     LOCAL = "local"
     STAGING = "staging"
@@ -116,7 +161,10 @@ class Settings(
     ClientSideCacheSettings,
     RedisQueueSettings,
     RedisRateLimiterSettings,
+    RedisTokenBlacklistSettings,
+    YoutubeDownloadSettings,
     DefaultRateLimitSettings,
+    MetricsSettings,
     EnvironmentSettings,
 ):
     pass
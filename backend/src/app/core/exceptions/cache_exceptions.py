@@ -14,3 +14,9 @@ class MissingClientError(Exception):
     def __init__(self, message: str = "Client is None.") -> None:
         self.message = message
         super().__init__(self.message)
+
+
+class InvalidCodecError(Exception):
+    def __init__(self, message: str = "Cache codec not supported.") -> None:
+        self.message = message
+        super().__init__(self.message)
@@ -0,0 +1,10 @@
+class InvalidTokenError(Exception):
+    def __init__(self, message: str = "Token could not be verified.") -> None:
+        self.message = message
+        super().__init__(self.message)
+
+
+class InvalidJWTConfigError(Exception):
+    def __init__(self, message: str = "JWT configuration not supported.") -> None:
+        self.message = message
+        super().__init__(self.message)
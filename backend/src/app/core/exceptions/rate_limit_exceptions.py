@@ -0,0 +1,4 @@
+class InvalidRateLimitAlgorithmError(Exception):
+    def __init__(self, message: str = "Rate limit algorithm not supported.") -> None:
+        self.message = message
+        super().__init__(self.message)
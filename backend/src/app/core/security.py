@@ -1,15 +1,19 @@
+import uuid
 from datetime import UTC, datetime, timedelta
 from typing import Any, Literal
 
-import bcrypt
 from fastapi.security import OAuth2PasswordBearer
-from jose import JWTError, jwt
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from ..crud.crud_users import crud_users
 from .config import settings
 from .db.crud_token_blacklist import crud_token_blacklist
+from .exceptions.jwt_exceptions import InvalidTokenError
 from .schemas import TokenBlacklistCreate, TokenData
+from .utils import token_blacklist
+from .utils.jwt_backends import get_signer
+from .utils.password_hashing import PasswordHasher
+from .utils.token_cache import VerifiedTokenCache, publish_user_change
 
 SECRET_KEY = settings.SECRET_KEY
 ALGORITHM = settings.ALGORITHM
@@ -17,16 +21,23 @@ ACCESS_TOKEN_EXPIRE_MINUTES = settings.ACCESS_TOKEN_EXPIRE_MINUTES
 REFRESH_TOKEN_EXPIRE_DAYS = settings.REFRESH_TOKEN_EXPIRE_DAYS
 
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/api/v1/login")
+token_cache = VerifiedTokenCache(max_size=settings.TOKEN_CACHE_MAX_SIZE, ttl=settings.TOKEN_CACHE_TTL)
+password_hasher = PasswordHasher(concurrency=settings.PASSWORD_HASH_CONCURRENCY)
+jwt_signer = get_signer(
+    backend=settings.JWT_BACKEND,
+    algorithm=ALGORITHM,
+    secret_key=SECRET_KEY,
+    keys_dir=settings.JWT_KEYS_DIR,
+    key_id=settings.JWT_KEY_ID,
+)
 
 
 async def verify_password(plain_password: str, hashed_password: str) -> bool:
-    correct_password: bool = bcrypt.checkpw(plain_password.encode(), hashed_password.encode())
-    return correct_password
+    return await password_hasher.verify(plain_password, hashed_password)
 
 
-def get_password_hash(password: str) -> str:
-    hashed_password: str = bcrypt.hashpw(password.encode(), bcrypt.gensalt()).decode()
-    return hashed_password
+async def get_password_hash(password: str) -> str:
+    return await password_hasher.hash(password)
 
 
 async def authenticate_user(username_or_email: str, password: str, db: AsyncSession) -> dict[str, Any] | Literal[False]:
@@ -50,8 +61,8 @@ async def create_access_token(data: dict[str, Any], expires_delta: timedelta | N
         expire = datetime.now(UTC).replace(tzinfo=None) + expires_delta
     else:
         expire = datetime.now(UTC).replace(tzinfo=None) + timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES)
-    to_encode.update({"exp": expire})
-    encoded_jwt: str = jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
+    to_encode.update({"exp": expire, "jti": uuid.uuid4().hex})
+    encoded_jwt: str = jwt_signer.encode(to_encode)
     return encoded_jwt
 
 
@@ -61,8 +72,8 @@ async def create_refresh_token(data: dict[str, Any], expires_delta: timedelta |
         expire = datetime.now(UTC).replace(tzinfo=None) + expires_delta
     else:
         expire = datetime.now(UTC).replace(tzinfo=None) + timedelta(days=REFRESH_TOKEN_EXPIRE_DAYS)
-    to_encode.update({"exp": expire})
-    encoded_jwt: str = jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
+    to_encode.update({"exp": expire, "jti": uuid.uuid4().hex})
+    encoded_jwt: str = jwt_signer.encode(to_encode)
     return encoded_jwt
 
 
@@ -80,23 +91,49 @@ async def verify_token(token: str, db: AsyncSession) -> TokenData | None:
     -------
     TokenData | None
         TokenData instance if the token is valid, None otherwise.
+
+    Note
+    ----
+        - The verified claims are kept in `token_cache`, so a token is only decoded once in a while.
+        - With a Redis token blacklist, tokens are looked up by id in an in-process Bloom filter first, so most
+        valid tokens are verified without any I/O. Otherwise, or until its rows were moved to Redis at startup, the
+        `token_blacklist` table is queried.
     """
-    is_blacklisted = await crud_token_blacklist.exists(db, token=token)
+    payload = token_cache.get_claims(token)
+    if payload is None:
+        try:
+            payload = jwt_signer.decode(token)
+        except InvalidTokenError:
+            return None
+        token_cache.set_claims(token, payload)
+
+    if token_blacklist.client is not None:
+        is_blacklisted = await token_blacklist.contains(token_blacklist.token_id(token, payload))
+        if not is_blacklisted and not token_blacklist.migrated:
+            is_blacklisted = await crud_token_blacklist.exists(db, token=token)
+    else:
+        is_blacklisted = await crud_token_blacklist.exists(db, token=token)
     if is_blacklisted:
         return None
 
-    try:
-        payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
-        username_or_email: str = payload.get("sub")
-        if username_or_email is None:
-            return None
-        return TokenData(username_or_email=username_or_email)
-
-    except JWTError:
+    username_or_email: str = payload.get("sub")
+    if username_or_email is None:
         return None
+    return TokenData(username_or_email=username_or_email)
 
 
 async def blacklist_token(token: str, db: AsyncSession) -> None:
-    payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
+    payload = jwt_signer.decode(token)
+    token_cache.evict(token)
+    if token_blacklist.client is not None:
+        await token_blacklist.add(token_blacklist.token_id(token, payload), payload["exp"])
+        return
+
     expires_at = datetime.fromtimestamp(payload.get("exp"))
     await crud_token_blacklist.create(db, object=TokenBlacklistCreate(**{"token": token, "expires_at": expires_at}))
+
+
+async def invalidate_user(username: str) -> None:
+    """Drop the cached tokens of a user in every worker, after it was updated or deleted."""
+    token_cache.evict_user(username)
+    await publish_user_change(username)
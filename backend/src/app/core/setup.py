@@ -10,22 +10,29 @@ from arq.connections import RedisSettings
 from fastapi import APIRouter, Depends, FastAPI
 from fastapi.openapi.docs import get_redoc_html, get_swagger_ui_html
 from fastapi.openapi.utils import get_openapi
+from fastapi.responses import PlainTextResponse
 
 from ..api.dependencies import get_current_superuser
+from ..api.v1.websocket import relay_download_event
 from ..middleware.client_cache_middleware import ClientCacheMiddleware
+from ..middleware.rate_limit_middleware import RateLimitMiddleware
 from .config import (
     AppSettings,
     ClientSideCacheSettings,
     DatabaseSettings,
     EnvironmentOption,
     EnvironmentSettings,
+    MetricsSettings,
     RedisCacheSettings,
     RedisQueueSettings,
     RedisRateLimiterSettings,
+    RedisTokenBlacklistSettings,
     settings,
 )
-from .db.database import Base, async_engine as engine
-from .utils import cache, queue, rate_limit
+from .db.database import Base, async_engine as engine, local_session
+from . import security
+from .utils import cache, downloads, metrics, queue, rate_limit, token_blacklist, token_cache
+from .utils.cache_codecs import get_serializer
 from ..models import *
 
 # -------------- database --------------
@@ -36,20 +43,45 @@ async def create_tables() -> None:
 
 # -------------- cache --------------
 async def create_redis_cache_pool() -> None:
-    cache.pool = redis.ConnectionPool.from_url(settings.REDIS_CACHE_URL)
-    cache.client = redis.Redis.from_pool(cache.pool)  # type: ignore
+    if settings.REDIS_CACHE_CLUSTER:
+        cache.client = redis.RedisCluster.from_url(settings.REDIS_CACHE_URL)
+        cache.pubsub_client = redis.Redis.from_url(settings.REDIS_CACHE_URL)
+    else:
+        cache.pool = redis.ConnectionPool.from_url(settings.REDIS_CACHE_URL)
+        cache.client = redis.Redis.from_pool(cache.pool)  # type: ignore
+    cache.serializer = get_serializer(
+        settings.CACHE_CODEC, settings.CACHE_COMPRESSION, settings.CACHE_COMPRESSION_MIN_SIZE
+    )
+
+    if settings.CACHE_LOCAL_ENABLED:
+        cache.local_cache = cache.LocalCache(max_size=settings.CACHE_LOCAL_MAX_SIZE, ttl=settings.CACHE_LOCAL_TTL)
+        cache.invalidation_channel = settings.CACHE_INVALIDATION_CHANNEL
+        await cache.start_invalidation_listener()
 
 
 async def close_redis_cache_pool() -> None:
+    await cache.stop_invalidation_listener()
+    cache.local_cache = None
     await cache.client.aclose()  # type: ignore
+    if cache.pubsub_client is not None:
+        await cache.pubsub_client.aclose()
+        cache.pubsub_client = None
 
 
 # -------------- queue --------------
 async def create_redis_queue_pool() -> None:
     queue.pool = await create_pool(RedisSettings(host=settings.REDIS_QUEUE_HOST, port=settings.REDIS_QUEUE_PORT))
+    await downloads.start_event_listener(relay_download_event)
+
+
+async def enqueue_cache_warming() -> None:
+    # arq skips a job id while its job is queued, running or its result is kept, so the app workers starting
+    # together enqueue it only once
+    await queue.pool.enqueue_job("warm_cache", _job_id="warm_cache")  # type: ignore
 
 
 async def close_redis_queue_pool() -> None:
+    await downloads.stop_event_listener()
     await queue.pool.aclose()  # type: ignore
 
 
@@ -57,12 +89,41 @@ async def close_redis_queue_pool() -> None:
 async def create_redis_rate_limit_pool() -> None:
     rate_limit.pool = redis.ConnectionPool.from_url(settings.REDIS_RATE_LIMIT_URL)
     rate_limit.client = redis.Redis.from_pool(rate_limit.pool)  # type: ignore
+    rate_limit.limiter = rate_limit.RateLimiter(settings.RATE_LIMIT_ALGORITHM)
+    if settings.RATE_LIMIT_LOCAL_TOLERANCE > 0:
+        rate_limit.limiter = rate_limit.HybridRateLimiter(rate_limit.limiter, settings.RATE_LIMIT_LOCAL_TOLERANCE)
+    if isinstance(settings, DatabaseSettings):
+        await rate_limit.start_policy_listener(local_session)
 
 
 async def close_redis_rate_limit_pool() -> None:
+    await rate_limit.stop_policy_listener()
     await rate_limit.client.aclose()  # type: ignore
 
 
+# -------------- token blacklist --------------
+async def create_redis_token_blacklist_pool(listen: bool = True) -> None:
+    token_blacklist.pool = redis.ConnectionPool.from_url(settings.REDIS_TOKEN_BLACKLIST_URL)
+    token_blacklist.client = redis.Redis.from_pool(token_blacklist.pool)  # type: ignore
+    if listen:
+        await token_blacklist.start_listener(
+            settings.TOKEN_BLACKLIST_BLOOM_CAPACITY, settings.TOKEN_BLACKLIST_BLOOM_ERROR_RATE
+        )
+        await token_cache.start_listener(security.token_cache)
+
+
+async def migrate_token_blacklist() -> None:
+    """Move the tokens blacklisted in the database to Redis, so that verifying tokens stops querying it."""
+    async with local_session() as db:
+        await token_blacklist.purge_table(db, security.jwt_signer)
+
+
+async def close_redis_token_blacklist_pool() -> None:
+    await token_cache.stop_listener()
+    await token_blacklist.stop_listener()
+    await token_blacklist.client.aclose()  # type: ignore
+
+
 # -------------- application --------------
 async def set_threadpool_tokens(number_of_tokens: int = 100) -> None:
     limiter = anyio.to_thread.current_default_thread_limiter()
@@ -77,6 +138,8 @@ def lifespan_factory(
         | ClientSideCacheSettings
         | RedisQueueSettings
         | RedisRateLimiterSettings
+        | RedisTokenBlacklistSettings
+        | MetricsSettings
         | EnvironmentSettings
     ),
     create_tables_on_start: bool = True,
@@ -96,9 +159,18 @@ def lifespan_factory(
         if isinstance(settings, RedisQueueSettings):
             await create_redis_queue_pool()
 
+            if isinstance(settings, RedisCacheSettings) and settings.CACHE_WARMING_ENABLED:
+                await enqueue_cache_warming()
+
         if isinstance(settings, RedisRateLimiterSettings):
             await create_redis_rate_limit_pool()
 
+        if isinstance(settings, RedisTokenBlacklistSettings):
+            await create_redis_token_blacklist_pool()
+
+            if isinstance(settings, DatabaseSettings):
+                await migrate_token_blacklist()
+
         yield
 
         if isinstance(settings, RedisCacheSettings):
@@ -110,6 +182,9 @@ def lifespan_factory(
         if isinstance(settings, RedisRateLimiterSettings):
             await close_redis_rate_limit_pool()
 
+        if isinstance(settings, RedisTokenBlacklistSettings):
+            await close_redis_token_blacklist_pool()
+
     return lifespan
 
 
@@ -123,6 +198,8 @@ def create_application(
         | ClientSideCacheSettings
         | RedisQueueSettings
         | RedisRateLimiterSettings
+        | RedisTokenBlacklistSettings
+        | MetricsSettings
         | EnvironmentSettings
     ),
     create_tables_on_start: bool = True,
@@ -147,7 +224,11 @@ def create_application(
         - RedisCacheSettings: Sets up event handlers for creating and closing a Redis cache pool.
         - ClientSideCacheSettings: Integrates middleware for client-side caching.
         - RedisQueueSettings: Sets up event handlers for creating and closing a Redis queue pool.
-        - RedisRateLimiterSettings: Sets up event handlers for creating and closing a Redis rate limiter pool.
+        - RedisRateLimiterSettings: Sets up event handlers for creating and closing a Redis rate limiter pool, and
+          the rate limiting middleware if `RATE_LIMIT_MIDDLEWARE` is set.
+        - RedisTokenBlacklistSettings: Sets up event handlers for creating and closing a Redis token blacklist pool.
+        - MetricsSettings: Exposes the application metrics in the Prometheus text format at `METRICS_PATH`, if
+          `METRICS_ENABLED` is set.
         - EnvironmentSettings: Conditionally sets documentation URLs and integrates custom routes for API documentation
           based on the environment type.
 
@@ -189,6 +270,15 @@ def create_application(
     if isinstance(settings, ClientSideCacheSettings):
         application.add_middleware(ClientCacheMiddleware, max_age=settings.CLIENT_CACHE_MAX_AGE)
 
+    if isinstance(settings, RedisRateLimiterSettings) and settings.RATE_LIMIT_MIDDLEWARE:
+        application.add_middleware(RateLimitMiddleware)
+
+    if isinstance(settings, MetricsSettings) and settings.METRICS_ENABLED:
+
+        @application.get(settings.METRICS_PATH, include_in_schema=False)
+        async def get_metrics() -> PlainTextResponse:
+            return PlainTextResponse(metrics.registry.render(), media_type="text/plain; version=0.0.4")
+
     if isinstance(settings, EnvironmentSettings):
         if settings.ENVIRONMENT != EnvironmentOption.PRODUCTION:
             docs_router = APIRouter()
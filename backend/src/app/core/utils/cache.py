@@ -1,17 +1,133 @@
+import asyncio
+import fnmatch
 import functools
 import json
+import math
+import operator
+import random
 import re
+import time
+from collections import OrderedDict
 from collections.abc import Callable
-from typing import Any
+from typing import Any, get_type_hints
 
 from fastapi import Request, Response
 from fastapi.encoders import jsonable_encoder
-from redis.asyncio import ConnectionPool, Redis
+from redis.asyncio import ConnectionPool, Redis, RedisCluster
+from redis.asyncio.client import Pipeline
+from redis.exceptions import LockError
+from sqlalchemy.ext.asyncio import AsyncSession
 
 from ..exceptions.cache_exceptions import CacheIdentificationInferenceError, InvalidRequestError, MissingClientError
+from ..logger import logging
+from .cache_codecs import CacheSerializer, JsonCodec
+from .metrics import BYTES_BUCKETS, registry
+
+logger = logging.getLogger(__name__)
+
+CACHE_REQUESTS = registry.counter(
+    "cache_requests_total",
+    "Requests to cached endpoints by result (local_hit, hit, stale, miss).",
+    ("key_prefix", "result"),
+)
+CACHE_REQUEST_DURATION = registry.histogram(
+    "cache_request_duration_seconds",
+    "Time spent serving requests to cached endpoints by result.",
+    ("key_prefix", "result"),
+)
+CACHE_COMPUTE_DURATION = registry.histogram(
+    "cache_compute_duration_seconds", "Time spent computing responses on cache misses and refreshes.", ("key_prefix",)
+)
+CACHE_REFRESHES = registry.counter(
+    "cache_refreshes_total", "Background refreshes by reason (stale, early).", ("key_prefix", "reason")
+)
+CACHE_STORED_BYTES = registry.histogram(
+    "cache_stored_bytes", "Size of the payloads stored in the cache.", ("key_prefix",), buckets=BYTES_BUCKETS
+)
+CACHE_INVALIDATIONS = registry.counter(
+    "cache_invalidations_total", "Cache keys invalidated by requests other than GET.", ("key_prefix",)
+)
+CACHE_SCAN_DURATION = registry.histogram(
+    "cache_scan_duration_seconds", "Time spent deleting keys by pattern with SCAN.", ("key_prefix",)
+)
 
 pool: ConnectionPool | None = None
-client: Redis | None = None
+client: Redis | RedisCluster | None = None
+pubsub_client: Redis | None = None
+serializer: CacheSerializer = CacheSerializer(JsonCodec())
+
+
+class LocalCache:
+    """Bounded, per-process LRU cache with TTL used as an L1 tier in front of Redis.
+
+    Entries are stored as the serialized (decompressed) payloads read from or written to Redis, so a local hit
+    costs a dictionary lookup and no network round trip. Every invalidation bumps ``generation``, which lets callers
+    detect that an invalidation raced with a Redis read and skip populating the local tier with stale data.
+
+    Parameters
+    ----------
+    max_size: int
+        Maximum number of entries kept in memory. The least recently used entry is evicted first.
+    ttl: int
+        Maximum number of seconds an entry may be served from memory.
+    """
+
+    def __init__(self, max_size: int = 1024, ttl: int = 5) -> None:
+        self.max_size = max_size
+        self.ttl = ttl
+        self.generation = 0
+        self._data: OrderedDict[str, tuple[float, bytes]] = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def get(self, key: str) -> bytes | None:
+        item = self._data.get(key)
+        if item is None:
+            return None
+
+        expires_at, value = item
+        if expires_at <= time.monotonic():
+            del self._data[key]
+            return None
+
+        self._data.move_to_end(key)
+        return value
+
+    def set(self, key: str, value: bytes, ttl: int | None = None) -> None:
+        ttl = self.ttl if ttl is None else min(ttl, self.ttl)
+        if ttl <= 0 or self.max_size <= 0:
+            return
+
+        self._data[key] = (time.monotonic() + ttl, value)
+        self._data.move_to_end(key)
+        while len(self._data) > self.max_size:
+            self._data.popitem(last=False)
+
+    def delete(self, *keys: str) -> None:
+        self.generation += 1
+        for key in keys:
+            self._data.pop(key, None)
+
+    def delete_pattern(self, pattern: str) -> None:
+        self.generation += 1
+        for key in [key for key in self._data if fnmatch.fnmatchcase(key, pattern)]:
+            del self._data[key]
+
+    def clear(self) -> None:
+        self.generation += 1
+        self._data.clear()
+
+
+local_cache: LocalCache | None = None
+invalidation_channel: str = "cache:invalidation"
+_invalidation_listener: asyncio.Task | None = None
+
+_in_flight: dict[str, asyncio.Future] = {}
+warmable_endpoints: dict[str, tuple[Callable, list[str]]] = {}
+_background_tasks: set[asyncio.Task] = set()
+_ABANDONED = object()
+LOCK_POLL_INTERVAL = 0.05
 
 
 def _infer_resource_id(kwargs: dict[str, Any], resource_id_type: type | tuple[type, ...]) -> int | str:
@@ -142,7 +258,127 @@ def _format_extra_data(to_invalidate_extra: dict[str, str], kwargs: dict[str, An
     return formatted_extra
 
 
-async def _delete_keys_by_pattern(pattern: str) -> None:
+def _is_cluster() -> bool:
+    return isinstance(client, RedisCluster)
+
+
+def _hash_tagged(key: str) -> str:
+    """Wrap the first segment of a cache key (or SCAN pattern) in a Redis Cluster hash tag.
+
+    Only the hash tag is hashed to pick the key slot, so every key sharing its first segment lives on the same
+    shard, together with the tag set of the same name (see `_tag_key`).
+
+    Parameters
+    ----------
+    key: str
+        The cache key or pattern, e.g. ``"userson_posts:page_1:userson"``.
+
+    Returns
+    -------
+    str
+        The hash-tagged key, e.g. ``"{userson_posts}:page_1:userson"``. A pattern without ``:``, such as
+        ``"userson*"``, only gets the opening brace so it still matches the hash-tagged keys.
+    """
+    group, separator, rest = key.partition(":")
+    if not separator:
+        return f"{{{group}"
+    return f"{{{group}}}{separator}{rest}"
+
+
+class _KeyTemplate:
+    """A cache key template whose placeholders are extracted once, at decoration time.
+
+    Parameters
+    ----------
+    template: str
+        The template, e.g. ``"{username}_posts:page_{page}"``.
+    """
+
+    __slots__ = ("template", "fields")
+
+    def __init__(self, template: str) -> None:
+        self.template = template
+        self.fields = tuple(_extract_data_inside_brackets(template))
+
+    def format(self, kwargs: dict[str, Any]) -> str:
+        if not self.fields:
+            return self.template
+        return self.template.format_map(kwargs)
+
+
+class _KeyBuilder:
+    """Builds every cache key, tag and pattern of a decorated endpoint from precompiled templates.
+
+    Templates are parsed and the resource id resolution strategy is chosen when the decorator is applied, so
+    building keys on each request only formats strings.
+
+    Parameters
+    ----------
+    key_prefix: str
+        Template of the cache key prefix.
+    resource_id_name: Any
+        Name of the resource id argument, or None to infer it from `resource_id_type`.
+    resource_id_type: Union[type, Tuple[type, ...]]
+        The expected type of the resource id, used when `resource_id_name` is None.
+    tags: List[str] | None
+        Templates of the tags cached entries are registered under.
+    to_invalidate_extra: Dict[str, Any] | None
+        Templates of the extra key prefixes and their resource ids to invalidate.
+    pattern_to_invalidate_extra: List[str] | None
+        Templates of the key patterns to invalidate.
+    tags_to_invalidate: List[str] | None
+        Templates of the tags to invalidate.
+    """
+
+    def __init__(
+        self,
+        key_prefix: str,
+        resource_id_name: Any = None,
+        resource_id_type: type | tuple[type, ...] = int,
+        tags: list[str] | None = None,
+        to_invalidate_extra: dict[str, Any] | None = None,
+        pattern_to_invalidate_extra: list[str] | None = None,
+        tags_to_invalidate: list[str] | None = None,
+    ) -> None:
+        self.prefix = _KeyTemplate(key_prefix)
+        self.resource_id: Callable[[dict[str, Any]], Any]
+        if resource_id_name:
+            self.resource_id = operator.itemgetter(resource_id_name)
+        else:
+            self.resource_id = functools.partial(_infer_resource_id, resource_id_type=resource_id_type)
+
+        self.tag_templates = [_KeyTemplate(tag) for tag in tags or []]
+        self.extra_templates = [
+            (_KeyTemplate(prefix), _extract_data_inside_brackets(id_template)[0])
+            for prefix, id_template in (to_invalidate_extra or {}).items()
+        ]
+        self.pattern_templates = [_KeyTemplate(pattern) for pattern in pattern_to_invalidate_extra or []]
+        self.invalidated_tag_templates = [_KeyTemplate(tag) for tag in tags_to_invalidate or []]
+
+    @property
+    def invalidates_extra(self) -> bool:
+        return bool(self.extra_templates or self.pattern_templates or self.invalidated_tag_templates)
+
+    def cache_key(self, kwargs: dict[str, Any]) -> str:
+        key = f"{self.prefix.format(kwargs)}:{self.resource_id(kwargs)}"
+        return _hash_tagged(key) if _is_cluster() else key
+
+    def tags(self, kwargs: dict[str, Any]) -> list[str]:
+        return [template.format(kwargs) for template in self.tag_templates]
+
+    def extra_keys(self, kwargs: dict[str, Any]) -> list[str]:
+        keys = [f"{template.format(kwargs)}:{kwargs[id_name]}" for template, id_name in self.extra_templates]
+        return [_hash_tagged(key) for key in keys] if _is_cluster() else keys
+
+    def patterns(self, kwargs: dict[str, Any]) -> list[str]:
+        patterns = [template.format(kwargs) + "*" for template in self.pattern_templates]
+        return [_hash_tagged(pattern) for pattern in patterns] if _is_cluster() else patterns
+
+    def tags_to_invalidate(self, kwargs: dict[str, Any]) -> list[str]:
+        return [template.format(kwargs) for template in self.invalidated_tag_templates]
+
+
+async def _delete_keys_by_pattern(pattern: str) -> int:
     """Delete keys from Redis that match a given pattern using the SCAN command.
 
     This function iteratively scans the Redis key space for keys that match a specific pattern
@@ -151,7 +387,7 @@ async def _delete_keys_by_pattern(pattern: str) -> None:
 
     The function scans the key space in an iterative manner using a cursor-based approach.
     It retrieves a batch of keys matching the pattern on each iteration and deletes them
-    until no matching keys are left.
+    until no matching keys are left. With Redis Cluster, every primary node is scanned.
 
     Parameters
     ----------
@@ -164,9 +400,8 @@ async def _delete_keys_by_pattern(pattern: str) -> None:
     - The SCAN command is used with a count of 100 to retrieve keys in batches.
       This count can be adjusted based on the size of your dataset and Redis performance.
 
-    - The function uses the delete command to remove keys in bulk. If the dataset
-      is extremely large, consider implementing additional logic to handle bulk deletion
-      more efficiently.
+    - The function uses the non-blocking unlink command to remove keys in bulk, so memory is
+      reclaimed in a background thread by Redis.
 
     - Be cautious with patterns that could match a large number of keys, as deleting
       many keys simultaneously may impact the performance of the Redis server.
@@ -174,11 +409,478 @@ async def _delete_keys_by_pattern(pattern: str) -> None:
     if client is None:
         raise MissingClientError
 
-    cursor = -1
-    while cursor != 0:
-        cursor, keys = await client.scan(cursor, match=pattern, count=100)
-        if keys:
-            await client.delete(*keys)
+    deleted = 0
+    keys = []
+    async for key in client.scan_iter(match=pattern, count=100):
+        keys.append(key)
+        if len(keys) >= 100:
+            deleted += await client.unlink(*keys)
+            keys = []
+
+    if keys:
+        deleted += await client.unlink(*keys)
+    return deleted
+
+
+def _tag_key(tag: str) -> str:
+    if _is_cluster():
+        return f"cache_tag:{{{tag}}}"
+    return f"cache_tag:{tag}"
+
+
+def _queue_tag_registration(pipe: Pipeline, cache_key: str, tags: list[str], expiration: int) -> None:
+    """Queue the commands adding a cache key to the Redis sets indexing each of its tags.
+
+    Each tag set expires together with the longest-lived entry registered in it, so tag sets never outlive
+    their members for long and never expire before them.
+
+    Parameters
+    ----------
+    pipe: Pipeline
+        The pipeline the commands are added to.
+    cache_key: str
+        The cache key being stored.
+    tags: List[str]
+        The formatted tags the key belongs to.
+    expiration: int
+        The time to live of the cache key in seconds.
+    """
+    for tag in tags:
+        tag_key = _tag_key(tag)
+        pipe.sadd(tag_key, cache_key)
+        pipe.expire(tag_key, expiration, nx=True)
+        pipe.expire(tag_key, expiration, gt=True)
+
+
+async def _register_in_tags(cache_key: str, tags: list[str], expiration: int) -> None:
+    """Add a cache key to the Redis sets indexing each of its tags, see `_queue_tag_registration`."""
+    if client is None:
+        raise MissingClientError
+
+    async with client.pipeline(transaction=False) as pipe:
+        _queue_tag_registration(pipe, cache_key, tags, expiration)
+        await pipe.execute()
+
+
+POP_TAG_SCRIPT = """
+local members = redis.call('SMEMBERS', KEYS[1])
+redis.call('UNLINK', KEYS[1])
+return members
+"""
+
+
+async def _pop_tagged_keys(tags: list[str]) -> list[str]:
+    """Read the cache keys registered under the given tags and remove the tag sets.
+
+    Members are read and each set removed atomically by a Lua script, so keys registered concurrently end up in a
+    fresh set instead of being lost. A script touches a single tag set, so it also works with Redis Cluster.
+
+    Parameters
+    ----------
+    tags: List[str]
+        The formatted tags to pop.
+
+    Returns
+    -------
+    List[str]
+        The cache keys that were registered under the tags.
+    """
+    if client is None:
+        raise MissingClientError
+
+    pop_tag = client.register_script(POP_TAG_SCRIPT)
+    results = await asyncio.gather(*(pop_tag(keys=[_tag_key(tag)]) for tag in tags))
+
+    return sorted({member.decode() for members in results for member in members})
+
+
+def _evict_local(keys: list[str], patterns: list[str]) -> None:
+    """Remove keys and glob patterns from the in-process cache tier, if enabled."""
+    if local_cache is None:
+        return
+
+    if keys:
+        local_cache.delete(*keys)
+    for pattern in patterns:
+        local_cache.delete_pattern(pattern)
+
+
+async def _unlink_and_publish(keys: list[str], patterns: list[str]) -> None:
+    """Remove cache keys and broadcast the invalidation to the other workers in a single round trip.
+
+    Keys are removed with the non-blocking UNLINK command. When the in-process tier is enabled, the keys and
+    patterns are also evicted locally and the invalidation message is published in the same pipeline. With Redis
+    Cluster, keys are unlinked shard by shard and the message is published through `pubsub_client`.
+
+    Parameters
+    ----------
+    keys: List[str]
+        Exact cache keys to invalidate.
+    patterns: List[str]
+        Glob patterns (as passed to SCAN) whose matching keys were already deleted from Redis.
+    """
+    if client is None:
+        raise MissingClientError
+
+    _evict_local(keys, patterns)
+    message = json.dumps({"keys": keys, "patterns": patterns})
+    if pubsub_client is None:
+        async with client.pipeline(transaction=False) as pipe:
+            if keys:
+                pipe.unlink(*keys)
+            if local_cache is not None:
+                pipe.publish(invalidation_channel, message)
+            await pipe.execute()
+        return
+
+    if keys:
+        await client.unlink(*keys)
+    if local_cache is not None:
+        await pubsub_client.publish(invalidation_channel, message)
+
+
+async def _listen_for_invalidations() -> None:
+    """Apply invalidation messages published by any worker to this process' local cache tier.
+
+    The local tier is cleared whenever the subscription is (re)established, since messages published while
+    disconnected are lost and any entry may be stale.
+    """
+    subscriber = pubsub_client if pubsub_client is not None else client
+    if subscriber is None:
+        raise MissingClientError
+
+    while True:
+        try:
+            async with subscriber.pubsub(ignore_subscribe_messages=True) as pubsub:
+                await pubsub.subscribe(invalidation_channel)
+                if local_cache is not None:
+                    local_cache.clear()
+
+                async for message in pubsub.listen():
+                    data = json.loads(message["data"])
+                    _evict_local(data.get("keys", []), data.get("patterns", []))
+
+        except asyncio.CancelledError:
+            raise
+
+        except Exception as e:
+            logger.warning(f"Cache invalidation listener disconnected: {e}")
+            if local_cache is not None:
+                local_cache.clear()
+            await asyncio.sleep(1)
+
+
+async def start_invalidation_listener() -> None:
+    global _invalidation_listener
+    if _invalidation_listener is None:
+        _invalidation_listener = asyncio.create_task(_listen_for_invalidations())
+
+
+async def stop_invalidation_listener() -> None:
+    global _invalidation_listener
+    if _invalidation_listener is not None:
+        _invalidation_listener.cancel()
+        try:
+            await _invalidation_listener
+        except asyncio.CancelledError:
+            pass
+        _invalidation_listener = None
+
+
+async def _compute_with_lock(cache_key: str, compute: Callable, lock_timeout: float) -> Any:
+    """Compute a missing cache entry while holding a short Redis lock, so only one worker recomputes it.
+
+    Workers that fail to acquire the lock poll the cache key until the lock holder stores the value. If it
+    does not show up within `lock_timeout` seconds (e.g. the holder crashed), they compute it themselves.
+
+    Parameters
+    ----------
+    cache_key: str
+        The cache key being computed.
+    compute: Callable
+        Coroutine function that runs the endpoint, stores its result in the cache and returns it.
+    lock_timeout: float
+        Time in seconds after which the lock expires and waiting workers stop polling.
+
+    Returns
+    -------
+    Any
+        Either the result of `compute` or the cached value written by another worker.
+    """
+    if client is None:
+        raise MissingClientError
+
+    lock = client.lock(f"lock:{cache_key}", timeout=lock_timeout)
+    if await lock.acquire(blocking=False):
+        try:
+            return await compute()
+        finally:
+            try:
+                await lock.release()
+            except LockError:
+                pass
+
+    deadline = time.monotonic() + lock_timeout
+    while time.monotonic() < deadline:
+        await asyncio.sleep(LOCK_POLL_INTERVAL)
+        cached_data = await client.get(cache_key)
+        if cached_data:
+            return serializer.loads(cached_data)
+
+    return await compute()
+
+
+async def _single_flight(cache_key: str, compute: Callable, lock_timeout: float) -> Any:
+    """Coalesce concurrent cache misses for the same key into a single computation.
+
+    The first coroutine to miss on `cache_key` in this process becomes the leader and computes the value
+    (guarded across processes by `_compute_with_lock`); every other coroutine awaits the leader's result or
+    exception. If the leader is cancelled (e.g. the client disconnected), waiters compute the value themselves.
+
+    Parameters
+    ----------
+    cache_key: str
+        The cache key being computed.
+    compute: Callable
+        Coroutine function that runs the endpoint, stores its result in the cache and returns it.
+    lock_timeout: float
+        Time in seconds the cross-process lock is held at most.
+
+    Returns
+    -------
+    Any
+        The computed (or cached) value for `cache_key`.
+    """
+    future = _in_flight.get(cache_key)
+    if future is not None:
+        result = await asyncio.shield(future)
+        if result is not _ABANDONED:
+            return result
+
+        return await compute()
+
+    future = asyncio.get_running_loop().create_future()
+    future.add_done_callback(lambda f: f.cancelled() or f.exception())
+    _in_flight[cache_key] = future
+    try:
+        result = await _compute_with_lock(cache_key, compute, lock_timeout)
+        future.set_result(result)
+        return result
+
+    except asyncio.CancelledError:
+        future.set_result(_ABANDONED)
+        raise
+
+    except Exception as e:
+        future.set_exception(e)
+        raise
+
+    finally:
+        if _in_flight.get(cache_key) is future:
+            del _in_flight[cache_key]
+
+
+def _smooth(average: float, sample: float, weight: float = 0.2) -> float:
+    """Exponentially weighted moving average used to track how long an endpoint takes to recompute."""
+    if average == 0:
+        return sample
+
+    return (1 - weight) * average + weight * sample
+
+
+def _is_stale(ttl_ms: int, stale_ttl: int) -> bool:
+    """Whether an entry with `ttl_ms` milliseconds left is past its freshness, within the `stale_ttl` window."""
+    return stale_ttl > 0 and 0 <= ttl_ms <= stale_ttl * 1000
+
+
+def _needs_refresh(ttl_ms: int, stale_ttl: int, beta: float, recompute_time: float) -> bool:
+    """Decide whether a cache hit should trigger a background refresh.
+
+    Parameters
+    ----------
+    ttl_ms: int
+        Remaining time to live of the key in milliseconds, as returned by PTTL. Negative values mean the TTL
+        is unknown and never trigger a refresh.
+    stale_ttl: int
+        Number of seconds of the TTL that make up the stale window after the entry's freshness expired.
+    beta: float
+        XFetch beta parameter. 0 disables probabilistic early refresh.
+    recompute_time: float
+        Smoothed time in seconds the endpoint takes to compute the value.
+
+    Returns
+    -------
+    bool
+        True if the entry is stale, or if XFetch decides it should be refreshed early.
+
+    Note
+    ----
+        XFetch refreshes when ``-recompute_time * beta * log(random()) >= remaining freshness``, which spreads
+        refreshes of hot keys out ahead of their expiration instead of having them all expire at once.
+    """
+    if ttl_ms < 0:
+        return False
+
+    remaining = ttl_ms / 1000 - stale_ttl
+    if remaining <= 0:
+        return True
+
+    if beta <= 0 or recompute_time <= 0:
+        return False
+
+    return -recompute_time * beta * math.log(1.0 - random.random()) >= remaining
+
+
+def _schedule_refresh(cache_key: str, compute: Callable, kwargs: dict[str, Any], lock_timeout: float) -> None:
+    """Refresh a cache entry in a background task, unless a refresh for it is already in flight.
+
+    The request's database session is closed once the response is sent, so any `AsyncSession` argument is
+    replaced with a new session bound to the same engine for the duration of the refresh.
+
+    Parameters
+    ----------
+    cache_key: str
+        The cache key to refresh.
+    compute: Callable
+        Coroutine function taking the endpoint keyword arguments, storing the result in the cache.
+    kwargs: Dict[str, Any]
+        The keyword arguments the endpoint was called with.
+    lock_timeout: float
+        Time in seconds the cross-process recompute lock is held at most.
+    """
+    if cache_key in _in_flight:
+        return
+
+    async def refresh() -> None:
+        sessions = {
+            name: type(value)(bind=value.bind, expire_on_commit=False)
+            for name, value in kwargs.items()
+            if isinstance(value, AsyncSession)
+        }
+        try:
+            await _single_flight(cache_key, lambda: compute({**kwargs, **sessions}), lock_timeout)
+
+        except Exception as e:
+            logger.warning(f"Background refresh of cache key {cache_key} failed: {e}")
+
+        finally:
+            for session in sessions.values():
+                await session.close()
+
+    task = asyncio.create_task(refresh())
+    _background_tasks.add(task)
+    task.add_done_callback(_background_tasks.discard)
+
+
+def _access_key(key_prefix: str) -> str:
+    return f"cache_access:{key_prefix}"
+
+
+def _access_member(kwargs: dict[str, Any], session_names: list[str]) -> str:
+    """Serialize the scalar arguments of a request other than its sessions, the ones replayed when warming."""
+    arguments = {
+        name: value
+        for name, value in kwargs.items()
+        if isinstance(value, str | int | float) and name not in session_names
+    }
+    return json.dumps(arguments, sort_keys=True, separators=(",", ":"))
+
+
+async def warm(
+    session_factory: Callable[[], AsyncSession], top: int = 100, concurrency: int = 4, decay: float = 0.5
+) -> int:
+    """Pre-populate the cache with the most requested entries of the endpoints decorated with `track_access=True`.
+
+    The most frequent arguments recorded for each endpoint are replayed through the decorated endpoint itself, so
+    entries already cached are left as they are and missing ones are computed and stored exactly as on a
+    request. Recorded frequencies are then multiplied by `decay`, so the ranking follows recent traffic, and only
+    the `10 * top` most frequent arguments are kept.
+
+    Parameters
+    ----------
+    session_factory: Callable[[], AsyncSession]
+        Factory of the database sessions passed to the endpoints' `AsyncSession` arguments.
+    top: int, default 100
+        Number of entries warmed per endpoint.
+    concurrency: int, default 4
+        Maximum number of endpoints computed at the same time, which bounds the database load of warming.
+    decay: float, default 0.5
+        Factor applied to the recorded frequencies after each run.
+
+    Returns
+    -------
+    int
+        The number of entries successfully warmed.
+    """
+    if client is None:
+        raise MissingClientError
+
+    semaphore = asyncio.Semaphore(concurrency)
+    request = Request(
+        {"type": "http", "method": "GET", "path": "/", "headers": [], "query_string": b"", "cache_warming": True}
+    )
+
+    async def warm_entry(key_prefix: str, endpoint: Callable, session_names: list[str], kwargs: dict) -> bool:
+        async with semaphore, session_factory() as db:
+            try:
+                await endpoint(request, **kwargs, **dict.fromkeys(session_names, db))
+
+            except Exception as e:
+                logger.warning(f"Could not warm {key_prefix} cache entry for {kwargs}: {e}")
+                return False
+
+            return True
+
+    entries = []
+    for key_prefix, (endpoint, session_names) in warmable_endpoints.items():
+        access_key = _access_key(key_prefix)
+        async with client.pipeline(transaction=False) as pipe:
+            pipe.zrevrange(access_key, 0, top - 1)
+            pipe.zremrangebyrank(access_key, 0, -10 * top - 1)
+            pipe.zunionstore(access_key, {access_key: decay})
+            members, *_ = await pipe.execute()
+
+        for member in members:
+            entries.append(warm_entry(key_prefix, endpoint, session_names, json.loads(member)))
+
+    return sum(await asyncio.gather(*entries))
+
+
+def _record_request(key_prefix: str, result: str, started: float) -> None:
+    CACHE_REQUESTS.inc(key_prefix=key_prefix, result=result)
+    CACHE_REQUEST_DURATION.observe(time.perf_counter() - started, key_prefix=key_prefix, result=result)
+
+
+async def _invalidate(key_prefix: str, cache_key: str, kwargs: dict[str, Any], keys: _KeyBuilder) -> None:
+    """Invalidate a cache key together with its extra keys, patterns and tags.
+
+    Parameters
+    ----------
+    key_prefix: str
+        The unformatted key prefix of the decorated endpoint, used to label metrics.
+    cache_key: str
+        The cache key of the resource being modified.
+    kwargs: Dict[str, Any]
+        The keyword arguments the endpoint was called with, used to format the templates.
+    keys: _KeyBuilder
+        The compiled templates of the extra keys, patterns and tags to invalidate.
+    """
+    invalidated_keys = [cache_key, *keys.extra_keys(kwargs)]
+    invalidated_patterns = keys.patterns(kwargs)
+    scanned_keys = 0
+
+    if invalidated_patterns:
+        started = time.perf_counter()
+        for pattern in invalidated_patterns:
+            scanned_keys += await _delete_keys_by_pattern(pattern)
+        CACHE_SCAN_DURATION.observe(time.perf_counter() - started, key_prefix=key_prefix)
+
+    tags_to_invalidate = keys.tags_to_invalidate(kwargs)
+    if tags_to_invalidate:
+        invalidated_keys.extend(await _pop_tagged_keys(tags_to_invalidate))
+
+    await _unlink_and_publish(invalidated_keys, invalidated_patterns)
+    CACHE_INVALIDATIONS.inc(len(invalidated_keys) + scanned_keys, key_prefix=key_prefix)
 
 
 def cache(
@@ -188,6 +890,15 @@ def cache(
     resource_id_type: type | tuple[type, ...] = int,
     to_invalidate_extra: dict[str, Any] | None = None,
     pattern_to_invalidate_extra: list[str] | None = None,
+    use_local_cache: bool = True,
+    coalesce: bool = True,
+    lock_timeout: float = 10,
+    stale_ttl: int = 0,
+    early_refresh_beta: float = 0,
+    tags: list[str] | None = None,
+    tags_to_invalidate: list[str] | None = None,
+    raw_response: bool = False,
+    track_access: bool = False,
 ) -> Callable:
     """Cache decorator for FastAPI endpoints.
 
@@ -213,6 +924,39 @@ def cache(
     pattern_to_invalidate_extra: List[str] | None, optional
         A list of string patterns for cache keys that should be invalidated when the decorated function is called.
         This allows for bulk invalidation of cache keys based on a matching pattern.
+    use_local_cache: bool, default True
+        Whether GET responses may also be served from the in-process cache tier. Has no effect unless the local
+        tier was enabled at startup (``CACHE_LOCAL_ENABLED``). Entries are kept in memory for at most
+        ``min(expiration, CACHE_LOCAL_TTL)`` seconds.
+    coalesce: bool, default True
+        Whether concurrent GET misses on the same cache key are coalesced. Within a process only one coroutine runs
+        the endpoint while the others await its result, and across processes a short Redis lock ensures only one
+        worker recomputes the key while the others wait for it to be stored.
+    lock_timeout: float, default 10
+        Maximum time in seconds the cross-process recompute lock is held, and that other workers wait for it.
+    stale_ttl: int, default 0
+        Number of seconds past `expiration` during which a stale entry is still served immediately while a
+        background task refreshes it (stale-while-revalidate). Entries are kept in Redis for
+        ``expiration + stale_ttl`` seconds. Defaults to 0, which disables serving stale data.
+    early_refresh_beta: float, default 0
+        Enables probabilistic early refresh (XFetch) when greater than 0. A fresh entry is refreshed in the
+        background with a probability that grows as it approaches `expiration`, scaled by how long the endpoint
+        takes to compute; values around 1.0 are a good start, higher values refresh earlier. Defaults to 0.
+    tags: List[str] | None, optional
+        Templates for tags the cached GET response belongs to, formatted with the endpoint arguments
+        (e.g. ``["{username}_posts"]``). Each stored cache key is registered in a Redis set per tag.
+    tags_to_invalidate: List[str] | None, optional
+        Templates for tags whose cache entries are invalidated when the decorated function is called with a method
+        other than GET. Invalidation only touches the keys registered in those tags, which makes it the preferred
+        alternative to `pattern_to_invalidate_extra`.
+    raw_response: bool, default False
+        Whether cache hits are returned as a `Response` whose body is the cached payload, skipping decoding and
+        re-encoding (only with JSON codecs). The response model is then not applied to cache hits, so only enable
+        it for endpoints whose return value already matches their response model.
+    track_access: bool, default False
+        Whether to count how often the endpoint is requested with each set of scalar arguments, so that `warm` can
+        pre-populate its most requested entries. Requests served by the in-process tier are not counted. Only
+        endpoints whose other arguments are `AsyncSession` dependencies can be warmed.
 
     Returns
     -------
@@ -279,57 +1023,121 @@ def cache(
     ----
     - resource_id_type is used only if resource_id is not passed.
     - `to_invalidate_extra` and `pattern_to_invalidate_extra` are used for cache invalidation on methods other than GET.
-    - Using `pattern_to_invalidate_extra` can be resource-intensive on large datasets. Use it judiciously and
-      consider the potential impact on Redis performance.
+    - Using `pattern_to_invalidate_extra` can be resource-intensive on large datasets, since it scans the whole
+      keyspace. Prefer registering entries with `tags` and invalidating them with `tags_to_invalidate`.
+    - When the local tier is enabled, every invalidation is also published on the cache invalidation channel so
+      that all workers evict the same keys from memory.
+    - With Redis Cluster, the segment of every key before the first ":" is used as its hash tag, so all the keys of a
+      prefix (e.g. "{username}_posts") live on one shard with the tag set of the same name. Name tags after the
+      prefix of the entries they index to keep them co-located.
     """
 
+    keys = _KeyBuilder(
+        key_prefix,
+        resource_id_name=resource_id_name,
+        resource_id_type=resource_id_type,
+        tags=tags,
+        to_invalidate_extra=to_invalidate_extra,
+        pattern_to_invalidate_extra=pattern_to_invalidate_extra,
+        tags_to_invalidate=tags_to_invalidate,
+    )
+
+    access_key = _access_key(key_prefix)
+
     def wrapper(func: Callable) -> Callable:
+        recompute_time = [0.0]
+        session_names = []
+        if track_access:
+            session_names = [name for name, hint in get_type_hints(func).items() if hint is AsyncSession]
+
         @functools.wraps(func)
         async def inner(request: Request, *args: Any, **kwargs: Any) -> Response:
             if client is None:
                 raise MissingClientError
 
-            if resource_id_name:
-                resource_id = kwargs[resource_id_name]
-            else:
-                resource_id = _infer_resource_id(kwargs=kwargs, resource_id_type=resource_id_type)
-
-            formatted_key_prefix = _format_prefix(key_prefix, kwargs)
-            cache_key = f"{formatted_key_prefix}:{resource_id}"
+            cache_key = keys.cache_key(kwargs)
+            local = local_cache if use_local_cache else None
+            generation = local.generation if local is not None else 0
             if request.method == "GET":
-                if to_invalidate_extra is not None or pattern_to_invalidate_extra is not None:
+                if keys.invalidates_extra:
                     raise InvalidRequestError
 
-                cached_data = await client.get(cache_key)
+                started = time.perf_counter()
+
+                def from_payload(payload: bytes) -> Any:
+                    if raw_response and serializer.media_type is not None:
+                        return Response(content=payload, media_type=serializer.media_type)
+                    return serializer.codec.loads(payload)
+
+                if local is not None:
+                    payload = local.get(cache_key)
+                    if payload:
+                        _record_request(key_prefix, "local_hit", started)
+                        return from_payload(payload)
+
+                async def compute(call_kwargs: dict[str, Any] = kwargs) -> Any:
+                    compute_started = time.perf_counter()
+                    result = await func(request, *args, **call_kwargs)
+                    compute_time = time.perf_counter() - compute_started
+                    recompute_time[0] = _smooth(recompute_time[0], compute_time)
+                    CACHE_COMPUTE_DURATION.observe(compute_time, key_prefix=key_prefix)
+
+                    payload = serializer.codec.dumps(jsonable_encoder(result))
+                    stored = serializer.compress(payload)
+                    CACHE_STORED_BYTES.observe(len(stored), key_prefix=key_prefix)
+
+                    async with client.pipeline(transaction=not _is_cluster()) as pipe:
+                        pipe.set(cache_key, stored, ex=expiration + stale_ttl)
+                        if keys.tag_templates:
+                            _queue_tag_registration(pipe, cache_key, keys.tags(kwargs), expiration + stale_ttl)
+                        await pipe.execute()
+
+                    if local is not None and local.generation == generation:
+                        local.set(cache_key, payload, ttl=expiration)
+
+                    return result
+
+                if stale_ttl or early_refresh_beta or track_access:
+                    async with client.pipeline(transaction=False) as pipe:
+                        pipe.get(cache_key).pttl(cache_key)
+                        if track_access and "cache_warming" not in request.scope:
+                            pipe.zincrby(access_key, 1, _access_member(kwargs, session_names))
+                        cached_data, ttl_ms, *_ = await pipe.execute()
+                else:
+                    cached_data, ttl_ms = await client.get(cache_key), -1
+
                 if cached_data:
-                    return json.loads(cached_data.decode())
+                    try:
+                        payload = serializer.decompress(cached_data)
+                        response = from_payload(payload)
+
+                    except Exception as e:
+                        logger.warning(f"Could not decode cache key {cache_key}, recomputing it: {e}")
+
+                    else:
+                        is_stale = _is_stale(ttl_ms, stale_ttl)
+                        if _needs_refresh(ttl_ms, stale_ttl, early_refresh_beta, recompute_time[0]):
+                            CACHE_REFRESHES.inc(key_prefix=key_prefix, reason="stale" if is_stale else "early")
+                            _schedule_refresh(cache_key, compute, kwargs, lock_timeout)
+                        elif local is not None and local.generation == generation:
+                            local.set(cache_key, payload, ttl=expiration)
+                        _record_request(key_prefix, "stale" if is_stale else "hit", started)
+                        return response
+
+                if coalesce:
+                    result = await _single_flight(cache_key, compute, lock_timeout)
+                else:
+                    result = await compute()
+                _record_request(key_prefix, "miss", started)
+                return result
 
             result = await func(request, *args, **kwargs)
-
-            if request.method == "GET":
-                serializable_data = jsonable_encoder(result)
-                serialized_data = json.dumps(serializable_data)
-
-                await client.set(cache_key, serialized_data)
-                await client.expire(cache_key, expiration)
-
-                serialized_data = json.loads(serialized_data)
-
-            else:
-                await client.delete(cache_key)
-                if to_invalidate_extra is not None:
-                    formatted_extra = _format_extra_data(to_invalidate_extra, kwargs)
-                    for prefix, id in formatted_extra.items():
-                        extra_cache_key = f"{prefix}:{id}"
-                        await client.delete(extra_cache_key)
-
-                if pattern_to_invalidate_extra is not None:
-                    for pattern in pattern_to_invalidate_extra:
-                        formatted_pattern = _format_prefix(pattern, kwargs)
-                        await _delete_keys_by_pattern(formatted_pattern + "*")
-
+            await _invalidate(key_prefix, cache_key, kwargs, keys)
             return result
 
+        if track_access:
+            warmable_endpoints[key_prefix] = (inner, session_names)
+
         return inner
 
     return wrapper
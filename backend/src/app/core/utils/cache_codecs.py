@@ -0,0 +1,194 @@
+import json
+from typing import Any
+
+from ..exceptions.cache_exceptions import InvalidCodecError
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover
+    orjson = None
+
+try:
+    import msgpack
+except ImportError:  # pragma: no cover
+    msgpack = None
+
+try:
+    import zstandard
+except ImportError:  # pragma: no cover
+    zstandard = None
+
+try:
+    import lz4.frame as lz4_frame
+except ImportError:  # pragma: no cover
+    lz4_frame = None
+
+
+class JsonCodec:
+    name = "json"
+    media_type: str | None = "application/json"
+
+    def dumps(self, data: Any) -> bytes:
+        return json.dumps(data, separators=(",", ":")).encode()
+
+    def loads(self, data: bytes) -> Any:
+        return json.loads(data)
+
+
+class OrjsonCodec:
+    name = "orjson"
+    media_type: str | None = "application/json"
+
+    def dumps(self, data: Any) -> bytes:
+        dumped: bytes = orjson.dumps(data)
+        return dumped
+
+    def loads(self, data: bytes) -> Any:
+        return orjson.loads(data)
+
+
+class MsgpackCodec:
+    name = "msgpack"
+    media_type: str | None = None
+
+    def dumps(self, data: Any) -> bytes:
+        dumped: bytes = msgpack.packb(data, use_bin_type=True)
+        return dumped
+
+    def loads(self, data: bytes) -> Any:
+        return msgpack.unpackb(data, raw=False)
+
+
+class ZstdCompressor:
+    name = "zstd"
+    magic = b"\x28\xb5\x2f\xfd"
+
+    def __init__(self, level: int = 3) -> None:
+        self._compressor = zstandard.ZstdCompressor(level=level)
+        self._decompressor = zstandard.ZstdDecompressor()
+
+    def compress(self, data: bytes) -> bytes:
+        compressed: bytes = self._compressor.compress(data)
+        return compressed
+
+    def decompress(self, data: bytes) -> bytes:
+        decompressed: bytes = self._decompressor.decompress(data)
+        return decompressed
+
+
+class Lz4Compressor:
+    name = "lz4"
+    magic = b"\x04\x22\x4d\x18"
+
+    def compress(self, data: bytes) -> bytes:
+        compressed: bytes = lz4_frame.compress(data)
+        return compressed
+
+    def decompress(self, data: bytes) -> bytes:
+        decompressed: bytes = lz4_frame.decompress(data)
+        return decompressed
+
+
+CODECS: dict[str, tuple[type, Any]] = {
+    "json": (JsonCodec, json),
+    "orjson": (OrjsonCodec, orjson),
+    "msgpack": (MsgpackCodec, msgpack),
+}
+
+COMPRESSORS: dict[str, tuple[type, Any]] = {
+    "zstd": (ZstdCompressor, zstandard),
+    "lz4": (Lz4Compressor, lz4_frame),
+}
+
+
+class CacheSerializer:
+    """Turns endpoint results into the bytes stored in the cache, and back.
+
+    Payloads of at least `compression_min_size` bytes are compressed. Compressed payloads are recognized by the
+    frame magic number of the compression format, so entries written with or without compression (or with a
+    different compressor) can always be read back, as long as the compression library is installed.
+
+    Parameters
+    ----------
+    codec: JsonCodec | OrjsonCodec | MsgpackCodec
+        The codec used to serialize the data.
+    compressor: ZstdCompressor | Lz4Compressor | None
+        The compressor used for large payloads. None disables compression.
+    compression_min_size: int
+        Minimum size in bytes of a serialized payload for it to be compressed.
+    """
+
+    def __init__(self, codec: Any, compressor: Any = None, compression_min_size: int = 4096) -> None:
+        self.codec = codec
+        self.compressor = compressor
+        self.compression_min_size = compression_min_size
+        self._decompressors = [cls() for cls, module in COMPRESSORS.values() if module is not None]
+
+    @property
+    def media_type(self) -> str | None:
+        """Media type of decompressed payloads, or None if they cannot be sent as an HTTP response body."""
+        media_type: str | None = self.codec.media_type
+        return media_type
+
+    def compress(self, payload: bytes) -> bytes:
+        if self.compressor is not None and len(payload) >= self.compression_min_size:
+            compressed: bytes = self.compressor.compress(payload)
+            return compressed
+        return payload
+
+    def dumps(self, data: Any) -> bytes:
+        return self.compress(self.codec.dumps(data))
+
+    def decompress(self, data: bytes) -> bytes:
+        for decompressor in self._decompressors:
+            if data.startswith(decompressor.magic):
+                decompressed: bytes = decompressor.decompress(data)
+                return decompressed
+        return data
+
+    def loads(self, data: bytes) -> Any:
+        return self.codec.loads(self.decompress(data))
+
+
+def get_serializer(
+    codec: str = "json", compression: str | None = None, compression_min_size: int = 4096
+) -> CacheSerializer:
+    """Build a `CacheSerializer` from codec and compression names.
+
+    Parameters
+    ----------
+    codec: str
+        One of "json", "orjson" or "msgpack".
+    compression: str | None
+        One of "zstd", "lz4", or None/"none" to disable compression.
+    compression_min_size: int
+        Minimum size in bytes of a serialized payload for it to be compressed.
+
+    Returns
+    -------
+    CacheSerializer
+        The configured serializer.
+
+    Raises
+    ------
+    InvalidCodecError
+        If the codec or compression is unknown, or the library it depends on is not installed.
+    """
+    if codec not in CODECS:
+        raise InvalidCodecError(f"Unknown cache codec '{codec}'.")
+
+    codec_class, codec_module = CODECS[codec]
+    if codec_module is None:
+        raise InvalidCodecError(f"Cache codec '{codec}' requires the '{codec}' package to be installed.")
+
+    compressor = None
+    if compression and compression != "none":
+        if compression not in COMPRESSORS:
+            raise InvalidCodecError(f"Unknown cache compression '{compression}'.")
+
+        compressor_class, compressor_module = COMPRESSORS[compression]
+        if compressor_module is None:
+            raise InvalidCodecError(f"Cache compression '{compression}' requires its package to be installed.")
+        compressor = compressor_class()
+
+    return CacheSerializer(codec_class(), compressor, compression_min_size)
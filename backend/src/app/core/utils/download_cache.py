@@ -0,0 +1,274 @@
+import asyncio
+import errno
+import fcntl
+import hashlib
+import json
+import os
+import shutil
+import time
+import uuid
+from collections.abc import Awaitable, Callable
+from dataclasses import dataclass
+from typing import Any
+
+from yt_dlp.extractor.youtube import YoutubeIE
+
+from ..logger import logging
+from .metrics import registry
+
+logger = logging.getLogger(__name__)
+
+DOWNLOAD_CACHE_REQUESTS = registry.counter(
+    "youtube_download_cache_requests_total",
+    "Download cache lookups by result: hit, miss, or shared when joining a download already running in the process.",
+    ("result",),
+)
+
+CODEC_OPTIONS = ("format", "postprocessors", "postprocessor_args", "merge_output_format")
+INFO_FILENAME = "info.json"
+
+
+@dataclass(frozen=True)
+class Artifact:
+    path: str
+    title: str
+    media_type: str
+
+
+def video_id(url: str) -> str:
+    """Id of a YouTube video from any of its URLs, or the URL itself for other sites."""
+    if YoutubeIE.suitable(url):
+        return str(YoutubeIE._match_id(url))
+    return url
+
+
+def artifact_key(url: str, options: dict[str, Any]) -> str:
+    """Cache key of the file downloaded from `url` with the yt-dlp `options`.
+
+    Only the video id and the options selecting the streams and how they are transcoded are part of the key, so the
+    URLs of a video share their artifacts, as do the resolutions of an mp3 which ignore them.
+    """
+    identity = {"video_id": video_id(url), **{name: options.get(name) for name in CODEC_OPTIONS}}
+    return hashlib.sha256(json.dumps(identity, sort_keys=True).encode()).hexdigest()
+
+
+def _try_lock(file: Any) -> bool:
+    try:
+        fcntl.flock(file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+    except BlockingIOError:
+        return False
+    return True
+
+
+class DownloadCache:
+    """Disk cache of downloaded files, shared by the processes using the same `directory`.
+
+    Files are downloaded into a staging folder, then published by renaming it to `artifacts/<key>`, so an artifact
+    is either complete or absent. Requests for an artifact being downloaded wait for it instead of downloading it
+    again: within a process they share the download, across processes they wait for the lock file of the artifact.
+    Once the artifacts take more than `max_size` bytes, the least recently used ones are removed.
+
+    Parameters
+    ----------
+    directory: str
+        Folder holding the artifacts, the downloads in progress and their locks.
+    max_size: int
+        Size in bytes the artifacts are trimmed to after each download.
+    poll_interval: float, default 0.5
+        Seconds between checks for an artifact downloaded by another process.
+    """
+
+    def __init__(self, directory: str, max_size: int, poll_interval: float = 0.5) -> None:
+        self.directory = directory
+        self.max_size = max_size
+        self.poll_interval = poll_interval
+        self._artifacts = os.path.join(directory, "artifacts")
+        self._staging = os.path.join(directory, "staging")
+        self._locks = os.path.join(directory, "locks")
+        self._downloads: dict[str, asyncio.Task[Artifact]] = {}
+        self._staging_dirs: dict[str, str] = {}
+
+    def get(self, key: str) -> Artifact | None:
+        """The artifact of `key` if it is cached, marking it as the most recently used."""
+        artifact_dir = os.path.join(self._artifacts, key)
+        try:
+            with open(os.path.join(artifact_dir, INFO_FILENAME)) as f:
+                info = json.load(f)
+            os.utime(artifact_dir)
+        except (OSError, ValueError):
+            return None
+        return Artifact(os.path.join(artifact_dir, info["filename"]), info["title"], info["media_type"])
+
+    def downloading(self, key: str) -> str | None:
+        """Folder the artifact of `key` is being downloaded into by this process, if it is."""
+        return self._staging_dirs.get(key)
+
+    async def get_or_download(self, key: str, fetch: Callable[[str], Awaitable[Artifact]]) -> Artifact:
+        """The artifact of `key`, downloaded with `fetch` if it is not cached yet.
+
+        `fetch` is given an empty folder to download the file into and returns it. It runs once for concurrent
+        requests of the same artifact, which all get its result or exception.
+        """
+        artifact = self.get(key)
+        if artifact is not None:
+            DOWNLOAD_CACHE_REQUESTS.inc(result="hit")
+            return artifact
+
+        download = self._downloads.get(key)
+        if download is None:
+            DOWNLOAD_CACHE_REQUESTS.inc(result="miss")
+            download = asyncio.create_task(self._download(key, fetch))
+            self._downloads[key] = download
+            download.add_done_callback(lambda task: self._finish(key, task))
+        else:
+            DOWNLOAD_CACHE_REQUESTS.inc(result="shared")
+
+        # Shielded so that a request going away does not cancel the download for the others.
+        return await asyncio.shield(download)
+
+    def _finish(self, key: str, task: asyncio.Task[Artifact]) -> None:
+        del self._downloads[key]
+        if not task.cancelled() and task.exception() is not None:
+            logger.warning(f"Download of artifact {key} failed: {task.exception()}")
+
+    async def _download(self, key: str, fetch: Callable[[str], Awaitable[Artifact]]) -> Artifact:
+        for folder in (self._artifacts, self._staging, self._locks):
+            os.makedirs(folder, exist_ok=True)
+
+        with open(os.path.join(self._locks, f"{key}.lock"), "a") as lock:
+            while not _try_lock(lock):
+                artifact = self.get(key)
+                if artifact is not None:
+                    return artifact
+                await asyncio.sleep(self.poll_interval)
+
+            artifact = self.get(key)
+            if artifact is None:
+                artifact = await self._fetch(key, fetch)
+                await asyncio.get_running_loop().run_in_executor(None, self.evict, key)
+            return artifact
+
+    async def _fetch(self, key: str, fetch: Callable[[str], Awaitable[Artifact]]) -> Artifact:
+        staging_dir = os.path.join(self._staging, f"{key}-{uuid.uuid4().hex}")
+        artifact_dir = os.path.join(self._artifacts, key)
+        os.makedirs(staging_dir)
+        self._staging_dirs[key] = staging_dir
+        try:
+            fetched = await fetch(staging_dir)
+            info = {
+                "filename": os.path.relpath(fetched.path, staging_dir),
+                "title": fetched.title,
+                "media_type": fetched.media_type,
+            }
+            with open(os.path.join(staging_dir, INFO_FILENAME), "w") as f:
+                json.dump(info, f)
+            os.rename(staging_dir, artifact_dir)
+        except OSError as e:
+            shutil.rmtree(staging_dir, ignore_errors=True)
+            # Published meanwhile by a process that did not see our lock file, as it was just evicted.
+            artifact = self.get(key) if e.errno in (errno.EEXIST, errno.ENOTEMPTY) else None
+            if artifact is None:
+                raise
+            return artifact
+        except BaseException:
+            shutil.rmtree(staging_dir, ignore_errors=True)
+            raise
+        finally:
+            del self._staging_dirs[key]
+
+        return Artifact(os.path.join(artifact_dir, info["filename"]), fetched.title, fetched.media_type)
+
+    def evict(self, keep: str | None = None) -> int:
+        """Remove the least recently used artifacts until they take at most `max_size` bytes, other than `keep`.
+
+        Returns
+        -------
+        int
+            The number of artifacts removed.
+        """
+        entries = []
+        total = 0
+        for entry in _scandir(self._artifacts):
+            try:
+                size = sum(file.stat().st_size for file in os.scandir(entry.path))
+                entries.append((entry.stat().st_mtime, entry.name, size))
+            except OSError:
+                continue
+            total += size
+
+        evicted = 0
+        for _, key, size in sorted(entries):
+            if total <= self.max_size:
+                break
+            if key == keep:
+                continue
+
+            if self._remove(key):
+                total -= size
+                evicted += 1
+
+        if evicted:
+            logger.info(f"Evicted {evicted} download artifacts, {total} bytes left")
+        return evicted
+
+    def sweep(self, max_age: float, staging_max_age: float = 7200) -> int:
+        """Remove the artifacts not requested for `max_age` seconds, and what interrupted downloads left behind.
+
+        Staging folders and the lock files of absent artifacts are removed once `staging_max_age` seconds old, which
+        must be longer than any download.
+
+        Returns
+        -------
+        int
+            The number of artifacts removed.
+        """
+        now = time.time()
+        swept = 0
+        for entry in _scandir(self._artifacts):
+            if _age(entry, now) > max_age and self._remove(entry.name):
+                swept += 1
+
+        for entry in _scandir(self._staging):
+            if _age(entry, now) > staging_max_age:
+                shutil.rmtree(entry.path, ignore_errors=True)
+
+        for entry in _scandir(self._locks):
+            key = entry.name.removesuffix(".lock")
+            if _age(entry, now) > staging_max_age and not os.path.exists(os.path.join(self._artifacts, key)):
+                try:
+                    os.remove(entry.path)
+                except OSError:
+                    pass
+
+        if swept:
+            logger.info(f"Swept {swept} download artifacts not requested for {max_age} seconds")
+        return swept
+
+    def _remove(self, key: str) -> bool:
+        # Moved out first, so that the artifact disappears at once rather than file by file.
+        trash = os.path.join(self._staging, f"{key}-{uuid.uuid4().hex}")
+        try:
+            os.rename(os.path.join(self._artifacts, key), trash)
+        except OSError:
+            return False
+        shutil.rmtree(trash, ignore_errors=True)
+        try:
+            os.remove(os.path.join(self._locks, f"{key}.lock"))
+        except OSError:
+            pass
+        return True
+
+
+def _scandir(path: str) -> list[os.DirEntry[str]]:
+    try:
+        return list(os.scandir(path))
+    except FileNotFoundError:
+        return []
+
+
+def _age(entry: os.DirEntry[str], now: float) -> float:
+    """Seconds since `entry` was last modified, 0 if it is gone."""
+    try:
+        return now - entry.stat().st_mtime
+    except OSError:
+        return 0
@@ -0,0 +1,326 @@
+import asyncio
+import json
+import os
+import threading
+import time
+from collections.abc import AsyncIterator, Awaitable, Callable
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, BinaryIO
+
+import yt_dlp
+from redis.asyncio import Redis
+
+from ..logger import logging
+from . import queue
+from .download_cache import Artifact, DownloadCache, artifact_key
+
+logger = logging.getLogger(__name__)
+
+FORMAT_STRINGS = {
+    "360p": "bestvideo[height<=360][ext=mp4][vcodec^=avc1]+bestaudio[ext=m4a]/best[height<=360][ext=mp4][vcodec^=avc1]",
+    "480p": "bestvideo[height<=480][ext=mp4][vcodec^=avc1]+bestaudio[ext=m4a]/best[height<=480][ext=mp4][vcodec^=avc1]",
+    "720p": "bestvideo[height<=720][ext=mp4][vcodec^=avc1]+bestaudio[ext=m4a]/best[height<=720][ext=mp4][vcodec^=avc1]",
+    "1080p": (
+        "bestvideo[height<=1080][ext=mp4][vcodec^=avc1]+bestaudio[ext=m4a]/best[height<=1080][ext=mp4][vcodec^=avc1]"
+    ),
+}
+MEDIA_TYPES = {"m4a": "audio/mp4", "mp3": "audio/mpeg", "mp4": "video/mp4"}
+PROGRESS_FIELDS = ("status", "filename", "downloaded_bytes", "total_bytes", "total_bytes_estimate", "speed", "eta")
+
+
+def _base_options(output_dir: str, progress_hooks: list[Callable[[dict[str, Any]], None]] | None) -> dict[str, Any]:
+    return {
+        "outtmpl": os.path.join(output_dir, "%(title)s.%(ext)s"),
+        "quiet": True,
+        "no_warnings": True,
+        "extract_flat": True,
+        "progress_hooks": progress_hooks or [],
+    }
+
+
+def download_options(
+    resolution: str, format: str, output_dir: str, progress_hooks: list[Callable[[dict[str, Any]], None]] | None = None
+) -> dict[str, Any]:
+    """yt-dlp options downloading a video at `resolution` into `output_dir`, as an mp4 file or its audio as mp3."""
+    options = _base_options(output_dir, progress_hooks)
+    if format == "mp3":
+        options.update(
+            {
+                "format": "bestaudio[ext=m4a]/best",
+                "postprocessors": [{"key": "FFmpegExtractAudio", "preferredcodec": "mp3", "preferredquality": "192"}],
+            }
+        )
+    else:
+        options.update(
+            {
+                "format": FORMAT_STRINGS.get(resolution, FORMAT_STRINGS["360p"]),
+                "postprocessor_args": {"ffmpeg": ["-c:v", "copy", "-c:a", "copy", "-movflags", "+faststart"]},
+                "merge_output_format": "mp4",
+            }
+        )
+    return options
+
+
+def stream_options(
+    resolution: str, format: str, output_dir: str, progress_hooks: list[Callable[[dict[str, Any]], None]] | None = None
+) -> dict[str, Any]:
+    """yt-dlp options downloading a single file that can be sent while it is written, which nothing is merged into
+    or converted: a progressive mp4 of at most `resolution`, falling back to the best one, or the m4a audio.
+    """
+    options = _base_options(output_dir, progress_hooks)
+    height = resolution.removesuffix("p") if resolution in FORMAT_STRINGS else "360"
+    progressive = "[ext=mp4][vcodec!=none][acodec!=none]"
+    video_format = f"best[height<={height}]{progressive}/best{progressive}"
+    options.update(
+        {
+            "format": "bestaudio[ext=m4a]" if format == "m4a" else video_format,
+            # Written under its final name from the start, rather than renamed from a .part file once complete.
+            "nopart": True,
+        }
+    )
+    return options
+
+
+def find_output(output_dir: str, format: str) -> str:
+    """Path of the file produced by a download, raising `FileNotFoundError` if there is none."""
+    for filename in os.listdir(output_dir):
+        if filename.endswith(f".{format}"):
+            return os.path.join(output_dir, filename)
+    raise FileNotFoundError(f"No .{format} file found")
+
+
+def _extract_info(url: str, options: dict[str, Any]) -> dict[str, Any]:
+    with yt_dlp.YoutubeDL(options) as ydl:
+        info: dict[str, Any] = ydl.extract_info(url, download=True)
+        return info
+
+
+async def _until_done(future: "asyncio.Future[Any]") -> None:
+    """Wait for `future` whatever its outcome, and even if cancelled meanwhile, in which case that is raised after."""
+    cancelled = False
+    while not future.done():
+        try:
+            await asyncio.wait([future])
+        except asyncio.CancelledError:
+            cancelled = True
+    if cancelled:
+        raise asyncio.CancelledError
+
+
+class Downloader:
+    """Runs yt-dlp downloads in a dedicated thread pool, at most `concurrency` at a time.
+
+    A download taking longer than `timeout` seconds, or whose caller is cancelled, is stopped by its progress hook,
+    and its slot is only released once its thread stopped, so stopped downloads never keep running past the
+    concurrency limit.
+
+    Parameters
+    ----------
+    concurrency: int, default 2
+        Maximum number of downloads running at the same time, further ones wait for a free slot.
+    timeout: float, default 300
+        Maximum duration of a download in seconds, not counting the wait for a free slot.
+    """
+
+    def __init__(self, concurrency: int = 2, timeout: float = 300) -> None:
+        self.concurrency = concurrency
+        self.timeout = timeout
+        self._semaphore = asyncio.Semaphore(concurrency)
+        self._executor: ThreadPoolExecutor | None = None
+
+    @property
+    def executor(self) -> ThreadPoolExecutor:
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(max_workers=self.concurrency, thread_name_prefix="yt-dlp")
+        return self._executor
+
+    async def download(self, url: str, options: dict[str, Any]) -> dict[str, Any]:
+        """Download `url` with the yt-dlp `options` and return its info.
+
+        Raises
+        ------
+        TimeoutError
+            If the download took longer than `timeout` seconds.
+        """
+        async with self._semaphore:
+            cancelled = threading.Event()
+
+            def cancel_hook(d: dict[str, Any]) -> None:
+                if cancelled.is_set():
+                    raise yt_dlp.utils.DownloadCancelled("Download stopped")
+
+            options = {**options, "progress_hooks": [cancel_hook, *options.get("progress_hooks", [])]}
+            future = asyncio.get_running_loop().run_in_executor(self.executor, _extract_info, url, options)
+            try:
+                return await asyncio.wait_for(asyncio.shield(future), self.timeout)
+            except TimeoutError:
+                cancelled.set()
+                await _until_done(future)
+                raise TimeoutError(f"Download timed out after {self.timeout} seconds") from None
+            except asyncio.CancelledError:
+                cancelled.set()
+                await _until_done(future)
+                raise
+
+
+async def open_download(
+    directory: Callable[[], str | None], format: str, download: "asyncio.Future[Any]", poll_interval: float = 0.1
+) -> BinaryIO | None:
+    """Open the .`format` file written by `download` into the folder returned by `directory`, as soon as it appears.
+
+    Returns None if the download ends first, or runs in another process.
+    """
+    while not download.done():
+        output_dir = directory()
+        if output_dir is not None:
+            try:
+                for filename in os.listdir(output_dir):
+                    if filename.endswith(f".{format}"):
+                        return open(os.path.join(output_dir, filename), "rb")
+            except FileNotFoundError:
+                pass
+        await asyncio.wait([download], timeout=poll_interval)
+    return None
+
+
+async def follow_download(
+    file: BinaryIO, download: "asyncio.Future[Any]", chunk_size: int = 256 * 1024, poll_interval: float = 0.1
+) -> AsyncIterator[bytes]:
+    """Yield the content of `file` as it is written, until `download` completes, then raise its exception if any.
+
+    Chunks are read as they are consumed, so a slow client only slows down the reads: the download goes on, buffered
+    by the file.
+    """
+    loop = asyncio.get_running_loop()
+    with file:
+        while True:
+            finished = download.done()
+            chunk = await loop.run_in_executor(None, file.read, chunk_size)
+            if chunk:
+                yield chunk
+            elif finished:
+                download.result()
+                return
+            else:
+                await asyncio.wait([download], timeout=poll_interval)
+
+
+# -------------- download jobs --------------
+channel: str = "youtube_download:events"
+_listener: asyncio.Task | None = None
+
+
+class ProgressPublisher:
+    """Publishes the events of a download job, for the web workers to relay to the WebSocket of the client.
+
+    Progress events are published at most every `interval` seconds, the other events always are. Nothing is
+    published for jobs without a client id.
+    """
+
+    def __init__(
+        self, client: Redis, job_id: str, client_id: str | None, is_mp3: bool = False, interval: float = 0.5
+    ) -> None:
+        self.client = client
+        self.job_id = job_id
+        self.client_id = client_id
+        self.is_mp3 = is_mp3
+        self.interval = interval
+        self._loop = asyncio.get_running_loop()
+        self._last_progress = 0.0
+
+    def progress_hook(self, d: dict[str, Any]) -> None:
+        """yt-dlp progress hook, called from the download thread."""
+        now = time.monotonic()
+        if self.client_id is None or (d["status"] == "downloading" and now - self._last_progress < self.interval):
+            return
+
+        self._last_progress = now
+        data = {field: d.get(field) for field in PROGRESS_FIELDS}
+        asyncio.run_coroutine_threadsafe(self.publish("progress", data=data), self._loop)
+
+    async def publish(self, event: str, **fields: Any) -> None:
+        if self.client_id is None:
+            return
+
+        message = {"event": event, "client_id": self.client_id, "job_id": self.job_id, "is_mp3": self.is_mp3, **fields}
+        try:
+            await self.client.publish(channel, json.dumps(message))
+        except Exception as e:
+            logger.warning(f"Failed to publish download event: {e}")
+
+
+async def download_job(
+    client: Redis,
+    downloader: Downloader,
+    cache: DownloadCache,
+    job_id: str,
+    url: str,
+    resolution: str,
+    format: str,
+    client_id: str | None = None,
+) -> dict[str, str]:
+    """Download a video into the cache, unless it is already there, publishing progress to the client.
+
+    Returns
+    -------
+    dict[str, str]
+        The path of the downloaded file, its media type and the title of the video.
+    """
+    publisher = ProgressPublisher(client, job_id, client_id, format == "mp3")
+
+    async def fetch(output_dir: str) -> Artifact:
+        info = await downloader.download(
+            url, download_options(resolution, format, output_dir, [publisher.progress_hook])
+        )
+        return Artifact(find_output(output_dir, format), info.get("title", "video"), MEDIA_TYPES[format])
+
+    try:
+        artifact = await cache.get_or_download(artifact_key(url, download_options(resolution, format, "")), fetch)
+    except Exception as e:
+        await publisher.publish("error", detail=str(e) or type(e).__name__)
+        raise
+
+    await publisher.publish("finished", title=artifact.title)
+    return {"path": artifact.path, "media_type": artifact.media_type, "title": artifact.title}
+
+
+async def _listen_for_events(on_event: Callable[[dict[str, Any]], Awaitable[None]]) -> None:
+    """Pass the events published by download jobs to `on_event`."""
+    if queue.pool is None:
+        logger.error("Redis queue pool is not initialized.")
+        raise Exception("Redis queue pool is not initialized.")
+
+    while True:
+        try:
+            async with queue.pool.pubsub(ignore_subscribe_messages=True) as pubsub:
+                await pubsub.subscribe(channel)
+
+                async for message in pubsub.listen():
+                    try:
+                        await on_event(json.loads(message["data"]))
+                    except Exception as e:
+                        logger.warning(f"Failed to relay download event: {e}")
+
+        except asyncio.CancelledError:
+            raise
+
+        except Exception as e:
+            logger.warning(f"Download event listener disconnected: {e}")
+            await asyncio.sleep(1)
+
+
+async def start_event_listener(on_event: Callable[[dict[str, Any]], Awaitable[None]]) -> None:
+    global _listener
+    if _listener is None:
+        _listener = asyncio.create_task(_listen_for_events(on_event))
+
+
+async def stop_event_listener() -> None:
+    global _listener
+    if _listener is not None:
+        _listener.cancel()
+        try:
+            await _listener
+        except asyncio.CancelledError:
+            pass
+        _listener = None
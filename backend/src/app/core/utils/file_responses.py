@@ -0,0 +1,153 @@
+import os
+import stat
+from email.utils import parsedate_to_datetime
+
+import anyio
+from starlette.datastructures import Headers
+from starlette.responses import FileResponse
+from starlette.types import Receive, Scope, Send
+
+NOT_MODIFIED_HEADERS = ("cache-control", "content-location", "date", "etag", "expires", "vary")
+
+
+class _RangeNotSatisfiable(Exception):
+    pass
+
+
+def _parse_range(header: str, size: int) -> tuple[int, int] | None:
+    """First and last byte of the single byte range of a `Range` header, or None if the header is to be ignored.
+
+    Headers that are malformed or hold several ranges are ignored, which answers them with the whole file.
+    """
+    unit, _, byte_range = header.partition("=")
+    first, separator, last = byte_range.strip().partition("-")
+    if unit.strip().lower() != "bytes" or not separator:
+        return None
+    if not (first.isdecimal() or (not first and last)) or (last and not last.isdecimal()):
+        return None
+
+    if not first:
+        suffix = int(last)
+        if suffix == 0 or size == 0:
+            raise _RangeNotSatisfiable
+        return max(size - suffix, 0), size - 1
+
+    start = int(first)
+    if last and int(last) < start:
+        return None
+    if start >= size:
+        raise _RangeNotSatisfiable
+    return start, min(int(last), size - 1) if last else size - 1
+
+
+def _etag_matches(header: str, etag: str, weak: bool) -> bool:
+    tags = [tag.strip() for tag in header.split(",")]
+    if weak:
+        return "*" in tags or etag.removeprefix("W/") in (tag.removeprefix("W/") for tag in tags)
+    return not etag.startswith("W/") and etag in tags
+
+
+def _same_or_earlier(last_modified: str, header: str) -> bool:
+    try:
+        return parsedate_to_datetime(last_modified) <= parsedate_to_datetime(header)
+    except (TypeError, ValueError):
+        return False
+
+
+class RangeFileResponse(FileResponse):
+    """`FileResponse` answering the conditional and range requests of `GET` and `HEAD` requests.
+
+    - `If-None-Match`, or else `If-Modified-Since`, are answered with a 304 when the file did not change;
+    - a single byte range of `Range` is answered with a 206, unless `If-Range` does not match the file anymore, in
+      which case the whole file is sent. Unsatisfiable ranges are answered with a 416.
+
+    The body is sent with the `http.response.zerocopysend` or `http.response.pathsend` ASGI extensions when the
+    server supports them, so that it can send the file with sendfile, and read in chunks otherwise.
+    """
+
+    chunk_size = 1024 * 1024
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        method = scope["method"].upper()
+        if method not in ("GET", "HEAD"):
+            await super().__call__(scope, receive, send)
+            return
+
+        stat_result = self.stat_result
+        if stat_result is None:
+            try:
+                stat_result = await anyio.to_thread.run_sync(os.stat, self.path)
+            except FileNotFoundError:
+                raise RuntimeError(f"File at path {self.path} does not exist.")
+            if not stat.S_ISREG(stat_result.st_mode):
+                raise RuntimeError(f"File at path {self.path} is not a file.")
+            self.set_stat_headers(stat_result)
+
+        request_headers = Headers(scope=scope)
+        size = stat_result.st_size
+        self.headers["accept-ranges"] = "bytes"
+
+        if self._not_modified(request_headers):
+            headers = [(name, value) for name, value in self.raw_headers if name.decode() in NOT_MODIFIED_HEADERS]
+            await self._send_empty(send, 304, headers)
+            return
+
+        start, end, status_code = 0, size - 1, self.status_code
+        if "range" in request_headers and self._if_range_matches(request_headers):
+            try:
+                byte_range = _parse_range(request_headers["range"], size)
+            except _RangeNotSatisfiable:
+                headers = [(b"content-range", f"bytes */{size}".encode()), (b"content-length", b"0")]
+                await self._send_empty(send, 416, headers)
+                return
+            if byte_range is not None:
+                start, end, status_code = *byte_range, 206
+                self.headers["content-range"] = f"bytes {start}-{end}/{size}"
+                self.headers["content-length"] = str(end - start + 1)
+
+        await send({"type": "http.response.start", "status": status_code, "headers": self.raw_headers})
+        if method == "HEAD" or end < start:
+            await send({"type": "http.response.body", "body": b"", "more_body": False})
+        else:
+            await self._send_file(scope, send, start, end - start + 1, size)
+
+        if self.background is not None:
+            await self.background()
+
+    def _not_modified(self, request_headers: Headers) -> bool:
+        if "if-none-match" in request_headers:
+            return _etag_matches(request_headers["if-none-match"], self.headers["etag"], weak=True)
+        if "if-modified-since" in request_headers:
+            return _same_or_earlier(self.headers["last-modified"], request_headers["if-modified-since"])
+        return False
+
+    def _if_range_matches(self, request_headers: Headers) -> bool:
+        if_range = request_headers.get("if-range")
+        if if_range is None:
+            return True
+        if if_range.startswith(('"', "W/")):
+            return _etag_matches(if_range, self.headers["etag"], weak=False)
+        return if_range == self.headers["last-modified"]
+
+    async def _send_empty(self, send: Send, status_code: int, headers: list[tuple[bytes, bytes]]) -> None:
+        await send({"type": "http.response.start", "status": status_code, "headers": headers})
+        await send({"type": "http.response.body", "body": b"", "more_body": False})
+
+    async def _send_file(self, scope: Scope, send: Send, offset: int, count: int, size: int) -> None:
+        extensions = scope.get("extensions", {})
+        if "http.response.zerocopysend" in extensions:
+            with open(self.path, "rb") as file:
+                await send({"type": "http.response.zerocopysend", "file": file, "offset": offset, "count": count})
+            return
+        if "http.response.pathsend" in extensions and count == size:
+            await send({"type": "http.response.pathsend", "path": str(self.path)})
+            return
+
+        async with await anyio.open_file(self.path, mode="rb") as file:
+            await file.seek(offset)
+            remaining = count
+            while remaining:
+                chunk = await file.read(min(self.chunk_size, remaining))
+                # A file truncated meanwhile ends the body early, rather than sending bytes past its end.
+                remaining = remaining - len(chunk) if chunk else 0
+                await send({"type": "http.response.body", "body": chunk, "more_body": remaining > 0})
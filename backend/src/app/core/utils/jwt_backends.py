@@ -0,0 +1,265 @@
+import os
+from typing import Any
+
+from jose import JWTError, jwk
+from jose import jwt as jose_jwt
+from jose.constants import ALGORITHMS
+
+from ..exceptions.jwt_exceptions import InvalidJWTConfigError, InvalidTokenError
+
+try:
+    import jwt as pyjwt
+except ImportError:  # pragma: no cover
+    pyjwt = None
+
+
+class JoseBackend:
+    """python-jose, supporting the HMAC, RSA and ECDSA algorithms but not EdDSA.
+
+    Unless installed with its `cryptography` extra, python-jose signs and verifies RSA and ECDSA tokens in pure
+    Python, which takes milliseconds.
+    """
+
+    name = "jose"
+
+    def load_key(self, key: str, algorithm: str) -> Any:
+        if algorithm not in ALGORITHMS.SUPPORTED:
+            raise InvalidJWTConfigError(f"JWT algorithm '{algorithm}' is not supported by the 'jose' backend.")
+        return jwk.construct(key, algorithm)
+
+    def encode(self, claims: dict[str, Any], key: Any, algorithm: str, headers: dict[str, str] | None) -> str:
+        encoded_jwt: str = jose_jwt.encode(claims, key, algorithm=algorithm, headers=headers)
+        return encoded_jwt
+
+    def decode(self, token: str, key: Any, algorithm: str) -> dict[str, Any]:
+        try:
+            claims: dict[str, Any] = jose_jwt.decode(token, key, algorithms=[algorithm])
+        except JWTError as e:
+            raise InvalidTokenError(str(e)) from e
+        return claims
+
+    def get_unverified_header(self, token: str) -> dict[str, Any]:
+        try:
+            header: dict[str, Any] = jose_jwt.get_unverified_header(token)
+        except JWTError as e:
+            raise InvalidTokenError(str(e)) from e
+        return header
+
+    def get_unverified_claims(self, token: str) -> dict[str, Any]:
+        try:
+            claims: dict[str, Any] = jose_jwt.get_unverified_claims(token)
+        except JWTError as e:
+            raise InvalidTokenError(str(e)) from e
+        return claims
+
+    def public_key(self, key: Any, algorithm: str) -> Any:
+        return key if algorithm.startswith("HS") else key.public_key()
+
+    def to_jwk(self, public_key: Any, algorithm: str) -> dict[str, Any]:
+        public_jwk: dict[str, Any] = public_key.to_dict()
+        return public_jwk
+
+
+class PyJWTBackend:
+    """PyJWT, which signs and verifies RSA, ECDSA and EdDSA tokens with the `cryptography` package, when installed."""
+
+    name = "pyjwt"
+
+    def load_key(self, key: str, algorithm: str) -> Any:
+        try:
+            return pyjwt.get_algorithm_by_name(algorithm).prepare_key(key)
+        except NotImplementedError as e:
+            raise InvalidJWTConfigError(
+                f"JWT algorithm '{algorithm}' is not supported by the 'pyjwt' backend, or requires the "
+                "'cryptography' package to be installed."
+            ) from e
+
+    def encode(self, claims: dict[str, Any], key: Any, algorithm: str, headers: dict[str, str] | None) -> str:
+        encoded_jwt: str = pyjwt.encode(claims, key, algorithm=algorithm, headers=headers)
+        return encoded_jwt
+
+    def decode(self, token: str, key: Any, algorithm: str) -> dict[str, Any]:
+        try:
+            claims: dict[str, Any] = pyjwt.decode(token, key, algorithms=[algorithm])
+        except pyjwt.PyJWTError as e:
+            raise InvalidTokenError(str(e)) from e
+        return claims
+
+    def get_unverified_header(self, token: str) -> dict[str, Any]:
+        try:
+            header: dict[str, Any] = pyjwt.get_unverified_header(token)
+        except pyjwt.PyJWTError as e:
+            raise InvalidTokenError(str(e)) from e
+        return header
+
+    def get_unverified_claims(self, token: str) -> dict[str, Any]:
+        try:
+            claims: dict[str, Any] = pyjwt.decode(token, options={"verify_signature": False})
+        except pyjwt.PyJWTError as e:
+            raise InvalidTokenError(str(e)) from e
+        return claims
+
+    def public_key(self, key: Any, algorithm: str) -> Any:
+        return key.public_key() if hasattr(key, "public_key") else key
+
+    def to_jwk(self, public_key: Any, algorithm: str) -> dict[str, Any]:
+        public_jwk: dict[str, Any] = pyjwt.get_algorithm_by_name(algorithm).to_jwk(public_key, as_dict=True)
+        return public_jwk
+
+
+BACKENDS: dict[str, tuple[type, Any]] = {
+    "jose": (JoseBackend, jose_jwt),
+    "pyjwt": (PyJWTBackend, pyjwt),
+}
+
+
+class JWTSigner:
+    """Signs and verifies tokens with keys parsed once, picking the verification key by the `kid` header of tokens.
+
+    New tokens are signed with the key `signing_key_id` and carry its id in their `kid` header. The other keys only
+    verify tokens, which allows rotating keys: add a new key and sign with it, then drop the previous one once the
+    tokens it signed expired. Tokens without a `kid` header are verified with the signing key.
+
+    Parameters
+    ----------
+    backend: JoseBackend | PyJWTBackend
+        The JWT implementation used.
+    algorithm: str
+        The algorithm tokens are signed with, e.g. "HS256", "ES256" or "EdDSA".
+    keys: dict[str | None, str]
+        Key material by key id: the secret for HMAC algorithms, a PEM encoded key otherwise. The signing key must
+        be a private key, the others may be public keys.
+    signing_key_id: str | None
+        Id of the key new tokens are signed with. None signs tokens without a `kid` header.
+
+    Raises
+    ------
+    InvalidJWTConfigError
+        If the signing key is missing or cannot sign, or a key cannot be used with the algorithm.
+    """
+
+    def __init__(self, backend: Any, algorithm: str, keys: dict[str | None, str], signing_key_id: str | None) -> None:
+        if signing_key_id not in keys:
+            raise InvalidJWTConfigError(f"No JWT key with id '{signing_key_id}'.")
+
+        self.backend = backend
+        self.algorithm = algorithm
+        self.signing_key_id = signing_key_id
+        try:
+            self._signing_key = backend.load_key(keys[signing_key_id], algorithm)
+            self._keys = {
+                key_id: backend.public_key(backend.load_key(key, algorithm), algorithm) for key_id, key in keys.items()
+            }
+        except InvalidJWTConfigError:
+            raise
+        except Exception as e:
+            raise InvalidJWTConfigError(f"JWT key not usable with {algorithm}: {e}") from e
+        self._headers = None if signing_key_id is None else {"kid": signing_key_id}
+
+        try:
+            self.encode({})
+        except Exception as e:
+            raise InvalidJWTConfigError(f"JWT key '{signing_key_id}' cannot sign tokens: {e}") from e
+
+        self.jwks = {"keys": self._public_jwks()}
+
+    def _public_jwks(self) -> list[dict[str, Any]]:
+        if self.algorithm.startswith("HS"):
+            return []
+
+        public_jwks = []
+        for key_id, public_key in self._keys.items():
+            public_jwk = self.backend.to_jwk(public_key, self.algorithm)
+            public_jwk.update({"alg": self.algorithm, "use": "sig"})
+            if key_id is not None:
+                public_jwk["kid"] = key_id
+            public_jwks.append(public_jwk)
+        return public_jwks
+
+    def encode(self, claims: dict[str, Any]) -> str:
+        return self.backend.encode(claims, self._signing_key, self.algorithm, self._headers)
+
+    def decode(self, token: str) -> dict[str, Any]:
+        """Verify a token and return its claims.
+
+        Raises
+        ------
+        InvalidTokenError
+            If the token is malformed, signed by an unknown key, has an invalid signature or is expired.
+        """
+        key_id = self.backend.get_unverified_header(token).get("kid", self.signing_key_id)
+        key = self._keys.get(key_id)
+        if key is None:
+            raise InvalidTokenError(f"Unknown JWT key id '{key_id}'.")
+        return self.backend.decode(token, key, self.algorithm)
+
+    def unverified_claims(self, token: str) -> dict[str, Any]:
+        """The claims of a token, without verifying its signature nor its expiration.
+
+        Raises
+        ------
+        InvalidTokenError
+            If the token is malformed.
+        """
+        return self.backend.get_unverified_claims(token)
+
+
+def load_keys(directory: str) -> dict[str | None, str]:
+    """Read the keys of a directory, by id: each file holds one key, and its name without extension is its id."""
+    keys: dict[str | None, str] = {}
+    for filename in sorted(os.listdir(directory)):
+        path = os.path.join(directory, filename)
+        if filename.startswith(".") or not os.path.isfile(path):
+            continue
+        with open(path) as f:
+            keys[os.path.splitext(filename)[0]] = f.read().strip()
+    return keys
+
+
+def get_signer(
+    backend: str = "jose",
+    algorithm: str = "HS256",
+    secret_key: str | None = None,
+    keys_dir: str | None = None,
+    key_id: str | None = None,
+) -> JWTSigner:
+    """Build a `JWTSigner` from settings.
+
+    Parameters
+    ----------
+    backend: str
+        One of "jose" or "pyjwt".
+    algorithm: str
+        The algorithm tokens are signed with.
+    secret_key: str | None
+        The key, with id `key_id`, when `keys_dir` is not set. Only usable with HMAC algorithms.
+    keys_dir: str | None
+        Directory holding one file per key, named after the key id, e.g. `2024-06.pem`.
+    key_id: str | None
+        Id of the key new tokens are signed with.
+
+    Returns
+    -------
+    JWTSigner
+        The configured signer.
+
+    Raises
+    ------
+    InvalidJWTConfigError
+        If the backend is unknown or not installed, or the keys cannot be used.
+    """
+    if backend not in BACKENDS:
+        raise InvalidJWTConfigError(f"Unknown JWT backend '{backend}'.")
+
+    backend_class, backend_module = BACKENDS[backend]
+    if backend_module is None:
+        raise InvalidJWTConfigError(f"JWT backend '{backend}' requires the '{backend}' package to be installed.")
+
+    if keys_dir is not None:
+        keys = load_keys(keys_dir)
+    elif algorithm.startswith("HS") and secret_key is not None:
+        keys = {key_id: secret_key}
+    else:
+        raise InvalidJWTConfigError(f"JWT algorithm '{algorithm}' needs its keys in a keys directory.")
+
+    return JWTSigner(backend_class(), algorithm, keys, key_id)
@@ -0,0 +1,212 @@
+import bisect
+import math
+from collections.abc import Iterable
+
+DEFAULT_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+BYTES_BUCKETS = (256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304)
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(labels: Iterable[tuple[str, str]]) -> str:
+    formatted = ",".join(f'{name}="{_escape(value)}"' for name, value in labels)
+    return f"{{{formatted}}}" if formatted else ""
+
+
+def _format_value(value: float) -> str:
+    if math.isinf(value):
+        return "+Inf" if value > 0 else "-Inf"
+    return repr(float(value))
+
+
+class Counter:
+    """Monotonically increasing value, partitioned by label values.
+
+    Parameters
+    ----------
+    name: str
+        The metric name, e.g. ``cache_requests_total``.
+    documentation: str
+        Help text exported with the metric.
+    labelnames: tuple[str, ...]
+        Names of the labels every observation must provide.
+    """
+
+    type = "counter"
+
+    def __init__(self, name: str, documentation: str, labelnames: tuple[str, ...] = ()) -> None:
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = labelnames
+        self._values: dict[tuple[str, ...], float] = {}
+
+    def _key(self, labels: dict[str, str]) -> tuple[str, ...]:
+        return tuple(str(labels[name]) for name in self.labelnames)
+
+    def inc(self, amount: float = 1.0, **labels: str) -> None:
+        key = self._key(labels)
+        self._values[key] = self._values.get(key, 0.0) + amount
+
+    def value(self, **labels: str) -> float:
+        return self._values.get(self._key(labels), 0.0)
+
+    def samples(self) -> list[str]:
+        return [
+            f"{self.name}{_format_labels(zip(self.labelnames, key))} {_format_value(value)}"
+            for key, value in sorted(self._values.items())
+        ]
+
+
+class Gauge:
+    """Value that can go up and down, partitioned by label values.
+
+    Parameters
+    ----------
+    name: str
+        The metric name, e.g. ``password_hash_queue_depth``.
+    documentation: str
+        Help text exported with the metric.
+    labelnames: tuple[str, ...]
+        Names of the labels every observation must provide.
+    """
+
+    type = "gauge"
+
+    def __init__(self, name: str, documentation: str, labelnames: tuple[str, ...] = ()) -> None:
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = labelnames
+        self._values: dict[tuple[str, ...], float] = {}
+
+    def _key(self, labels: dict[str, str]) -> tuple[str, ...]:
+        return tuple(str(labels[name]) for name in self.labelnames)
+
+    def set(self, value: float, **labels: str) -> None:
+        self._values[self._key(labels)] = value
+
+    def inc(self, amount: float = 1.0, **labels: str) -> None:
+        key = self._key(labels)
+        self._values[key] = self._values.get(key, 0.0) + amount
+
+    def dec(self, amount: float = 1.0, **labels: str) -> None:
+        self.inc(-amount, **labels)
+
+    def value(self, **labels: str) -> float:
+        return self._values.get(self._key(labels), 0.0)
+
+    def samples(self) -> list[str]:
+        return [
+            f"{self.name}{_format_labels(zip(self.labelnames, key))} {_format_value(value)}"
+            for key, value in sorted(self._values.items())
+        ]
+
+
+class Histogram:
+    """Distribution of observed values in cumulative buckets, partitioned by label values.
+
+    Parameters
+    ----------
+    name: str
+        The metric name, e.g. ``cache_request_duration_seconds``.
+    documentation: str
+        Help text exported with the metric.
+    labelnames: tuple[str, ...]
+        Names of the labels every observation must provide.
+    buckets: tuple[float, ...]
+        Upper bounds of the buckets, in increasing order. A ``+Inf`` bucket is always added.
+    """
+
+    type = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: tuple[str, ...] = (),
+        buckets: tuple[float, ...] = DEFAULT_BUCKETS,
+    ) -> None:
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = labelnames
+        self.buckets = tuple(buckets) + (math.inf,)
+        self._values: dict[tuple[str, ...], tuple[list[int], list[float]]] = {}
+
+    def _key(self, labels: dict[str, str]) -> tuple[str, ...]:
+        return tuple(str(labels[name]) for name in self.labelnames)
+
+    def observe(self, value: float, **labels: str) -> None:
+        key = self._key(labels)
+        if key not in self._values:
+            self._values[key] = ([0] * len(self.buckets), [0.0])
+
+        counts, total = self._values[key]
+        counts[bisect.bisect_left(self.buckets, value)] += 1
+        total[0] += value
+
+    def count(self, **labels: str) -> int:
+        counts, _ = self._values.get(self._key(labels), ([0], [0.0]))
+        return sum(counts)
+
+    def samples(self) -> list[str]:
+        lines = []
+        for key, (counts, total) in sorted(self._values.items()):
+            labels = list(zip(self.labelnames, key))
+            cumulative = 0
+            for bound, count in zip(self.buckets, counts):
+                cumulative += count
+                bucket_labels = _format_labels([*labels, ("le", _format_value(bound))])
+                lines.append(f"{self.name}_bucket{bucket_labels} {cumulative}")
+            lines.append(f"{self.name}_sum{_format_labels(labels)} {_format_value(total[0])}")
+            lines.append(f"{self.name}_count{_format_labels(labels)} {cumulative}")
+        return lines
+
+
+class Registry:
+    """Collection of metrics rendered together in the Prometheus text exposition format.
+
+    Metrics are kept per process, so with several workers every worker has to be scraped (or the values summed)
+    to get totals.
+    """
+
+    def __init__(self) -> None:
+        self._metrics: dict[str, Counter | Gauge | Histogram] = {}
+
+    def counter(self, name: str, documentation: str, labelnames: tuple[str, ...] = ()) -> Counter:
+        if name not in self._metrics:
+            self._metrics[name] = Counter(name, documentation, labelnames)
+        metric = self._metrics[name]
+        assert isinstance(metric, Counter)
+        return metric
+
+    def gauge(self, name: str, documentation: str, labelnames: tuple[str, ...] = ()) -> Gauge:
+        if name not in self._metrics:
+            self._metrics[name] = Gauge(name, documentation, labelnames)
+        metric = self._metrics[name]
+        assert isinstance(metric, Gauge)
+        return metric
+
+    def histogram(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: tuple[str, ...] = (),
+        buckets: tuple[float, ...] = DEFAULT_BUCKETS,
+    ) -> Histogram:
+        if name not in self._metrics:
+            self._metrics[name] = Histogram(name, documentation, labelnames, buckets)
+        metric = self._metrics[name]
+        assert isinstance(metric, Histogram)
+        return metric
+
+    def render(self) -> str:
+        lines = []
+        for metric in self._metrics.values():
+            lines.append(f"# HELP {metric.name} {metric.documentation}")
+            lines.append(f"# TYPE {metric.name} {metric.type}")
+            lines.extend(metric.samples())
+        return "\n".join(lines) + "\n"
+
+
+registry = Registry()
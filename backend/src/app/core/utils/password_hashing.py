@@ -0,0 +1,81 @@
+import asyncio
+import time
+from collections.abc import Callable
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any
+
+import bcrypt
+
+from .metrics import registry
+
+PASSWORD_HASH_QUEUE_DEPTH = registry.gauge(
+    "password_hash_queue_depth", "Password hashes and verifications waiting for a free hashing thread."
+)
+PASSWORD_HASH_IN_PROGRESS = registry.gauge("password_hash_in_progress", "Password hashes and verifications running.")
+PASSWORD_HASH_WAIT = registry.histogram(
+    "password_hash_wait_seconds", "Time waited for a free hashing thread, by operation (hash, verify).", ("operation",)
+)
+PASSWORD_HASH_DURATION = registry.histogram(
+    "password_hash_duration_seconds", "Time spent hashing, by operation (hash, verify).", ("operation",)
+)
+
+
+def _verify(plain_password: str, hashed_password: str) -> bool:
+    correct_password: bool = bcrypt.checkpw(plain_password.encode(), hashed_password.encode())
+    return correct_password
+
+
+def _hash(password: str) -> str:
+    hashed_password: str = bcrypt.hashpw(password.encode(), bcrypt.gensalt()).decode()
+    return hashed_password
+
+
+class PasswordHasher:
+    """Hashes and verifies passwords with bcrypt in a dedicated thread pool, off the event loop.
+
+    bcrypt releases the GIL while hashing, so up to `concurrency` passwords are hashed in parallel while the event
+    loop keeps serving other requests. Further hashes wait their turn, which is what the queue depth and wait time
+    metrics report.
+
+    Parameters
+    ----------
+    concurrency: int, default 2
+        Maximum number of passwords hashed or verified at the same time.
+    """
+
+    def __init__(self, concurrency: int = 2) -> None:
+        self.concurrency = concurrency
+        self._semaphore = asyncio.Semaphore(concurrency)
+        self._executor: ThreadPoolExecutor | None = None
+
+    @property
+    def executor(self) -> ThreadPoolExecutor:
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(max_workers=self.concurrency, thread_name_prefix="bcrypt")
+        return self._executor
+
+    async def _run(self, operation: str, func: Callable[..., Any], *args: str) -> Any:
+        queued_at = time.perf_counter()
+        PASSWORD_HASH_QUEUE_DEPTH.inc()
+        try:
+            await self._semaphore.acquire()
+        finally:
+            PASSWORD_HASH_QUEUE_DEPTH.dec()
+
+        started_at = time.perf_counter()
+        PASSWORD_HASH_WAIT.observe(started_at - queued_at, operation=operation)
+        PASSWORD_HASH_IN_PROGRESS.inc()
+        try:
+            return await asyncio.get_running_loop().run_in_executor(self.executor, func, *args)
+        finally:
+            PASSWORD_HASH_IN_PROGRESS.dec()
+            self._semaphore.release()
+            PASSWORD_HASH_DURATION.observe(time.perf_counter() - started_at, operation=operation)
+
+    async def verify(self, plain_password: str, hashed_password: str) -> bool:
+        correct_password: bool = await self._run("verify", _verify, plain_password, hashed_password)
+        return correct_password
+
+    async def hash(self, password: str) -> str:
+        hashed_password: str = await self._run("hash", _hash, password)
+        return hashed_password
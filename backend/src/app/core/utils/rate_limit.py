@@ -1,38 +1,514 @@
-from datetime import UTC, datetime
+import asyncio
+import math
+import time
+from collections import OrderedDict
+from collections.abc import Callable
+from dataclasses import dataclass
 
 from redis.asyncio import ConnectionPool, Redis
+from redis.commands.core import AsyncScript
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from ...core.logger import logging
+from ...crud.crud_rate_limit import crud_rate_limits
+from ...crud.crud_tier import crud_tiers
 from ...schemas.rate_limit import sanitize_path
+from ..exceptions.rate_limit_exceptions import InvalidRateLimitAlgorithmError
+from .metrics import registry
 
 logger = logging.getLogger(__name__)
 
+RATE_LIMIT_DECISIONS = registry.counter(
+    "rate_limit_decisions_total", "Rate limit decisions by where they were taken (local, redis).", ("source", "result")
+)
+
+# Every script takes the key of the client being limited, the limit, the period in milliseconds and the number of
+# hits requested, reads the clock of the Redis server (so app servers with skewed clocks agree), grants as many of
+# the hits as the limit allows and returns {granted, remaining, reset_after_ms, retry_after_ms}. A cost of 0 reads
+# the state of the key without counting a hit; retry_after_ms is then set if the next hit would be limited.
+
+SLIDING_LOG_SCRIPT = """
+local key = KEYS[1]
+local limit = tonumber(ARGV[1])
+local period = tonumber(ARGV[2])
+local cost = tonumber(ARGV[3])
+local time = redis.call('TIME')
+local now = tonumber(time[1]) * 1000 + math.floor(tonumber(time[2]) / 1000)
+
+redis.call('ZREMRANGEBYSCORE', key, '-inf', now - period)
+local count = redis.call('ZCARD', key)
+local granted = math.max(0, math.min(cost, limit - count))
+for i = 0, granted - 1 do
+    redis.call('ZADD', key, now, now .. ':' .. (count + i))
+end
+if granted > 0 then
+    redis.call('PEXPIRE', key, period)
+    count = count + granted
+end
+
+local retry_after = 0
+if count >= limit then
+    local oldest = redis.call('ZRANGE', key, 0, 0, 'WITHSCORES')
+    retry_after = period
+    if oldest[2] then
+        retry_after = tonumber(oldest[2]) + period - now
+    end
+end
+
+local reset_after = 0
+local newest = redis.call('ZRANGE', key, -1, -1, 'WITHSCORES')
+if newest[2] then
+    reset_after = tonumber(newest[2]) + period - now
+end
+
+return {granted, math.max(0, limit - count), reset_after, retry_after}
+"""
+
+SLIDING_WINDOW_SCRIPT = """
+local key = KEYS[1]
+local limit = tonumber(ARGV[1])
+local period = tonumber(ARGV[2])
+local cost = tonumber(ARGV[3])
+local time = redis.call('TIME')
+local now = tonumber(time[1]) * 1000 + math.floor(tonumber(time[2]) / 1000)
+
+local window = math.floor(now / period)
+local elapsed = now - window * period
+local current = tonumber(redis.call('HGET', key, window) or 0)
+local previous = tonumber(redis.call('HGET', key, window - 1) or 0)
+local estimated = previous * (period - elapsed) / period + current
+
+local granted = math.max(0, math.min(cost, math.floor(limit - estimated)))
+if granted > 0 then
+    current = redis.call('HINCRBY', key, window, granted)
+    redis.call('HDEL', key, window - 2)
+    redis.call('PEXPIRE', key, 2 * period)
+    estimated = estimated + granted
+end
+
+local retry_after = 0
+if limit - estimated < 1 then
+    if current + 1 <= limit then
+        -- the previous window has to slide out until its weighted count leaves room for one request
+        retry_after = math.ceil(period - elapsed - (limit - 1 - current) * period / previous)
+    else
+        -- same, once the current window has become the previous one
+        retry_after = math.ceil(2 * period - elapsed - (limit - 1) * period / current)
+    end
+end
+
+local reset_after = 0
+if current > 0 then
+    reset_after = 2 * period - elapsed
+elseif previous > 0 then
+    reset_after = period - elapsed
+end
+
+return {granted, math.max(0, math.floor(limit - estimated)), reset_after, retry_after}
+"""
+
+GCRA_SCRIPT = """
+local key = KEYS[1]
+local limit = tonumber(ARGV[1])
+local period = tonumber(ARGV[2])
+local cost = tonumber(ARGV[3])
+local time = redis.call('TIME')
+local now = tonumber(time[1]) * 1000 + math.floor(tonumber(time[2]) / 1000)
+
+local emission_interval = period / limit
+local tat = math.max(tonumber(redis.call('GET', key) or now), now)
+local available = math.max(0, math.floor((now - tat + period) / emission_interval))
+local granted = math.min(cost, available)
+
+if granted == 0 then
+    local retry_after = 0
+    if available == 0 then
+        retry_after = math.ceil(tat + emission_interval - period - now)
+    end
+    return {0, available, math.ceil(tat - now), retry_after}
+end
+
+local new_tat = tat + granted * emission_interval
+redis.call('SET', key, string.format('%.17g', new_tat), 'PX', math.ceil(new_tat - now))
+return {granted, math.floor((now - new_tat + period) / emission_interval), math.ceil(new_tat - now), 0}
+"""
+
+SCRIPTS = {
+    "sliding_log": SLIDING_LOG_SCRIPT,
+    "sliding_window": SLIDING_WINDOW_SCRIPT,
+    "gcra": GCRA_SCRIPT,
+}
+
+
+@dataclass(frozen=True)
+class RateLimitResult:
+    limited: bool
+    limit: int
+    remaining: int
+    reset_after: float
+    retry_after: float
+    granted: int = 1
+
+
+class RateLimiter:
+    """Rate limiter running its algorithm as a single atomic EVALSHA call.
+
+    Algorithms:
+
+    - ``sliding_log``: keeps the timestamp of every request of the period in a sorted set. Exact, but its memory
+      grows with the limit.
+    - ``sliding_window``: weights the count of the previous fixed window by how much of it still overlaps the
+      sliding window. Approximate, with constant memory, and without the 2x bursts of fixed windows.
+    - ``gcra``: the generic cell rate algorithm, a token bucket refilled continuously, allowing bursts of up to
+      `limit` requests. A single key holding a timestamp.
+
+    Parameters
+    ----------
+    algorithm: str
+        One of "sliding_log", "sliding_window" or "gcra".
+
+    Raises
+    ------
+    InvalidRateLimitAlgorithmError
+        If the algorithm is unknown.
+    """
+
+    def __init__(self, algorithm: str = "sliding_window") -> None:
+        if algorithm not in SCRIPTS:
+            raise InvalidRateLimitAlgorithmError(f"Unknown rate limit algorithm '{algorithm}'.")
+
+        self.algorithm = algorithm
+        self._script: AsyncScript | None = None
+
+    def _get_script(self, redis_client: Redis) -> AsyncScript:
+        if self._script is None or self._script.registered_client is not redis_client:
+            self._script = redis_client.register_script(SCRIPTS[self.algorithm])
+        return self._script
+
+    async def hit(self, redis_client: Redis, key: str, limit: int, period: int, cost: int = 1) -> RateLimitResult:
+        """Count `cost` requests against the limit of `key`, or as many of them as the limit allows.
+
+        Parameters
+        ----------
+        redis_client: Redis
+            The client of the Redis server holding the rate limit state.
+        key: str
+            The key identifying who is being limited.
+        limit: int
+            The number of requests allowed per period.
+        period: int
+            The period in seconds.
+        cost: int, default 1
+            The number of requests to count.
+
+        Returns
+        -------
+        RateLimitResult
+            Whether no request was granted, the remaining quota, the time in seconds until the quota is fully
+            restored, if limited, the time in seconds until a request would be allowed again, and the number of
+            requests granted.
+        """
+        script = self._get_script(redis_client)
+        granted, remaining, reset_after, retry_after = await script(keys=[key], args=[limit, period * 1000, cost])
+        return RateLimitResult(
+            limited=not granted,
+            limit=limit,
+            remaining=remaining,
+            reset_after=reset_after / 1000,
+            retry_after=retry_after / 1000,
+            granted=granted,
+        )
+
+    async def usage(self, redis_client: Redis, limits: list[tuple[str, int, int]]) -> list[RateLimitResult]:
+        """Read the state of several keys in a single pipelined call, without counting any request.
+
+        Parameters
+        ----------
+        redis_client: Redis
+            The client of the Redis server holding the rate limit state.
+        limits: List[Tuple[str, int, int]]
+            The key, limit and period in seconds of each rate limit to read.
+
+        Returns
+        -------
+        List[RateLimitResult]
+            The state of each rate limit, in the same order, `limited` meaning the next request would be.
+        """
+        script = self._get_script(redis_client)
+        async with redis_client.pipeline(transaction=False) as pipe:
+            for key, limit, period in limits:
+                await script(keys=[key], args=[limit, period * 1000, 0], client=pipe)
+            responses = await pipe.execute()
+
+        return [
+            RateLimitResult(
+                limited=remaining == 0,
+                limit=limit,
+                remaining=remaining,
+                reset_after=reset_after / 1000,
+                retry_after=retry_after / 1000,
+                granted=0,
+            )
+            for (_, limit, _), (_, remaining, reset_after, retry_after) in zip(limits, responses)
+        ]
+
+
+class _Lease:
+    __slots__ = ("tokens", "remaining", "expires_at", "blocked_until", "reset_at")
+
+    def __init__(self, tokens: int, remaining: int, expires_at: float, blocked_until: float, reset_at: float) -> None:
+        self.tokens = tokens
+        self.remaining = remaining
+        self.expires_at = expires_at
+        self.blocked_until = blocked_until
+        self.reset_at = reset_at
+
+
+class HybridRateLimiter:
+    """Rate limiter deciding most requests in-process, and syncing with Redis in batches.
+
+    Instead of counting requests one by one in Redis, each worker leases up to `tolerance * limit` hits of a key
+    at once and admits requests locally until the lease is used up or expires. Close to the limit, hits are counted
+    one by one again. Once Redis reports a key as limited, its requests are rejected locally until it may be allowed
+    again, so clients far over their limit cost no Redis call at all.
+
+    Leased hits are counted in Redis before being used, so no more than `limit` requests are admitted, but hits
+    leased by a worker and not used before the lease expires are lost: at most `tolerance * limit` per worker.
+
+    Parameters
+    ----------
+    limiter: RateLimiter
+        The limiter used to count hits in Redis.
+    tolerance: float, default 0.1
+        Fraction of the limit leased by a worker at once.
+    max_keys: int, default 10000
+        Maximum number of keys tracked in-process, the least recently used ones are dropped first.
+    """
+
+    def __init__(self, limiter: RateLimiter, tolerance: float = 0.1, max_keys: int = 10000) -> None:
+        self.limiter = limiter
+        self.algorithm = limiter.algorithm
+        self.tolerance = tolerance
+        self.max_keys = max_keys
+        self._leases: OrderedDict[str, _Lease] = OrderedDict()
+
+    def _local_decision(self, key: str, limit: int, now: float) -> RateLimitResult | None:
+        lease = self._leases.get(key)
+        if lease is None:
+            return None
+
+        reset_after = max(0.0, lease.reset_at - now)
+        if now < lease.blocked_until:
+            return RateLimitResult(
+                limited=True,
+                limit=limit,
+                remaining=0,
+                reset_after=reset_after,
+                retry_after=lease.blocked_until - now,
+                granted=0,
+            )
+
+        if lease.tokens > 0 and now < lease.expires_at:
+            lease.tokens -= 1
+            return RateLimitResult(
+                limited=False,
+                limit=limit,
+                remaining=lease.remaining + lease.tokens,
+                reset_after=reset_after,
+                retry_after=0,
+            )
+
+        return None
+
+    async def hit(self, redis_client: Redis, key: str, limit: int, period: int) -> RateLimitResult:
+        """Count a request against the limit of `key`, locally when possible, see `RateLimiter.hit`."""
+        now = time.monotonic()
+        result = self._local_decision(key, limit, now)
+        if result is not None:
+            RATE_LIMIT_DECISIONS.inc(source="local", result="limited" if result.limited else "allowed")
+            return result
+
+        batch = max(1, int(limit * self.tolerance))
+        lease = self._leases.get(key)
+        cost = batch if lease is None or lease.remaining >= batch else 1
+
+        result = await self.limiter.hit(redis_client, key, limit, period, cost)
+        RATE_LIMIT_DECISIONS.inc(source="redis", result="limited" if result.limited else "allowed")
+
+        self._leases[key] = _Lease(
+            tokens=max(0, result.granted - 1),
+            remaining=result.remaining,
+            expires_at=now + period * self.tolerance,
+            blocked_until=now + result.retry_after if result.limited else 0.0,
+            reset_at=now + result.reset_after,
+        )
+        self._leases.move_to_end(key)
+        while len(self._leases) > self.max_keys:
+            self._leases.popitem(last=False)
+
+        return RateLimitResult(
+            limited=result.limited,
+            limit=limit,
+            remaining=result.remaining + max(0, result.granted - 1),
+            reset_after=result.reset_after,
+            retry_after=result.retry_after,
+            granted=min(1, result.granted),
+        )
+
+    async def usage(self, redis_client: Redis, limits: list[tuple[str, int, int]]) -> list[RateLimitResult]:
+        """Read the state of several keys in Redis, see `RateLimiter.usage`. Hits leased by workers count as used."""
+        return await self.limiter.usage(redis_client, limits)
+
+
+class RateLimitPolicies:
+    """In-process copy of the tiers and their rate limits, so rate limited requests need no database query.
+
+    The whole table is reloaded whenever a tier or rate limit is written, see `publish_policy_change`.
+    """
+
+    def __init__(self) -> None:
+        self.loaded = False
+        self.tiers: dict[int, str] = {}
+        self.limits: dict[tuple[int, str], tuple[int, int]] = {}
+        self.paths: frozenset[str] = frozenset()
+
+    async def load(self, db: AsyncSession) -> None:
+        tiers = await crud_tiers.get_multi(db=db, limit=None, return_total_count=False)
+        rate_limits = await crud_rate_limits.get_multi(db=db, limit=None, return_total_count=False)
+
+        self.tiers = {tier["id"]: tier["name"] for tier in tiers["data"]}
+        self.limits = {
+            (rate_limit["tier_id"], rate_limit["path"]): (rate_limit["limit"], rate_limit["period"])
+            for rate_limit in rate_limits["data"]
+        }
+        self.paths = frozenset(path for _, path in self.limits)
+        self.loaded = True
+
+    def get(self, tier_id: int, path: str) -> tuple[int, int] | None:
+        return self.limits.get((tier_id, path))
+
+    def for_tier(self, tier_id: int) -> dict[str, tuple[int, int]]:
+        return {path: limit for (limit_tier_id, path), limit in self.limits.items() if limit_tier_id == tier_id}
+
+
 pool: ConnectionPool | None = None
 client: Redis | None = None
+limiter: RateLimiter | HybridRateLimiter = RateLimiter()
+policies: RateLimitPolicies = RateLimitPolicies()
+policy_channel: str = "ratelimit:policies"
+_policy_listener: asyncio.Task | None = None
 
 
-async def is_rate_limited(db: AsyncSession, user_id: int, path: str, limit: int, period: int) -> bool:
+def _key(user_id: int | str, path: str) -> str:
+    # Each algorithm stores a different Redis type, so switching algorithms must not reuse the keys of the previous one.
+    return f"ratelimit:{limiter.algorithm}:{user_id}:{sanitize_path(path)}"
+
+
+def rate_limit_headers(result: RateLimitResult) -> dict[str, str]:
+    """Headers telling a client its quota, and when to retry if limited. Times are in seconds, rounded up."""
+    headers = {
+        "X-RateLimit-Limit": str(result.limit),
+        "X-RateLimit-Remaining": str(result.remaining),
+        "X-RateLimit-Reset": str(math.ceil(result.reset_after)),
+    }
+    if result.limited:
+        headers["Retry-After"] = str(math.ceil(result.retry_after))
+    return headers
+
+
+async def check_rate_limit(user_id: int | str, path: str, limit: int, period: int) -> RateLimitResult:
     if client is None:
         logger.error("Redis client is not initialized.")
         raise Exception("Redis client is not initialized.")
 
-    current_timestamp = int(datetime.now(UTC).timestamp())
-    window_start = current_timestamp - (current_timestamp % period)
-
-    sanitized_path = sanitize_path(path)
-    key = f"ratelimit:{user_id}:{sanitized_path}:{window_start}"
+    key = _key(user_id, path)
 
     try:
-        current_count = await client.incr(key)
-        if current_count == 1:
-            await client.expire(key, period)
-
-        if current_count > limit:
-            return True
+        return await limiter.hit(client, key, limit, period)
 
     except Exception as e:
         logger.exception(f"Error checking rate limit for user {user_id} on path {path}: {e}")
         raise e
 
-    return False
+
+async def is_rate_limited(db: AsyncSession, user_id: int, path: str, limit: int, period: int) -> bool:
+    result = await check_rate_limit(user_id=user_id, path=path, limit=limit, period=period)
+    return result.limited
+
+
+async def read_usage(user_id: int | str, limits: dict[str, tuple[int, int]]) -> dict[str, RateLimitResult]:
+    """Read the live state of the rate limits of a client on several paths, in a single pipelined call.
+
+    Parameters
+    ----------
+    user_id: int | str
+        The id of the user, or the IP address of an anonymous client.
+    limits: Dict[str, Tuple[int, int]]
+        The limit and period in seconds of each path.
+
+    Returns
+    -------
+    Dict[str, RateLimitResult]
+        The state of the rate limit of each path.
+    """
+    if client is None:
+        logger.error("Redis client is not initialized.")
+        raise Exception("Redis client is not initialized.")
+
+    paths = list(limits)
+    results = await limiter.usage(client, [(_key(user_id, path), *limits[path]) for path in paths])
+    return dict(zip(paths, results))
+
+
+async def publish_policy_change() -> None:
+    """Tell every worker to reload its rate limit policies, after a tier or rate limit was written."""
+    if client is None:
+        return
+
+    await client.publish(policy_channel, "reload")
+
+
+async def _listen_for_policy_changes(session_factory: Callable[[], AsyncSession]) -> None:
+    """Reload the rate limit policies whenever a change is published by any worker.
+
+    Policies are also reloaded whenever the subscription is (re)established, since changes published while
+    disconnected are lost.
+    """
+    if client is None:
+        logger.error("Redis client is not initialized.")
+        raise Exception("Redis client is not initialized.")
+
+    while True:
+        try:
+            async with client.pubsub(ignore_subscribe_messages=True) as pubsub:
+                await pubsub.subscribe(policy_channel)
+                async with session_factory() as db:
+                    await policies.load(db)
+
+                async for _ in pubsub.listen():
+                    async with session_factory() as db:
+                        await policies.load(db)
+
+        except asyncio.CancelledError:
+            raise
+
+        except Exception as e:
+            logger.warning(f"Rate limit policy listener disconnected: {e}")
+            await asyncio.sleep(1)
+
+
+async def start_policy_listener(session_factory: Callable[[], AsyncSession]) -> None:
+    global _policy_listener
+    if _policy_listener is None:
+        _policy_listener = asyncio.create_task(_listen_for_policy_changes(session_factory))
+
+
+async def stop_policy_listener() -> None:
+    global _policy_listener
+    if _policy_listener is not None:
+        _policy_listener.cancel()
+        try:
+            await _policy_listener
+        except asyncio.CancelledError:
+            pass
+        _policy_listener = None
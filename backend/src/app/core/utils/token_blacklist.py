@@ -0,0 +1,215 @@
+import asyncio
+import hashlib
+import math
+import time
+from datetime import datetime
+from typing import Any
+
+from redis.asyncio import ConnectionPool, Redis
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from ..db.crud_token_blacklist import crud_token_blacklist
+from ..logger import logging
+from .jwt_backends import JWTSigner
+from .metrics import registry
+
+logger = logging.getLogger(__name__)
+
+TOKEN_BLACKLIST_LOOKUPS = registry.counter(
+    "token_blacklist_lookups_total",
+    "Token blacklist lookups by where they were answered (bloom, redis).",
+    ("source", "result"),
+)
+
+KEY_PREFIX = "token_blacklist:"
+
+
+class BloomFilter:
+    """Set of strings answering membership with no false negatives and about `error_rate` false positives.
+
+    Parameters
+    ----------
+    capacity: int
+        The number of items for which the false positive rate is `error_rate`, it grows past it.
+    error_rate: float
+        The false positive rate once `capacity` items were added.
+    """
+
+    def __init__(self, capacity: int = 100000, error_rate: float = 0.001) -> None:
+        self.capacity = capacity
+        self.size = max(64, math.ceil(-capacity * math.log(error_rate) / math.log(2) ** 2))
+        self.hashes = max(1, round(self.size / capacity * math.log(2)))
+        self.count = 0
+        self._bits = bytearray((self.size + 7) // 8)
+
+    def _positions(self, item: str) -> list[int]:
+        digest = hashlib.blake2b(item.encode(), digest_size=16).digest()
+        first = int.from_bytes(digest[:8], "little")
+        second = int.from_bytes(digest[8:], "little") | 1
+        return [(first + i * second) % self.size for i in range(self.hashes)]
+
+    def add(self, item: str) -> None:
+        for position in self._positions(item):
+            self._bits[position >> 3] |= 1 << (position & 7)
+        self.count += 1
+
+    def __contains__(self, item: str) -> bool:
+        return all(self._bits[position >> 3] & (1 << (position & 7)) for position in self._positions(item))
+
+
+pool: ConnectionPool | None = None
+client: Redis | None = None
+bloom: BloomFilter | None = None
+channel: str = "token_blacklist"
+# Whether the live rows of the `token_blacklist` table were moved to Redis, until then lookups also query it.
+migrated: bool = False
+_listener: asyncio.Task | None = None
+
+
+def token_id(token: str, payload: dict[str, Any]) -> str:
+    """The `jti` claim of a token, or a hash of the token for tokens issued without one."""
+    jti = payload.get("jti")
+    return str(jti) if jti else hashlib.sha256(token.encode()).hexdigest()
+
+
+async def add(jti: str, expires_at: float) -> None:
+    """Blacklist a token until it expires, and tell every worker to add it to its Bloom filter.
+
+    Parameters
+    ----------
+    jti: str
+        The id of the token, see `token_id`.
+    expires_at: float
+        The expiration time of the token, as a Unix timestamp.
+    """
+    if client is None:
+        logger.error("Redis client is not initialized.")
+        raise Exception("Redis client is not initialized.")
+
+    ttl = math.ceil((expires_at - time.time()) * 1000)
+    if ttl <= 0:
+        return
+
+    async with client.pipeline(transaction=False) as pipe:
+        pipe.set(f"{KEY_PREFIX}{jti}", 1, px=ttl)
+        pipe.publish(channel, jti)
+        await pipe.execute()
+
+    if bloom is not None:
+        bloom.add(jti)
+
+
+async def contains(jti: str) -> bool:
+    """Whether a token is blacklisted, without any I/O if the Bloom filter rules it out."""
+    if client is None:
+        logger.error("Redis client is not initialized.")
+        raise Exception("Redis client is not initialized.")
+
+    if bloom is not None and jti not in bloom:
+        TOKEN_BLACKLIST_LOOKUPS.inc(source="bloom", result="absent")
+        return False
+
+    blacklisted = bool(await client.exists(f"{KEY_PREFIX}{jti}"))
+    TOKEN_BLACKLIST_LOOKUPS.inc(source="redis", result="present" if blacklisted else "absent")
+    return blacklisted
+
+
+async def _load_bloom(capacity: int, error_rate: float) -> BloomFilter:
+    if client is None:
+        logger.error("Redis client is not initialized.")
+        raise Exception("Redis client is not initialized.")
+
+    jtis = [key.decode()[len(KEY_PREFIX) :] async for key in client.scan_iter(match=f"{KEY_PREFIX}*", count=1000)]
+    loaded = BloomFilter(max(capacity, 2 * len(jtis)), error_rate)
+    for jti in jtis:
+        loaded.add(jti)
+    return loaded
+
+
+async def _listen_for_blacklisted_tokens(capacity: int, error_rate: float) -> None:
+    """Keep the Bloom filter in sync with the tokens blacklisted by any worker.
+
+    The filter is rebuilt from the keys in Redis whenever the subscription is (re)established, since tokens
+    published while disconnected are lost, and once more tokens than its capacity were added, which also drops
+    the expired ones. Until it is rebuilt, every lookup goes to Redis.
+    """
+    global bloom
+    if client is None:
+        logger.error("Redis client is not initialized.")
+        raise Exception("Redis client is not initialized.")
+
+    while True:
+        try:
+            async with client.pubsub(ignore_subscribe_messages=True) as pubsub:
+                await pubsub.subscribe(channel)
+                bloom = await _load_bloom(capacity, error_rate)
+
+                async for message in pubsub.listen():
+                    bloom.add(message["data"].decode())
+                    if bloom.count > bloom.capacity:
+                        bloom = await _load_bloom(capacity, error_rate)
+
+        except asyncio.CancelledError:
+            raise
+
+        except Exception as e:
+            bloom = None
+            logger.warning(f"Token blacklist listener disconnected: {e}")
+            await asyncio.sleep(1)
+
+
+async def start_listener(capacity: int = 100000, error_rate: float = 0.001) -> None:
+    global _listener
+    if _listener is None:
+        _listener = asyncio.create_task(_listen_for_blacklisted_tokens(capacity, error_rate))
+
+
+async def stop_listener() -> None:
+    global _listener, bloom
+    if _listener is not None:
+        _listener.cancel()
+        try:
+            await _listener
+        except asyncio.CancelledError:
+            pass
+        _listener = None
+        bloom = None
+
+
+async def purge_table(db: AsyncSession, signer: JWTSigner) -> int:
+    """Delete the expired rows of the `token_blacklist` table, after moving the other ones to Redis if configured.
+
+    Once moved, the table is no longer queried to verify tokens, see `migrated`.
+
+    Parameters
+    ----------
+    db: AsyncSession
+        The database session.
+    signer: JWTSigner
+        The signer reading the claims of the moved tokens, which were verified before being blacklisted.
+
+    Returns
+    -------
+    int
+        The number of rows deleted.
+    """
+    global migrated
+    now = datetime.now()
+    deleted = 0
+    if client is not None:
+        rows = await crud_token_blacklist.get_multi(db=db, limit=None, return_total_count=False, expires_at__gte=now)
+        for row in rows["data"]:
+            await add(token_id(row["token"], signer.unverified_claims(row["token"])), row["expires_at"].timestamp())
+
+        if rows["data"]:
+            ids = [row["id"] for row in rows["data"]]
+            await crud_token_blacklist.db_delete(db=db, allow_multiple=True, id__in=ids)
+            deleted += len(ids)
+        migrated = True
+
+    expired = await crud_token_blacklist.count(db=db, expires_at__lt=now)
+    if expired:
+        await crud_token_blacklist.db_delete(db=db, allow_multiple=True, expires_at__lt=now)
+        deleted += expired
+
+    return deleted
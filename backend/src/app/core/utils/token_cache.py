@@ -0,0 +1,165 @@
+import asyncio
+import hashlib
+import time
+from collections import OrderedDict
+from typing import Any
+
+from ..logger import logging
+from . import token_blacklist
+from .metrics import registry
+
+logger = logging.getLogger(__name__)
+
+TOKEN_CACHE_REQUESTS = registry.counter(
+    "token_cache_requests_total",
+    "Verified token cache lookups by what was looked up (claims, user).",
+    ("kind", "result"),
+)
+
+
+class _Entry:
+    __slots__ = ("claims", "user", "expires_at")
+
+    def __init__(self, claims: dict[str, Any], expires_at: float) -> None:
+        self.claims = claims
+        self.user: dict[str, Any] | None = None
+        self.expires_at = expires_at
+
+
+class VerifiedTokenCache:
+    """In-process LRU cache of the verified claims of tokens, and of the user they resolve to.
+
+    Entries are keyed by a hash of the token and expire after `ttl` seconds, or when the token does if sooner. They
+    hold no blacklist state: blacklisted tokens are still rejected by the blacklist lookup done for every request.
+
+    Parameters
+    ----------
+    max_size: int, default 10000
+        Maximum number of tokens cached, the least recently used ones are dropped first. 0 disables the cache.
+    ttl: int, default 60
+        Maximum time in seconds an entry is used, and so how long a user row may be served after a change made by
+        other means than the API.
+    """
+
+    def __init__(self, max_size: int = 10000, ttl: int = 60) -> None:
+        self.max_size = max_size
+        self.ttl = ttl
+        self._entries: OrderedDict[bytes, _Entry] = OrderedDict()
+
+    @staticmethod
+    def _key(token: str) -> bytes:
+        return hashlib.sha256(token.encode()).digest()
+
+    def _get(self, token: str) -> _Entry | None:
+        key = self._key(token)
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+
+        if entry.expires_at <= time.monotonic():
+            del self._entries[key]
+            return None
+
+        self._entries.move_to_end(key)
+        return entry
+
+    def get_claims(self, token: str) -> dict[str, Any] | None:
+        entry = self._get(token)
+        TOKEN_CACHE_REQUESTS.inc(kind="claims", result="miss" if entry is None else "hit")
+        return None if entry is None else entry.claims
+
+    def set_claims(self, token: str, claims: dict[str, Any]) -> None:
+        if self.max_size <= 0:
+            return
+
+        lifetime = min(self.ttl, claims.get("exp", float("inf")) - time.time())
+        if lifetime <= 0:
+            return
+
+        key = self._key(token)
+        self._entries[key] = _Entry(claims, time.monotonic() + lifetime)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+
+    def get_user(self, token: str) -> dict[str, Any] | None:
+        entry = self._get(token)
+        user = None if entry is None else entry.user
+        TOKEN_CACHE_REQUESTS.inc(kind="user", result="miss" if user is None else "hit")
+        return user
+
+    def set_user(self, token: str, user: dict[str, Any]) -> None:
+        entry = self._get(token)
+        if entry is not None:
+            entry.user = user
+
+    def evict(self, token: str) -> None:
+        self._entries.pop(self._key(token), None)
+
+    def evict_user(self, username: str) -> None:
+        stale = [
+            key
+            for key, entry in self._entries.items()
+            if entry.claims.get("sub") == username or (entry.user is not None and entry.user["username"] == username)
+        ]
+        for key in stale:
+            del self._entries[key]
+
+    def clear(self) -> None:
+        self._entries.clear()
+
+
+channel: str = "token_cache:users"
+_listener: asyncio.Task | None = None
+
+
+async def publish_user_change(username: str) -> None:
+    """Tell every worker to evict the tokens of a user, after it was updated or deleted."""
+    if token_blacklist.client is None:
+        return
+
+    await token_blacklist.client.publish(channel, username)
+
+
+async def _listen_for_user_changes(cache: VerifiedTokenCache) -> None:
+    """Evict the tokens of every user changed by any worker.
+
+    The whole cache is cleared whenever the subscription is (re)established, since changes published while
+    disconnected are lost.
+    """
+    if token_blacklist.client is None:
+        logger.error("Redis client is not initialized.")
+        raise Exception("Redis client is not initialized.")
+
+    while True:
+        try:
+            async with token_blacklist.client.pubsub(ignore_subscribe_messages=True) as pubsub:
+                await pubsub.subscribe(channel)
+                cache.clear()
+
+                async for message in pubsub.listen():
+                    cache.evict_user(message["data"].decode())
+
+        except asyncio.CancelledError:
+            raise
+
+        except Exception as e:
+            logger.warning(f"Token cache listener disconnected: {e}")
+            await asyncio.sleep(1)
+
+
+async def start_listener(cache: VerifiedTokenCache) -> None:
+    global _listener
+    if _listener is None:
+        _listener = asyncio.create_task(_listen_for_user_changes(cache))
+
+
+async def stop_listener() -> None:
+    global _listener
+    if _listener is not None:
+        _listener.cancel()
+        try:
+            await _listener
+        except asyncio.CancelledError:
+            pass
+        _listener = None
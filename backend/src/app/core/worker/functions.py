@@ -4,10 +4,26 @@ import logging
 import uvloop
 from arq.worker import Worker
 
+from ...api import warmable  # noqa: F401 - registers the endpoints decorated with track_access for warm_cache
+from ..config import settings
+from ..db.database import local_session
+from ..security import jwt_signer
+from ..setup import (
+    close_redis_cache_pool,
+    close_redis_token_blacklist_pool,
+    create_redis_cache_pool,
+    create_redis_token_blacklist_pool,
+)
+from ..utils import cache, downloads, token_blacklist
+from ..utils.download_cache import DownloadCache
+
 asyncio.set_event_loop_policy(uvloop.EventLoopPolicy())
 
 logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(name)s - %(levelname)s - %(message)s")
 
+youtube_downloader = downloads.Downloader(settings.YOUTUBE_DOWNLOAD_CONCURRENCY, settings.YOUTUBE_DOWNLOAD_TIMEOUT)
+youtube_cache = DownloadCache(settings.YOUTUBE_DOWNLOAD_DIR, settings.YOUTUBE_DOWNLOAD_CACHE_SIZE_MB * 1024 * 1024)
+
 
 # -------- background tasks --------
 async def sample_background_task(ctx: Worker, name: str) -> str:
@@ -15,10 +31,52 @@ async def sample_background_task(ctx: Worker, name: str) -> str:
     return f"Task {name} is complete!"
 
 
+async def warm_cache(ctx: Worker) -> int:
+    warmed = await cache.warm(
+        local_session, top=settings.CACHE_WARMING_TOP_KEYS, concurrency=settings.CACHE_WARMING_CONCURRENCY
+    )
+    logging.info(f"Warmed {warmed} cache entries")
+    return warmed
+
+
+async def purge_token_blacklist(ctx: Worker) -> int:
+    async with local_session() as db:
+        purged = await token_blacklist.purge_table(db, jwt_signer)
+    logging.info(f"Purged {purged} token blacklist rows")
+    return purged
+
+
+async def download_youtube_video(
+    ctx: Worker, url: str, resolution: str, format: str, client_id: str | None = None
+) -> dict[str, str]:
+    return await downloads.download_job(
+        ctx["redis"],
+        youtube_downloader,
+        youtube_cache,
+        ctx["job_id"],
+        url,
+        resolution,
+        format,
+        client_id,
+    )
+
+
+async def sweep_downloads(ctx: Worker) -> int:
+    swept = await asyncio.get_running_loop().run_in_executor(
+        None, youtube_cache.sweep, settings.YOUTUBE_DOWNLOAD_CACHE_TTL
+    )
+    logging.info(f"Swept {swept} expired downloads")
+    return swept
+
+
 # -------- base functions --------
 async def startup(ctx: Worker) -> None:
+    await create_redis_cache_pool()
+    await create_redis_token_blacklist_pool(listen=False)
     logging.info("Worker Started")
 
 
 async def shutdown(ctx: Worker) -> None:
+    await close_redis_cache_pool()
+    await close_redis_token_blacklist_pool()
     logging.info("Worker end")
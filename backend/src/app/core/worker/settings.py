@@ -1,14 +1,29 @@
+from arq import cron, func
 from arq.connections import RedisSettings
 
 from ...core.config import settings
-from .functions import sample_background_task, shutdown, startup
+from .functions import (
+    download_youtube_video,
+    purge_token_blacklist,
+    sample_background_task,
+    shutdown,
+    startup,
+    sweep_downloads,
+    warm_cache,
+)
 
 REDIS_QUEUE_HOST = settings.REDIS_QUEUE_HOST
 REDIS_QUEUE_PORT = settings.REDIS_QUEUE_PORT
+# download jobs may wait for a free download slot before their own YOUTUBE_DOWNLOAD_TIMEOUT starts
+DOWNLOAD_JOB_TIMEOUT = 3600
 
 
 class WorkerSettings:
-    functions = [sample_background_task]
+    functions = [sample_background_task, warm_cache, func(download_youtube_video, timeout=DOWNLOAD_JOB_TIMEOUT)]
+    cron_jobs = [
+        cron(purge_token_blacklist, minute=0, run_at_startup=True),
+        cron(sweep_downloads, minute={0, 15, 30, 45}, run_at_startup=True),
+    ]
     redis_settings = RedisSettings(host=REDIS_QUEUE_HOST, port=REDIS_QUEUE_PORT)
     on_startup = startup
     on_shutdown = shutdown
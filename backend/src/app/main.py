@@ -1,4 +1,4 @@
-from .api import router
+from .api.router import router
 from .core.config import settings
 from .core.setup import create_application
 from fastapi.middleware.cors import CORSMiddleware
@@ -0,0 +1,117 @@
+from collections.abc import Callable
+from typing import Any
+
+from sqlalchemy.ext.asyncio import AsyncSession
+from starlette.datastructures import MutableHeaders
+from starlette.responses import JSONResponse
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from ..core.config import settings
+from ..core.db.database import local_session
+from ..core.exceptions.jwt_exceptions import InvalidTokenError
+from ..core.security import jwt_signer, token_cache
+from ..core.utils import rate_limit, token_blacklist
+from ..core.utils.rate_limit import check_rate_limit, policies, rate_limit_headers
+from ..schemas.rate_limit import sanitize_path
+
+
+def _bearer_token(scope: Scope) -> str | None:
+    for name, value in scope["headers"]:
+        if name == b"authorization":
+            token_type, _, token = value.decode("latin-1").partition(" ")
+            return token if token_type.lower() == "bearer" and token else None
+
+    return None
+
+
+async def _access_token_claims(token: str) -> dict[str, Any] | None:
+    """The claims of `token` if it is an access token that is not blacklisted, None otherwise.
+
+    Access tokens are told apart from refresh tokens by their `tier_id` claim. Blacklisted tokens are ruled out by
+    the Bloom filter of the token blacklist without any I/O for most tokens.
+    """
+    claims = token_cache.get_claims(token)
+    if claims is None:
+        try:
+            claims = jwt_signer.decode(token)
+        except InvalidTokenError:
+            return None
+        token_cache.set_claims(token, claims)
+
+    if "tier_id" not in claims or not claims.get("sub"):
+        return None
+    if token_blacklist.client is not None and await token_blacklist.contains(token_blacklist.token_id(token, claims)):
+        return None
+    return claims
+
+
+class RateLimitMiddleware:
+    """Pure ASGI middleware rate limiting requests before routing, as an alternative to the `rate_limiter` dependency.
+
+    Only paths with a rate limit in the policy table (for any tier) are limited. Users are identified by the `sub`
+    claim of their access token and their tier by its `tier_id` claim, so no database session is opened and over the
+    limit requests are rejected before reaching the application. Requests without a valid token are limited by
+    client IP address, and users without a rate limit for the path get the default one. Refresh, blacklisted and
+    invalid tokens are limited by IP address as well, but leave the request to be limited again by the
+    `rate_limiter` dependency, which verifies the token itself.
+
+    Parameters
+    ----------
+    app: ASGIApp
+        The application to wrap.
+    session_factory: Callable[[], AsyncSession]
+        Factory of the database session used to load the policy table, if no policy listener loaded it yet.
+
+    Note
+    ----
+        - The tier in an access token is the one of the user when it was issued, so a tier change applies once
+        the token is refreshed.
+    """
+
+    def __init__(self, app: ASGIApp, session_factory: Callable[[], AsyncSession] = local_session) -> None:
+        self.app = app
+        self.session_factory = session_factory
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http" or rate_limit.client is None:
+            await self.app(scope, receive, send)
+            return
+
+        if not policies.loaded:
+            async with self.session_factory() as db:
+                await policies.load(db)
+
+        path = sanitize_path(scope["path"])
+        if path not in policies.paths:
+            await self.app(scope, receive, send)
+            return
+
+        limit, period = settings.DEFAULT_RATE_LIMIT_LIMIT, settings.DEFAULT_RATE_LIMIT_PERIOD
+        token = _bearer_token(scope)
+        claims = await _access_token_claims(token) if token else None
+        if claims is not None:
+            user_id = claims["sub"]
+            tier_id = claims.get("tier_id")
+            if tier_id is not None:
+                limit, period = policies.get(tier_id, path) or (limit, period)
+        else:
+            user_id = scope["client"][0] if scope.get("client") else "unknown"
+
+        result = await check_rate_limit(user_id=user_id, path=path, limit=limit, period=period)
+        headers = rate_limit_headers(result)
+        if result.limited:
+            response = JSONResponse({"detail": "Rate limit exceeded."}, status_code=429, headers=headers)
+            await response(scope, receive, send)
+            return
+
+        # Not set for rejected tokens, so that the `rate_limiter` dependency still limits these requests.
+        if claims is not None or token is None:
+            scope.setdefault("state", {})["rate_limit"] = result
+
+        async def send_with_headers(message: Message) -> None:
+            if message["type"] == "http.response.start":
+                message.setdefault("headers", [])
+                MutableHeaders(scope=message).update(headers)
+            await send(message)
+
+        await self.app(scope, receive, send_with_headers)
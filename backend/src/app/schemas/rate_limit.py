@@ -58,3 +58,12 @@ class RateLimitUpdateInternal(RateLimitUpdate):
 
 class RateLimitDelete(BaseModel):
     pass
+
+
+class RateLimitUsage(BaseModel):
+    path: Annotated[str, Field(examples=["users"])]
+    limit: Annotated[int, Field(examples=[5])]
+    period: Annotated[int, Field(examples=[60])]
+    remaining: Annotated[int, Field(examples=[3])]
+    reset_after: Annotated[float, Field(examples=[42.5], description="Seconds until the quota is fully restored")]
+    retry_after: Annotated[float, Field(examples=[0], description="Seconds until the next request is allowed")]
@@ -0,0 +1,308 @@
+import asyncio
+import json
+import subprocess
+import sys
+import time
+from typing import Any
+
+import httpx
+import pytest
+from fakeredis import FakeAsyncRedis, FakeServer
+from fastapi import FastAPI, Request
+from pytest_mock import MockerFixture
+from redis.asyncio import RedisCluster
+from redis.asyncio.client import Pipeline
+
+from src.app.core.utils import cache
+from src.app.core.utils.cache import (
+    LocalCache,
+    _access_member,
+    _is_stale,
+    _KeyBuilder,
+    _needs_refresh,
+    _single_flight,
+    _tag_key,
+)
+from src.app.core.utils.cache_codecs import get_serializer
+
+
+def test_local_cache_evicts_least_recently_used() -> None:
+    local_cache = LocalCache(max_size=2, ttl=60)
+    local_cache.set("a", b"1")
+    local_cache.set("b", b"2")
+    local_cache.get("a")
+    local_cache.set("c", b"3")
+
+    assert local_cache.get("a") == b"1"
+    assert local_cache.get("b") is None
+    assert local_cache.get("c") == b"3"
+
+
+def test_local_cache_expires_entries(mocker: MockerFixture) -> None:
+    local_cache = LocalCache(max_size=10, ttl=5)
+    local_cache.set("a", b"1", ttl=60)
+
+    mocker.patch("src.app.core.utils.cache.time.monotonic", return_value=time.monotonic() + 6)
+    assert local_cache.get("a") is None
+
+
+def test_local_cache_invalidation_bumps_generation() -> None:
+    local_cache = LocalCache(max_size=10, ttl=60)
+    local_cache.set("bob_posts:page_1:bob", b"1")
+    local_cache.set("bob_post_cache:1", b"2")
+    generation = local_cache.generation
+
+    local_cache.delete_pattern("bob_posts:*")
+
+    assert local_cache.generation > generation
+    assert local_cache.get("bob_posts:page_1:bob") is None
+    assert local_cache.get("bob_post_cache:1") == b"2"
+
+
+def test_key_builder_formats_precompiled_templates() -> None:
+    keys = _KeyBuilder(
+        "{username}_posts:page_{page}",
+        resource_id_name="username",
+        tags=["{username}_posts"],
+        to_invalidate_extra={"{username}_post_cache": "{id}"},
+        pattern_to_invalidate_extra=["{username}_posts:"],
+    )
+    kwargs = {"username": "userson", "page": 2, "id": 7}
+
+    assert keys.cache_key(kwargs) == "userson_posts:page_2:userson"
+    assert keys.tags(kwargs) == ["userson_posts"]
+    assert keys.extra_keys(kwargs) == ["userson_post_cache:7"]
+    assert keys.patterns(kwargs) == ["userson_posts:*"]
+    assert keys.invalidates_extra
+
+
+def test_key_builder_hash_tags_keys_with_redis_cluster(mocker: MockerFixture) -> None:
+    mocker.patch("src.app.core.utils.cache.client", RedisCluster(host="localhost", port=7000))
+    keys = _KeyBuilder(
+        "{username}_posts:page_{page}",
+        resource_id_name="username",
+        to_invalidate_extra={"{username}_post_cache": "{id}"},
+        pattern_to_invalidate_extra=["{username}_posts:"],
+    )
+    kwargs = {"username": "userson", "page": 2, "id": 7}
+
+    assert keys.cache_key(kwargs) == "{userson_posts}:page_2:userson"
+    assert keys.extra_keys(kwargs) == ["{userson_post_cache}:7"]
+    assert keys.patterns(kwargs) == ["{userson_posts}:*"]
+    assert _tag_key("userson_posts") == "cache_tag:{userson_posts}"
+
+
+def test_single_flight_coalesces_concurrent_misses(mocker: MockerFixture) -> None:
+    async def compute_with_lock(cache_key: str, compute: Any, lock_timeout: float) -> Any:
+        return await compute()
+
+    mocker.patch("src.app.core.utils.cache._compute_with_lock", side_effect=compute_with_lock)
+    calls = 0
+
+    async def compute() -> dict[str, int]:
+        nonlocal calls
+        calls += 1
+        await asyncio.sleep(0.01)
+        return {"calls": calls}
+
+    async def run() -> list[Any]:
+        return await asyncio.gather(*[_single_flight("bob_posts:page_1:bob", compute, 10) for _ in range(10)])
+
+    results = asyncio.run(run())
+
+    assert calls == 1
+    assert all(result == {"calls": 1} for result in results)
+
+
+def test_needs_refresh_serves_stale_entries_in_background() -> None:
+    assert not _needs_refresh(ttl_ms=45_000, stale_ttl=30, beta=0, recompute_time=0.1)
+    assert _needs_refresh(ttl_ms=25_000, stale_ttl=30, beta=0, recompute_time=0.1)
+    assert not _needs_refresh(ttl_ms=-1, stale_ttl=30, beta=0, recompute_time=0.1)
+
+
+def test_is_stale_only_within_the_stale_window() -> None:
+    assert _is_stale(ttl_ms=25_000, stale_ttl=30)
+    assert not _is_stale(ttl_ms=45_000, stale_ttl=30)
+    assert not _is_stale(ttl_ms=-1, stale_ttl=30)
+    assert not _is_stale(ttl_ms=0, stale_ttl=0)
+
+
+def test_needs_refresh_refreshes_early_close_to_expiration(mocker: MockerFixture) -> None:
+    mocker.patch("src.app.core.utils.cache.random.random", return_value=0.5)
+
+    assert not _needs_refresh(ttl_ms=60_000, stale_ttl=0, beta=1.0, recompute_time=0.1)
+    assert _needs_refresh(ttl_ms=50, stale_ttl=0, beta=1.0, recompute_time=0.1)
+
+
+def test_serializer_compresses_large_payloads_only() -> None:
+    pytest.importorskip("zstandard")
+    serializer = get_serializer("json", "zstd", compression_min_size=100)
+    small = {"id": 1}
+    large = {"id": 1, "text": "x" * 1000}
+
+    assert serializer.dumps(small) == b'{"id":1}'
+    assert len(serializer.dumps(large)) < 1000
+    assert serializer.loads(serializer.dumps(large)) == large
+
+
+def test_serializer_reads_uncompressed_entries() -> None:
+    pytest.importorskip("lz4")
+    serializer = get_serializer("json", "lz4", compression_min_size=0)
+
+    assert serializer.loads(b'{"id": 1}') == {"id": 1}
+
+
+def test_access_member_keeps_replayable_arguments_only() -> None:
+    kwargs = {"username": "userson", "page": 2, "db": "session", "post": object()}
+
+    assert _access_member(kwargs, session_names=["db"]) == '{"page":2,"username":"userson"}'
+
+
+def test_warmable_registry_registers_tracked_endpoints_without_the_other_routers() -> None:
+    script = (
+        "import sys\n"
+        "from src.app.api import warmable\n"
+        "from src.app.core.utils.cache import warmable_endpoints\n"
+        "print(len(warmable_endpoints), 'src.app.api.v1.utils.youtube' in sys.modules)"
+    )
+    output = subprocess.run([sys.executable, "-c", script], capture_output=True, text=True, check=True).stdout
+
+    assert output.split() == ["2", "False"]
+
+
+def _posts_app(**read_options: Any) -> FastAPI:
+    app = FastAPI()
+
+    @app.get("/{username}/posts")
+    @cache.cache("{username}_posts:page_{page}", resource_id_name="username", tags=["{username}_posts"], **read_options)
+    async def read_posts(request: Request, username: str, page: int = 1) -> dict[str, int]:
+        return {"page": page}
+
+    @app.patch("/{username}/posts/{id}")
+    @cache.cache("{username}_post_cache", resource_id_name="id", tags_to_invalidate=["{username}_posts"])
+    async def patch_post(request: Request, username: str, id: int) -> dict[str, str]:
+        return {"message": "Post updated"}
+
+    return app
+
+
+def test_tagged_entries_are_invalidated_from_redis_and_local_cache(mocker: MockerFixture) -> None:
+    mocker.patch.object(cache, "local_cache", LocalCache())
+
+    async def read_then_patch() -> tuple[list[bytes], list[bytes]]:
+        redis_client = FakeAsyncRedis()
+        mocker.patch.object(cache, "client", redis_client)
+        async with httpx.AsyncClient(transport=httpx.ASGITransport(app=_posts_app()), base_url="http://test") as client:
+            for page in (1, 2):
+                assert (await client.get("/userson/posts", params={"page": page})).json() == {"page": page}
+            cached = sorted(await redis_client.keys())
+            assert len(cache.local_cache) == 2
+            assert (await client.patch("/userson/posts/7")).status_code == 200
+            return cached, await redis_client.keys()
+
+    cached, remaining = asyncio.run(read_then_patch())
+
+    assert cached == [b"cache_tag:userson_posts", b"userson_posts:page_1:userson", b"userson_posts:page_2:userson"]
+    assert remaining == []
+    assert len(cache.local_cache) == 0
+
+
+def _record_round_trips(mocker: MockerFixture, redis_client: FakeAsyncRedis) -> list[list[str]]:
+    """Names of the commands sent to `redis_client` by each round trip, a pipeline being a single one."""
+    round_trips: list[list[str]] = []
+    execute_pipeline = Pipeline.execute
+    execute_command = redis_client.execute_command
+
+    async def record_pipeline(pipe: Pipeline, *args: Any, **kwargs: Any) -> Any:
+        round_trips.append([command[0] for command, _ in pipe.command_stack])
+        return await execute_pipeline(pipe, *args, **kwargs)
+
+    async def record_command(*args: Any, **kwargs: Any) -> Any:
+        round_trips.append([args[0]])
+        return await execute_command(*args, **kwargs)
+
+    mocker.patch.object(Pipeline, "execute", record_pipeline)
+    mocker.patch.object(redis_client, "execute_command", record_command)
+    return round_trips
+
+
+def test_cache_miss_stores_value_ttl_and_tags_in_one_round_trip(mocker: MockerFixture) -> None:
+    mocker.patch.object(cache, "local_cache", None)
+    cache_key = "userson_posts:page_1:userson"
+
+    async def read() -> tuple[list[list[str]], list[Any]]:
+        redis_client = FakeAsyncRedis()
+        mocker.patch.object(cache, "client", redis_client)
+        round_trips = _record_round_trips(mocker, redis_client)
+        app = _posts_app(coalesce=False)
+        async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test") as client:
+            assert (await client.get("/userson/posts")).json() == {"page": 1}
+        sent = list(round_trips)
+        return sent, [
+            await redis_client.get(cache_key),
+            await redis_client.ttl(cache_key),
+            await redis_client.smembers("cache_tag:userson_posts"),
+        ]
+
+    round_trips, (value, ttl, tagged) = asyncio.run(read())
+
+    assert round_trips == [["GET"], ["SET", "SADD", "EXPIRE", "EXPIRE"]]
+    assert value == b'{"page":1}'
+    assert ttl == 3600
+    assert tagged == {cache_key.encode()}
+
+
+def test_invalidation_unlinks_keys_and_publishes_them_in_one_round_trip(mocker: MockerFixture) -> None:
+    mocker.patch.object(cache, "local_cache", LocalCache())
+
+    async def read_then_patch() -> tuple[list[list[str]], Any]:
+        redis_client = FakeAsyncRedis()
+        mocker.patch.object(cache, "client", redis_client)
+        async with redis_client.pubsub(ignore_subscribe_messages=True) as pubsub:
+            await pubsub.subscribe(cache.invalidation_channel)
+            async with httpx.AsyncClient(
+                transport=httpx.ASGITransport(app=_posts_app()), base_url="http://test"
+            ) as client:
+                await client.get("/userson/posts")
+                round_trips = _record_round_trips(mocker, redis_client)
+                await client.patch("/userson/posts/7")
+            return round_trips, await asyncio.wait_for(anext(pubsub.listen()), 1)
+
+    round_trips, message = asyncio.run(read_then_patch())
+
+    assert round_trips[-1] == ["UNLINK", "PUBLISH"]
+    assert json.loads(message["data"]) == {
+        "keys": ["userson_post_cache:7", "userson_posts:page_1:userson"],
+        "patterns": [],
+    }
+
+
+def test_invalidations_published_by_another_process_evict_the_local_cache(mocker: MockerFixture) -> None:
+    local_cache = LocalCache()
+    local_cache.set("stale", b"{}")
+    mocker.patch.object(cache, "local_cache", local_cache)
+    mocker.patch.object(cache, "pubsub_client", None)
+    server = FakeServer()
+
+    async def invalidate_from_another_process() -> list[str]:
+        mocker.patch.object(cache, "client", FakeAsyncRedis(server=server))
+        other_process = FakeAsyncRedis(server=server)
+        await cache.start_invalidation_listener()
+        try:
+            # The local cache is cleared once subscribed.
+            while len(local_cache):
+                await asyncio.sleep(0.01)
+            for key in ("userson_post_cache:7", "userson_posts:page_1:userson", "other_posts:page_1:other"):
+                local_cache.set(key, b"{}")
+
+            message = json.dumps({"keys": ["userson_post_cache:7"], "patterns": ["userson_posts:*"]})
+            assert await other_process.publish(cache.invalidation_channel, message) == 1
+            while len(local_cache) > 1:
+                await asyncio.sleep(0.01)
+        finally:
+            await cache.stop_invalidation_listener()
+        return list(local_cache._data)
+
+    remaining = asyncio.run(asyncio.wait_for(invalidate_from_another_process(), 5))
+
+    assert remaining == ["other_posts:page_1:other"]
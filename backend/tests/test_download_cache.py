@@ -0,0 +1,110 @@
+import asyncio
+import os
+import time
+from typing import Any
+
+import pytest
+
+from src.app.core.utils.download_cache import Artifact, DownloadCache, artifact_key
+from src.app.core.utils.downloads import download_options
+
+
+def _fetch(calls: list[str], size: int = 10, delay: float = 0.05) -> Any:
+    async def fetch(output_dir: str) -> Artifact:
+        calls.append(output_dir)
+        await asyncio.sleep(delay)
+        path = os.path.join(output_dir, "My Video.mp4")
+        with open(path, "wb") as f:
+            f.write(b"v" * size)
+        return Artifact(path, "My Video", "video/mp4")
+
+    return fetch
+
+
+def test_artifact_key_ignores_how_the_video_is_linked() -> None:
+    mp4_720 = download_options("720p", "mp4", "")
+
+    assert artifact_key("https://youtu.be/dQw4w9WgXcQ", mp4_720) == artifact_key(
+        "https://www.youtube.com/watch?v=dQw4w9WgXcQ&t=42", download_options("720p", "mp4", "/elsewhere")
+    )
+    assert artifact_key("https://youtu.be/dQw4w9WgXcQ", mp4_720) != artifact_key(
+        "https://youtu.be/dQw4w9WgXcQ", download_options("1080p", "mp4", "")
+    )
+    assert artifact_key("https://youtu.be/dQw4w9WgXcQ", download_options("360p", "mp3", "")) == artifact_key(
+        "https://youtu.be/dQw4w9WgXcQ", download_options("1080p", "mp3", "")
+    )
+
+
+def test_concurrent_requests_share_one_download(tmp_path: Any) -> None:
+    cache = DownloadCache(str(tmp_path), max_size=1024)
+    calls: list[str] = []
+
+    async def run() -> list[Artifact]:
+        return await asyncio.gather(*(cache.get_or_download("key", _fetch(calls)) for _ in range(5)))
+
+    artifacts = asyncio.run(run())
+
+    assert len(calls) == 1
+    assert len(set(artifacts)) == 1
+    assert artifacts[0].path == str(tmp_path / "artifacts" / "key" / "My Video.mp4")
+    assert cache.get("key") == artifacts[0]
+    assert os.listdir(tmp_path / "staging") == []
+
+    asyncio.run(cache.get_or_download("key", _fetch(calls)))
+    assert len(calls) == 1
+
+
+def test_failed_downloads_are_not_cached(tmp_path: Any) -> None:
+    cache = DownloadCache(str(tmp_path), max_size=1024)
+
+    async def fail(output_dir: str) -> Artifact:
+        with open(os.path.join(output_dir, "My Video.mp4.part"), "wb") as f:
+            f.write(b"v")
+        raise RuntimeError("unavailable")
+
+    with pytest.raises(RuntimeError):
+        asyncio.run(cache.get_or_download("key", fail))
+
+    assert cache.get("key") is None
+    assert os.listdir(tmp_path / "staging") == []
+    calls: list[str] = []
+    asyncio.run(cache.get_or_download("key", _fetch(calls)))
+    assert len(calls) == 1
+
+
+def test_least_recently_used_artifacts_are_evicted(tmp_path: Any) -> None:
+    cache = DownloadCache(str(tmp_path), max_size=2500)
+    calls: list[str] = []
+
+    async def run() -> None:
+        for key in ("first", "second"):
+            await cache.get_or_download(key, _fetch(calls, size=1000, delay=0))
+            await asyncio.sleep(0.01)
+        await cache.get_or_download("first", _fetch(calls, size=1000, delay=0))
+        await asyncio.sleep(0.01)
+        await cache.get_or_download("third", _fetch(calls, size=1000, delay=0))
+
+    asyncio.run(run())
+
+    assert len(calls) == 3
+    assert cache.get("first") is not None and cache.get("third") is not None
+    assert cache.get("second") is None
+
+
+def test_sweep_removes_expired_artifacts_and_leftovers(tmp_path: Any) -> None:
+    cache = DownloadCache(str(tmp_path), max_size=1024)
+    calls: list[str] = []
+    for key in ("old", "recent"):
+        asyncio.run(cache.get_or_download(key, _fetch(calls, delay=0)))
+    leftover = tmp_path / "staging" / "crashed"
+    leftover.mkdir()
+    (tmp_path / "locks" / "crashed.lock").touch()
+    two_days_ago = time.time() - 2 * 86400
+    for path in (tmp_path / "artifacts" / "old", leftover, tmp_path / "locks" / "crashed.lock"):
+        os.utime(path, (two_days_ago, two_days_ago))
+
+    assert cache.sweep(max_age=86400) == 1
+
+    assert cache.get("old") is None and cache.get("recent") is not None
+    assert os.listdir(tmp_path / "staging") == []
+    assert sorted(os.listdir(tmp_path / "locks")) == ["recent.lock"]
@@ -0,0 +1,294 @@
+import asyncio
+import json
+import os
+import shutil
+import threading
+import time
+from types import SimpleNamespace
+from typing import Any
+
+import httpx
+import pytest
+from fastapi import FastAPI
+from pytest_mock import MockerFixture
+
+from src.app.api.v1.utils import youtube
+from src.app.api.v1.websocket import relay_download_event, ws_manager
+from src.app.core.utils import downloads
+from src.app.core.utils.download_cache import Artifact, DownloadCache
+from src.app.core.utils.downloads import Downloader, download_job
+
+
+def _fake_download(duration: float) -> Any:
+    def extract_info(url: str, options: dict[str, Any]) -> dict[str, Any]:
+        output_dir = os.path.dirname(options["outtmpl"])
+        os.makedirs(output_dir, exist_ok=True)
+        deadline = time.monotonic() + duration
+        while time.monotonic() < deadline:
+            for hook in options["progress_hooks"]:
+                hook({"status": "downloading", "downloaded_bytes": 1, "total_bytes": 2, "filename": "video.mp4"})
+            time.sleep(0.01)
+        with open(os.path.join(output_dir, "My Video.mp4"), "wb") as f:
+            f.write(b"video")
+        return {"title": "My Video"}
+
+    return extract_info
+
+
+def test_downloader_cancels_timed_out_downloads(mocker: MockerFixture, tmp_path: Any) -> None:
+    mocker.patch.object(downloads, "_extract_info", _fake_download(duration=10))
+    downloader = Downloader(concurrency=1, timeout=0.1)
+    options = downloads.download_options("360p", "mp4", str(tmp_path))
+
+    started = time.monotonic()
+    with pytest.raises(TimeoutError):
+        asyncio.run(downloader.download("https://youtu.be/video", options))
+
+    assert time.monotonic() - started < 1
+    assert not os.listdir(tmp_path)
+
+
+def test_downloader_holds_the_slot_of_cancelled_downloads_until_their_thread_stopped(
+    mocker: MockerFixture, tmp_path: Any
+) -> None:
+    stopped = threading.Event()
+    fake_download = _fake_download(duration=10)
+
+    def extract_info(url: str, options: dict[str, Any]) -> dict[str, Any]:
+        try:
+            return fake_download(url, options)
+        finally:
+            time.sleep(0.05)
+            stopped.set()
+
+    mocker.patch.object(downloads, "_extract_info", extract_info)
+    downloader = Downloader(concurrency=1, timeout=10)
+    options = downloads.download_options("360p", "mp4", str(tmp_path))
+
+    async def cancel() -> bool:
+        download = asyncio.create_task(downloader.download("https://youtu.be/video", options))
+        await asyncio.sleep(0.1)
+        download.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await download
+        return stopped.is_set()
+
+    assert asyncio.run(cancel())
+
+
+def test_download_job_publishes_throttled_progress(mocker: MockerFixture, tmp_path: Any) -> None:
+    mocker.patch.object(downloads, "_extract_info", _fake_download(duration=0.3))
+    client = mocker.AsyncMock()
+    cache = DownloadCache(str(tmp_path), max_size=1024)
+
+    result = asyncio.run(
+        download_job(client, Downloader(), cache, "job", "https://youtu.be/video", "720p", "mp4", "client")
+    )
+
+    assert result["path"].startswith(str(tmp_path / "artifacts"))
+    assert result["path"].endswith("My Video.mp4")
+    assert result["media_type"] == "video/mp4" and result["title"] == "My Video"
+    events = [json.loads(call.args[1])["event"] for call in client.publish.await_args_list]
+    assert events[-1] == "finished"
+    assert 1 <= events.count("progress") <= 2
+
+
+def test_relay_download_event_sends_to_connected_client(mocker: MockerFixture) -> None:
+    websocket = mocker.AsyncMock()
+    mocker.patch.dict(ws_manager.active_connections, {"client": websocket})
+    event = {"event": "finished", "client_id": "client", "job_id": "job", "is_mp3": False, "title": "My Video"}
+
+    asyncio.run(relay_download_event(event))
+    asyncio.run(relay_download_event({**event, "client_id": "other"}))
+
+    websocket.send_json.assert_awaited_once_with({"job_id": "job", "title": "My Video", "status": "finished"})
+
+
+def test_download_video_serves_the_cached_file_and_can_be_resumed(mocker: MockerFixture, tmp_path: Any) -> None:
+    mocker.patch.object(downloads, "_extract_info", _fake_download(duration=0))
+    mocker.patch.object(youtube, "download_cache", DownloadCache(str(tmp_path), max_size=1024))
+    copy = mocker.spy(shutil, "copy2")
+    app = FastAPI()
+    app.include_router(youtube.router)
+
+    async def download() -> tuple[httpx.Response, httpx.Response]:
+        async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test") as client:
+            body = {"url": "https://youtu.be/dQw4w9WgXcQ", "resolution": "720p", "format": "mp4"}
+            response = await client.post("/youtube-download/client", json=body)
+            resume_headers = {"Range": "bytes=2-", "If-Range": response.headers["etag"]}
+            return response, await client.get(response.headers["content-location"], headers=resume_headers)
+
+    response, resumed = asyncio.run(download())
+
+    assert response.status_code == 200
+    assert response.content == b"video"
+    assert response.headers["content-disposition"] == (
+        "attachment; filename=\"MyVideo_720p.mp4\"; filename*=UTF-8''My%20Video.mp4"
+    )
+    [artifact] = os.listdir(tmp_path / "artifacts")
+    assert sorted(os.listdir(tmp_path / "artifacts" / artifact)) == ["My Video.mp4", "info.json"]
+    copy.assert_not_called()
+    assert resumed.status_code == 206
+    assert resumed.content == b"deo"
+    assert resumed.headers["content-disposition"] == "attachment; filename*=UTF-8''My%20Video.mp4"
+
+
+def test_download_video_hands_artifacts_to_nginx_and_answers_404_once_gone(
+    mocker: MockerFixture, tmp_path: Any
+) -> None:
+    settings = SimpleNamespace(
+        YOUTUBE_DOWNLOAD_DIR=str(tmp_path), YOUTUBE_DOWNLOAD_ACCEL_REDIRECT="/protected-downloads/"
+    )
+    mocker.patch.object(youtube, "settings", settings)
+    mocker.patch.object(downloads, "_extract_info", _fake_download(duration=0))
+    cache = DownloadCache(str(tmp_path), max_size=1024)
+    mocker.patch.object(youtube, "download_cache", cache)
+    app = FastAPI()
+    app.include_router(youtube.router)
+
+    async def download_twice() -> tuple[httpx.Response, httpx.Response]:
+        async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test") as client:
+            body = {"url": "https://youtu.be/dQw4w9WgXcQ", "resolution": "720p", "format": "mp4"}
+            handed_off = await client.post("/youtube-download/client", json=body)
+            # Removed after its info was read, as when another process evicts it meanwhile.
+            [artifact] = os.listdir(tmp_path / "artifacts")
+            os.remove(tmp_path / "artifacts" / artifact / "My Video.mp4")
+            return handed_off, await client.post("/youtube-download/client", json=body)
+
+    handed_off, gone = asyncio.run(download_twice())
+
+    assert handed_off.status_code == 200
+    assert handed_off.content == b""
+    assert handed_off.headers["x-accel-redirect"].startswith("/protected-downloads/artifacts/")
+    assert handed_off.headers["x-accel-redirect"].endswith("/My%20Video.mp4")
+    assert gone.status_code == 404
+
+
+def test_download_video_answers_timed_out_downloads_with_408(mocker: MockerFixture, tmp_path: Any) -> None:
+    mocker.patch.object(downloads, "_extract_info", _fake_download(duration=10))
+    mocker.patch.object(youtube, "downloader", Downloader(concurrency=1, timeout=0.1))
+    mocker.patch.object(youtube, "download_cache", DownloadCache(str(tmp_path), max_size=1024))
+    app = FastAPI()
+    app.include_router(youtube.router)
+
+    async def download() -> httpx.Response:
+        async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test") as client:
+            body = {"url": "https://youtu.be/dQw4w9WgXcQ", "resolution": "720p", "format": "mp4"}
+            return await client.post("/youtube-download/client", json=body)
+
+    response = asyncio.run(download())
+
+    assert response.status_code == 408
+    assert response.json()["detail"] == "Download timed out after 0.1 seconds"
+    assert not os.listdir(tmp_path / "staging")
+
+
+def test_follow_download_yields_the_file_while_it_is_written(tmp_path: Any) -> None:
+    path = tmp_path / "My Video.mp4"
+
+    async def write() -> None:
+        with open(path, "wb") as f:
+            for _ in range(5):
+                f.write(b"chunk")
+                f.flush()
+                await asyncio.sleep(0.05)
+
+    async def run() -> tuple[list[bytes], bool]:
+        download = asyncio.ensure_future(write())
+        file = await downloads.open_download(lambda: str(tmp_path), "mp4", download, poll_interval=0.01)
+        assert file is not None
+        chunks = [chunk async for chunk in downloads.follow_download(file, download, poll_interval=0.01)]
+        return chunks, download.done()
+
+    chunks, done = asyncio.run(run())
+
+    assert b"".join(chunks) == b"chunk" * 5
+    assert len(chunks) > 1 and done
+
+
+def test_follow_download_raises_when_the_download_fails(tmp_path: Any) -> None:
+    path = tmp_path / "My Video.mp4"
+
+    async def write() -> None:
+        with open(path, "wb") as f:
+            f.write(b"chunk")
+        await asyncio.sleep(0.05)
+        raise TimeoutError("Download timed out")
+
+    async def run() -> list[bytes]:
+        download = asyncio.ensure_future(write())
+        file = await downloads.open_download(lambda: str(tmp_path), "mp4", download, poll_interval=0.01)
+        assert file is not None
+        return [chunk async for chunk in downloads.follow_download(file, download, poll_interval=0.01)]
+
+    with pytest.raises(TimeoutError):
+        asyncio.run(run())
+
+
+def test_stream_video_sends_and_caches_the_download(mocker: MockerFixture, tmp_path: Any) -> None:
+    def extract_info(url: str, options: dict[str, Any]) -> dict[str, Any]:
+        assert options["nopart"] and "postprocessors" not in options
+        with open(options["outtmpl"].replace("%(title)s.%(ext)s", "My Video.m4a"), "wb") as f:
+            for _ in range(3):
+                f.write(b"audio")
+                f.flush()
+                time.sleep(0.05)
+        return {"title": "My Video"}
+
+    mocker.patch.object(downloads, "_extract_info", extract_info)
+    mocker.patch.object(youtube, "download_cache", DownloadCache(str(tmp_path), max_size=1024))
+    app = FastAPI()
+    app.include_router(youtube.router)
+
+    async def stream() -> list[httpx.Response]:
+        async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test") as client:
+            params = {"url": "https://youtu.be/dQw4w9WgXcQ", "format": "m4a"}
+            return [await client.get("/youtube-stream", params=params) for _ in range(2)]
+
+    streamed, cached = asyncio.run(stream())
+
+    assert streamed.status_code == cached.status_code == 200
+    assert streamed.content == cached.content == b"audio" * 3
+    assert streamed.headers["content-type"] == "audio/mp4"
+    assert "content-length" not in streamed.headers and cached.headers["content-length"] == "15"
+    assert streamed.headers["content-disposition"] == "attachment; filename*=UTF-8''My%20Video.m4a"
+
+
+def test_artifacts_are_handed_to_nginx_when_accel_redirect_is_set(mocker: MockerFixture, tmp_path: Any) -> None:
+    settings = SimpleNamespace(
+        YOUTUBE_DOWNLOAD_DIR=str(tmp_path), YOUTUBE_DOWNLOAD_ACCEL_REDIRECT="/protected-downloads/"
+    )
+    mocker.patch.object(youtube, "settings", settings)
+    path = tmp_path / "artifacts" / "key" / "My Video.mp4"
+    path.parent.mkdir(parents=True)
+    path.write_bytes(b"video")
+
+    response = youtube._artifact_response(str(path), "video/mp4", {})
+
+    assert response.body == b""
+    assert response.headers["x-accel-redirect"] == "/protected-downloads/artifacts/key/My%20Video.mp4"
+    assert response.headers["content-type"] == "video/mp4"
+
+
+def test_read_artifact_answers_404_once_the_file_is_gone(mocker: MockerFixture, tmp_path: Any) -> None:
+    cache = DownloadCache(str(tmp_path), max_size=1024)
+    mocker.patch.object(youtube, "download_cache", cache)
+    app = FastAPI()
+    app.include_router(youtube.router)
+
+    async def fetch(output_dir: str) -> Artifact:
+        path = os.path.join(output_dir, "My Video.mp4")
+        with open(path, "wb") as f:
+            f.write(b"video")
+        return Artifact(path, "My Video", "video/mp4")
+
+    async def read_after_removal() -> httpx.Response:
+        artifact = await cache.get_or_download("a" * 64, fetch)
+        # Removed after its info was read, as when another process evicts it meanwhile.
+        os.remove(artifact.path)
+        async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test") as client:
+            return await client.get(f"/youtube-artifacts/{'a' * 64}")
+
+    response = asyncio.run(read_after_removal())
+
+    assert response.status_code == 404
@@ -0,0 +1,86 @@
+import asyncio
+from typing import Any
+
+import httpx
+from fastapi import FastAPI
+
+from src.app.core.utils.file_responses import RangeFileResponse
+
+
+def _get(tmp_path: Any, method: str = "GET", **headers: str) -> httpx.Response:
+    path = tmp_path / "video.mp4"
+    if not path.exists():
+        path.write_bytes(b"0123456789")
+    app = FastAPI()
+
+    @app.api_route("/video", methods=["GET", "HEAD"])
+    async def video() -> RangeFileResponse:
+        return RangeFileResponse(path, media_type="video/mp4")
+
+    async def request() -> httpx.Response:
+        async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test") as client:
+            return await client.request(method, "/video", headers={k.replace("_", "-"): v for k, v in headers.items()})
+
+    return asyncio.run(request())
+
+
+def test_range_requests_are_answered_with_partial_content(tmp_path: Any) -> None:
+    full = _get(tmp_path)
+    assert full.status_code == 200 and full.content == b"0123456789"
+    assert full.headers["accept-ranges"] == "bytes"
+
+    partial = _get(tmp_path, range="bytes=2-5")
+    assert partial.status_code == 206 and partial.content == b"2345"
+    assert partial.headers["content-range"] == "bytes 2-5/10"
+    assert partial.headers["content-length"] == "4"
+
+    assert _get(tmp_path, range="bytes=7-").content == b"789"
+    assert _get(tmp_path, range="bytes=-3").content == b"789"
+    assert _get(tmp_path, range="bytes=8-100").content == b"89"
+    assert _get(tmp_path, method="HEAD", range="bytes=2-5").headers["content-length"] == "4"
+
+    unsatisfiable = _get(tmp_path, range="bytes=10-")
+    assert unsatisfiable.status_code == 416
+    assert unsatisfiable.headers["content-range"] == "bytes */10"
+
+    for ignored in ("bytes=0-1,4-5", "bytes=5-2", "items=0-1"):
+        response = _get(tmp_path, range=ignored)
+        assert response.status_code == 200 and response.content == b"0123456789"
+
+
+def test_conditional_requests(tmp_path: Any) -> None:
+    full = _get(tmp_path)
+    etag, last_modified = full.headers["etag"], full.headers["last-modified"]
+
+    not_modified = _get(tmp_path, if_none_match=f'"other", W/{etag}')
+    assert not_modified.status_code == 304 and not_modified.content == b""
+    assert not_modified.headers["etag"] == etag
+    assert _get(tmp_path, if_modified_since=last_modified).status_code == 304
+    assert _get(tmp_path, if_none_match='"other"', if_modified_since=last_modified).status_code == 200
+
+    assert _get(tmp_path, range="bytes=2-5", if_range=etag).status_code == 206
+    assert _get(tmp_path, range="bytes=2-5", if_range=last_modified).status_code == 206
+    changed = _get(tmp_path, range="bytes=2-5", if_range='"other"')
+    assert changed.status_code == 200 and changed.content == b"0123456789"
+
+
+def test_ranges_are_sent_with_zerocopysend_when_supported(tmp_path: Any) -> None:
+    path = tmp_path / "video.mp4"
+    path.write_bytes(b"0123456789")
+    scope = {
+        "type": "http",
+        "method": "GET",
+        "headers": [(b"range", b"bytes=2-5")],
+        "extensions": {"http.response.zerocopysend": {}},
+    }
+    messages: list[dict[str, Any]] = []
+
+    async def send(message: dict[str, Any]) -> None:
+        if message["type"] == "http.response.zerocopysend":
+            message = {**message, "file": message["file"].name}
+        messages.append(message)
+
+    asyncio.run(RangeFileResponse(path)(scope, None, send))  # type: ignore[arg-type]
+
+    assert messages[0]["status"] == 206
+    assert messages[1] == {"type": "http.response.zerocopysend", "file": str(path), "offset": 2, "count": 4}
@@ -0,0 +1,69 @@
+from datetime import UTC, datetime, timedelta
+
+import ecdsa
+import pytest
+
+from src.app.core.exceptions.jwt_exceptions import InvalidJWTConfigError, InvalidTokenError
+from src.app.core.utils.jwt_backends import JoseBackend, JWTSigner, PyJWTBackend, get_signer
+
+
+def _es256_key() -> ecdsa.SigningKey:
+    return ecdsa.SigningKey.generate(curve=ecdsa.NIST256p)
+
+
+def test_signer_verifies_tokens_of_previous_keys() -> None:
+    old_key, new_key = _es256_key(), _es256_key()
+    old_signer = JWTSigner(JoseBackend(), "ES256", {"old": old_key.to_pem().decode()}, "old")
+    keys = {"old": old_key.get_verifying_key().to_pem().decode(), "new": new_key.to_pem().decode()}
+    signer = JWTSigner(JoseBackend(), "ES256", keys, "new")
+
+    old_token = old_signer.encode({"sub": "userson"})
+    new_token = signer.encode({"sub": "userson"})
+
+    assert signer.decode(old_token) == {"sub": "userson"}
+    assert signer.decode(new_token) == {"sub": "userson"}
+    with pytest.raises(InvalidTokenError):
+        old_signer.decode(new_token)
+
+    assert [jwk["kid"] for jwk in signer.jwks["keys"]] == ["old", "new"]
+    assert all("d" not in jwk for jwk in signer.jwks["keys"])
+
+
+def test_signer_rejects_keys_that_cannot_sign() -> None:
+    public_key = _es256_key().get_verifying_key().to_pem().decode()
+
+    with pytest.raises(InvalidJWTConfigError):
+        JWTSigner(JoseBackend(), "ES256", {"public": public_key}, "public")
+
+
+def test_backends_verify_tokens_of_each_other() -> None:
+    expired = datetime.now(UTC).replace(tzinfo=None) - timedelta(minutes=1)
+    jose_signer = get_signer("jose", "HS256", secret_key="secret" * 6, key_id="main")
+    pyjwt_signer = get_signer("pyjwt", "HS256", secret_key="secret" * 6, key_id="main")
+
+    assert pyjwt_signer.decode(jose_signer.encode({"sub": "userson"})) == {"sub": "userson"}
+    assert jose_signer.decode(pyjwt_signer.encode({"sub": "userson"})) == {"sub": "userson"}
+    assert jose_signer.jwks == {"keys": []}
+    for signer in (jose_signer, pyjwt_signer):
+        expired_token = signer.encode({"sub": "userson", "exp": expired})
+        with pytest.raises(InvalidTokenError):
+            signer.decode(expired_token)
+        assert signer.unverified_claims(expired_token)["sub"] == "userson"
+        with pytest.raises(InvalidTokenError):
+            signer.unverified_claims("not a token")
+
+
+def test_eddsa_needs_the_pyjwt_backend() -> None:
+    pytest.importorskip("cryptography")
+    from cryptography.hazmat.primitives import serialization
+    from cryptography.hazmat.primitives.asymmetric.ed25519 import Ed25519PrivateKey
+
+    private_key = Ed25519PrivateKey.generate().private_bytes(
+        serialization.Encoding.PEM, serialization.PrivateFormat.PKCS8, serialization.NoEncryption()
+    )
+    signer = JWTSigner(PyJWTBackend(), "EdDSA", {"main": private_key.decode()}, "main")
+
+    assert signer.decode(signer.encode({"sub": "userson"})) == {"sub": "userson"}
+    assert signer.jwks["keys"][0]["crv"] == "Ed25519"
+    with pytest.raises(InvalidJWTConfigError):
+        JWTSigner(JoseBackend(), "EdDSA", {"main": private_key.decode()}, "main")
@@ -0,0 +1,58 @@
+from fastapi import APIRouter
+from fastapi.testclient import TestClient
+
+from src.app.core.config import EnvironmentSettings, MetricsSettings
+from src.app.core.setup import create_application
+from src.app.core.utils.metrics import Registry
+
+
+def test_counter_is_rendered_per_label_set() -> None:
+    registry = Registry()
+    counter = registry.counter("cache_requests_total", "Requests.", ("key_prefix", "result"))
+    counter.inc(key_prefix="{username}_post_cache", result="hit")
+    counter.inc(2, key_prefix="{username}_post_cache", result="hit")
+
+    rendered = registry.render()
+
+    assert "# TYPE cache_requests_total counter" in rendered
+    assert 'cache_requests_total{key_prefix="{username}_post_cache",result="hit"} 3.0' in rendered
+
+
+def test_histogram_buckets_are_cumulative() -> None:
+    registry = Registry()
+    histogram = registry.histogram("latency_seconds", "Latency.", buckets=(0.1, 1.0))
+    histogram.observe(0.05)
+    histogram.observe(0.5)
+    histogram.observe(5)
+
+    rendered = registry.render()
+
+    assert 'latency_seconds_bucket{le="0.1"} 1' in rendered
+    assert 'latency_seconds_bucket{le="1.0"} 2' in rendered
+    assert 'latency_seconds_bucket{le="+Inf"} 3' in rendered
+    assert "latency_seconds_count 3" in rendered
+
+
+def test_gauge_goes_up_and_down() -> None:
+    registry = Registry()
+    gauge = registry.gauge("password_hash_queue_depth", "Queue depth.")
+    gauge.inc()
+    gauge.inc()
+    gauge.dec()
+
+    rendered = registry.render()
+
+    assert "# TYPE password_hash_queue_depth gauge" in rendered
+    assert "password_hash_queue_depth 1.0" in rendered
+
+
+class _Settings(MetricsSettings, EnvironmentSettings):
+    pass
+
+
+def test_metrics_are_only_exposed_when_enabled() -> None:
+    disabled = TestClient(create_application(APIRouter(), _Settings()))
+    enabled = TestClient(create_application(APIRouter(), _Settings(METRICS_ENABLED=True)))
+
+    assert disabled.get("/metrics").status_code == 404
+    assert enabled.get("/metrics").status_code == 200
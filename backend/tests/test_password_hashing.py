@@ -0,0 +1,37 @@
+import asyncio
+import threading
+import time
+
+from src.app.core.utils.password_hashing import PASSWORD_HASH_DURATION, PasswordHasher
+
+
+def test_password_hasher_round_trip() -> None:
+    hasher = PasswordHasher(concurrency=1)
+
+    hashed_password = asyncio.run(hasher.hash("Str1ngst!"))
+
+    assert asyncio.run(hasher.verify("Str1ngst!", hashed_password))
+    assert not asyncio.run(hasher.verify("wrong", hashed_password))
+    assert PASSWORD_HASH_DURATION.count(operation="verify") >= 2
+
+
+def test_password_hasher_keeps_event_loop_responsive() -> None:
+    hasher = PasswordHasher(concurrency=2)
+    hashing_threads = set()
+
+    def slow_hash(password: str) -> str:
+        hashing_threads.add(threading.current_thread().name)
+        time.sleep(0.2)
+        return password
+
+    async def main() -> float:
+        hashes = [asyncio.create_task(hasher._run("hash", slow_hash, "password")) for _ in range(4)]
+        started = time.perf_counter()
+        await asyncio.sleep(0.01)
+        latency = time.perf_counter() - started
+        await asyncio.gather(*hashes)
+        return latency
+
+    assert asyncio.run(main()) < 0.1
+    assert len(hashing_threads) == 2
+    assert all(name.startswith("bcrypt") for name in hashing_threads)
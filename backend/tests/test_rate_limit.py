@@ -0,0 +1,197 @@
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+from fakeredis import FakeAsyncRedis
+from fastapi import FastAPI, Request
+from fastapi.testclient import TestClient
+from pytest_mock import MockerFixture
+
+from src.app.core.exceptions.rate_limit_exceptions import InvalidRateLimitAlgorithmError
+from src.app.core.security import create_access_token, create_refresh_token, jwt_signer
+from src.app.core.utils import rate_limit, token_blacklist
+from src.app.core.utils.rate_limit import (
+    SCRIPTS,
+    HybridRateLimiter,
+    RateLimiter,
+    RateLimitPolicies,
+    RateLimitResult,
+    rate_limit_headers,
+)
+from src.app.middleware.rate_limit_middleware import RateLimitMiddleware
+
+
+@pytest.mark.parametrize("algorithm", list(SCRIPTS))
+def test_rate_limiter_accepts_known_algorithms(algorithm: str) -> None:
+    assert RateLimiter(algorithm).algorithm == algorithm
+
+
+def test_rate_limiter_rejects_unknown_algorithm() -> None:
+    with pytest.raises(InvalidRateLimitAlgorithmError):
+        RateLimiter("fixed_window")
+
+
+def test_rate_limit_policies_load_tiers_and_limits(mocker: MockerFixture) -> None:
+    tiers = {"data": [{"id": 1, "name": "free"}]}
+    rate_limits = {"data": [{"tier_id": 1, "path": "api_v1_tasks_task", "limit": 5, "period": 60}]}
+    mocker.patch("src.app.core.utils.rate_limit.crud_tiers.get_multi", return_value=tiers)
+    mocker.patch("src.app.core.utils.rate_limit.crud_rate_limits.get_multi", return_value=rate_limits)
+
+    policies = RateLimitPolicies()
+    asyncio.run(policies.load(mocker.Mock()))
+
+    assert policies.loaded
+    assert policies.tiers == {1: "free"}
+    assert policies.get(1, "api_v1_tasks_task") == (5, 60)
+    assert policies.get(1, "api_v1_posts") is None
+    assert policies.for_tier(1) == {"api_v1_tasks_task": (5, 60)}
+    assert policies.for_tier(2) == {}
+
+
+def test_hybrid_rate_limiter_decides_locally_between_syncs(mocker: MockerFixture) -> None:
+    limiter = RateLimiter()
+    hit = mocker.patch.object(
+        limiter,
+        "hit",
+        side_effect=[
+            RateLimitResult(limited=False, limit=100, remaining=90, reset_after=60, retry_after=0, granted=10),
+            RateLimitResult(limited=True, limit=100, remaining=0, reset_after=60, retry_after=30, granted=0),
+        ],
+    )
+    hybrid = HybridRateLimiter(limiter, tolerance=0.1)
+
+    async def hit_many(count: int) -> list[RateLimitResult]:
+        return [await hybrid.hit(mocker.Mock(), "ratelimit:1:api_v1_tasks_task", 100, 60) for _ in range(count)]
+
+    results = asyncio.run(hit_many(15))
+
+    assert [result.limited for result in results] == [False] * 10 + [True] * 5
+    assert [result.remaining for result in results[:3]] == [99, 98, 97]
+    assert hit.call_count == 2
+    assert hit.call_args_list[0].args[-1] == 10
+
+
+def test_switching_algorithms_does_not_reuse_the_keys_of_the_previous_one(mocker: MockerFixture) -> None:
+    mocker.patch.object(rate_limit, "client", FakeAsyncRedis())
+
+    async def hit_with_each_algorithm() -> list[RateLimitResult]:
+        results = []
+        for algorithm in SCRIPTS:
+            mocker.patch.object(rate_limit, "limiter", RateLimiter(algorithm))
+            results.append(await rate_limit.check_rate_limit(1, "/api/v1/tasks/task", 5, 60))
+        return results
+
+    results = asyncio.run(hit_with_each_algorithm())
+
+    assert [result.remaining for result in results] == [4] * len(SCRIPTS)
+
+
+@pytest.mark.parametrize(
+    ("algorithm", "retry_after", "reset_after"),
+    [("sliding_log", 60, 60), ("sliding_window", 72, 120), ("gcra", 12, 60)],
+)
+def test_rate_limiter_rejects_requests_past_the_limit(
+    mocker: MockerFixture, algorithm: str, retry_after: float, reset_after: float
+) -> None:
+    # The scripts read the clock of the Redis server, at the start of a window of the sliding window algorithm.
+    now = [1_700_000_040.0]
+    mocker.patch("fakeredis.commands_mixins.server_mixin.time", SimpleNamespace(time=lambda: now[0]))
+    limiter = RateLimiter(algorithm)
+
+    async def hit_until_allowed_again() -> tuple[list[RateLimitResult], RateLimitResult, RateLimitResult]:
+        redis_client = FakeAsyncRedis()
+        results = [await limiter.hit(redis_client, "ratelimit:1:api_v1_task", 5, 60) for _ in range(6)]
+        now[0] += retry_after - 0.001
+        too_early = await limiter.hit(redis_client, "ratelimit:1:api_v1_task", 5, 60)
+        now[0] += 0.001
+        return results, too_early, await limiter.hit(redis_client, "ratelimit:1:api_v1_task", 5, 60)
+
+    results, too_early, allowed = asyncio.run(hit_until_allowed_again())
+
+    assert [result.limited for result in results] == [False] * 5 + [True]
+    assert [result.remaining for result in results] == [4, 3, 2, 1, 0, 0]
+    assert results[-1].retry_after == retry_after
+    assert results[-1].reset_after == reset_after
+    assert too_early.limited
+    assert not allowed.limited
+
+
+def test_rate_limit_headers() -> None:
+    allowed = RateLimitResult(limited=False, limit=10, remaining=7, reset_after=12.2, retry_after=0)
+    assert rate_limit_headers(allowed) == {
+        "X-RateLimit-Limit": "10",
+        "X-RateLimit-Remaining": "7",
+        "X-RateLimit-Reset": "13",
+    }
+
+    limited = RateLimitResult(limited=True, limit=10, remaining=0, reset_after=59.5, retry_after=5.1, granted=0)
+    assert rate_limit_headers(limited)["Retry-After"] == "6"
+
+
+def test_rate_limit_middleware_rejects_before_routing(mocker: MockerFixture) -> None:
+    mocker.patch.object(rate_limit, "client", mocker.Mock())
+    mocker.patch.object(rate_limit.policies, "loaded", True)
+    mocker.patch.object(rate_limit.policies, "limits", {(1, "api_v1_task"): (3, 60)})
+    mocker.patch.object(rate_limit.policies, "paths", frozenset(["api_v1_task"]))
+    check_rate_limit = mocker.patch(
+        "src.app.middleware.rate_limit_middleware.check_rate_limit",
+        return_value=RateLimitResult(limited=True, limit=3, remaining=0, reset_after=60, retry_after=20, granted=0),
+    )
+    calls = []
+    app = FastAPI()
+
+    @app.post("/api/v1/task")
+    @app.get("/api/v1/posts")
+    async def endpoint() -> None:
+        calls.append(1)
+
+    app.add_middleware(RateLimitMiddleware)
+    token = asyncio.run(create_access_token({"sub": "userson", "tier_id": 1}))
+
+    with TestClient(app) as client:
+        response = client.post("/api/v1/task", headers={"Authorization": f"Bearer {token}"})
+        assert response.status_code == 429
+        assert response.headers["Retry-After"] == "20"
+        check_rate_limit.assert_awaited_once_with(user_id="userson", path="api_v1_task", limit=3, period=60)
+        assert calls == []
+
+        assert client.get("/api/v1/posts").status_code == 200
+        check_rate_limit.assert_awaited_once()
+        assert calls == [1]
+
+
+def test_rate_limit_middleware_leaves_rejected_tokens_to_the_dependency(mocker: MockerFixture) -> None:
+    mocker.patch.object(rate_limit, "client", mocker.Mock())
+    mocker.patch.object(rate_limit.policies, "loaded", True)
+    mocker.patch.object(rate_limit.policies, "limits", {(1, "api_v1_task"): (3, 60)})
+    mocker.patch.object(rate_limit.policies, "paths", frozenset(["api_v1_task"]))
+    check_rate_limit = mocker.patch(
+        "src.app.middleware.rate_limit_middleware.check_rate_limit",
+        return_value=RateLimitResult(limited=False, limit=3, remaining=2, reset_after=60, retry_after=0),
+    )
+    mocker.patch.object(token_blacklist, "client", mocker.Mock())
+    blacklisted = asyncio.run(create_access_token({"sub": "blacklisted", "tier_id": 1}))
+    blacklisted_jti = jwt_signer.decode(blacklisted)["jti"]
+    mocker.patch.object(token_blacklist, "contains", side_effect=lambda jti: jti == blacklisted_jti)
+    app = FastAPI()
+
+    @app.get("/api/v1/task")
+    async def endpoint(request: Request) -> bool:
+        return getattr(request.state, "rate_limit", None) is not None
+
+    app.add_middleware(RateLimitMiddleware)
+    access = asyncio.run(create_access_token({"sub": "userson", "tier_id": 1}))
+    refresh = asyncio.run(create_refresh_token({"sub": "userson"}))
+
+    with TestClient(app) as client:
+        limited_by_middleware = {
+            name: client.get("/api/v1/task", headers={"Authorization": f"Bearer {token}"}).json()
+            for name, token in (("access", access), ("refresh", refresh), ("blacklisted", blacklisted))
+        }
+
+    assert limited_by_middleware == {"access": True, "refresh": False, "blacklisted": False}
+    assert [call.kwargs["user_id"] for call in check_rate_limit.await_args_list] == [
+        "userson",
+        "unknown",
+        "unknown",
+    ]
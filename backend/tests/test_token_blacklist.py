@@ -0,0 +1,64 @@
+import asyncio
+from datetime import datetime, timedelta
+
+from pytest_mock import MockerFixture
+
+from src.app.core.security import create_access_token, jwt_signer, verify_token
+from src.app.core.utils import token_blacklist
+from src.app.core.utils.token_blacklist import BloomFilter, purge_table
+
+
+def test_bloom_filter_has_no_false_negatives() -> None:
+    bloom = BloomFilter(capacity=1000, error_rate=0.01)
+    for i in range(1000):
+        bloom.add(f"blacklisted-{i}")
+
+    assert all(f"blacklisted-{i}" in bloom for i in range(1000))
+    assert sum(f"valid-{i}" in bloom for i in range(10000)) < 200
+
+
+def test_verify_token_skips_redis_when_bloom_filter_rules_token_out(mocker: MockerFixture) -> None:
+    client = mocker.AsyncMock()
+    mocker.patch.object(token_blacklist, "client", client)
+    mocker.patch.object(token_blacklist, "bloom", BloomFilter(capacity=100))
+    mocker.patch.object(token_blacklist, "migrated", True)
+    token = asyncio.run(create_access_token({"sub": "userson"}))
+
+    token_data = asyncio.run(verify_token(token, mocker.Mock()))
+
+    assert token_data is not None
+    assert token_data.username_or_email == "userson"
+    client.exists.assert_not_awaited()
+
+
+def test_verify_token_queries_table_until_it_is_migrated(mocker: MockerFixture) -> None:
+    mocker.patch.object(token_blacklist, "client", mocker.AsyncMock())
+    mocker.patch.object(token_blacklist, "bloom", BloomFilter(capacity=100))
+    mocker.patch.object(token_blacklist, "migrated", False)
+    exists = mocker.patch("src.app.core.security.crud_token_blacklist.exists", return_value=True)
+    token = asyncio.run(create_access_token({"sub": "userson"}))
+
+    assert asyncio.run(verify_token(token, mocker.Mock())) is None
+    exists.assert_awaited_once()
+
+    mocker.patch.object(token_blacklist, "migrated", True)
+    assert asyncio.run(verify_token(token, mocker.Mock())) is not None
+    exists.assert_awaited_once()
+
+
+def test_purge_table_moves_live_rows_to_redis(mocker: MockerFixture) -> None:
+    mocker.patch.object(token_blacklist, "client", mocker.Mock())
+    mocker.patch.object(token_blacklist, "migrated", False)
+    token = asyncio.run(create_access_token({"sub": "userson"}))
+    live = {"id": 1, "token": token, "expires_at": datetime.now() + timedelta(minutes=5)}
+    mocker.patch("src.app.core.utils.token_blacklist.crud_token_blacklist.get_multi", return_value={"data": [live]})
+    mocker.patch("src.app.core.utils.token_blacklist.crud_token_blacklist.count", return_value=3)
+    db_delete = mocker.patch("src.app.core.utils.token_blacklist.crud_token_blacklist.db_delete")
+    add = mocker.patch("src.app.core.utils.token_blacklist.add")
+
+    deleted = asyncio.run(purge_table(mocker.Mock(), jwt_signer))
+
+    assert deleted == 4
+    add.assert_awaited_once()
+    assert db_delete.await_count == 2
+    assert token_blacklist.migrated
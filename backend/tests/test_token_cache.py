@@ -0,0 +1,49 @@
+import asyncio
+
+from pytest_mock import MockerFixture
+
+from src.app.api.dependencies import get_current_user
+from src.app.core import security
+from src.app.core.security import create_access_token, token_cache
+from src.app.core.utils import token_blacklist
+from src.app.core.utils.token_blacklist import BloomFilter
+from src.app.core.utils.token_cache import VerifiedTokenCache
+
+
+def test_verified_token_cache_is_bounded_and_evicts_users() -> None:
+    cache = VerifiedTokenCache(max_size=2, ttl=60)
+    cache.set_claims("first", {"sub": "userson"})
+    cache.set_claims("second", {"sub": "other"})
+    cache.set_user("second", {"username": "other"})
+    cache.set_claims("third", {"sub": "userson"})
+
+    assert cache.get_claims("first") is None
+    assert cache.get_user("second") == {"username": "other"}
+
+    cache.evict_user("userson")
+    assert cache.get_claims("third") is None
+    assert cache.get_claims("second") == {"sub": "other"}
+
+
+def test_verified_token_cache_skips_expired_tokens() -> None:
+    cache = VerifiedTokenCache()
+    cache.set_claims("expired", {"sub": "userson", "exp": 1})
+
+    assert cache.get_claims("expired") is None
+
+
+def test_get_current_user_queries_the_database_once(mocker: MockerFixture) -> None:
+    mocker.patch.object(token_blacklist, "client", mocker.AsyncMock())
+    mocker.patch.object(token_blacklist, "bloom", BloomFilter(capacity=100))
+    mocker.patch.object(token_blacklist, "migrated", True)
+    user = {"id": 1, "username": "userson", "tier_id": None}
+    get_user = mocker.patch("src.app.api.dependencies.crud_users.get", return_value=user)
+    token = asyncio.run(create_access_token({"sub": "userson"}))
+    decode = mocker.spy(security.jwt_signer, "decode")
+    token_cache.evict(token)
+
+    for _ in range(3):
+        assert asyncio.run(get_current_user(token, mocker.Mock())) == user
+
+    get_user.assert_awaited_once()
+    assert decode.call_count == 1